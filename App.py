@@ -1,7 +1,9 @@
 import streamlit as st
-from data.few_shot import FewShotPosts
-from post_generator import generate_post, save_post_history, get_post_history
-import time
+from few_shot import get_few_shot_posts
+from post_generator import (stream_post, generate_candidates, save_post_history, get_post_history,
+                            get_response_cache)
+import instrumentation
+from llm_helper import AVAILABLE_MODELS
 
 # Page config with improved layout
 st.set_page_config(
@@ -78,6 +80,7 @@ tone_options = ["Professional", "Casual", "Motivational", "Informative", "Story-
 def display_post_card(post, index=None):
     """Display a post in a nicely formatted card"""
     tags_html = ' '.join([f'<span class="tag-pill">{tag}</span>' for tag in [post['tag'], post['tone']]])
+    content_html = post['content'].replace('\n', '<br>')
     
     st.markdown(f"""
     <div class="linkedin-card">
@@ -86,7 +89,7 @@ def display_post_card(post, index=None):
             <div style="color: #888; font-size: 0.8rem;">{post.get('length', '')} • {post.get('language', '')}</div>
         </div>
         <div style="margin: 10px 0;">
-            {post['content'].replace('\n', '<br>')}
+            {content_html}
         </div>
     </div>
     """, unsafe_allow_html=True)
@@ -100,6 +103,21 @@ def create_feature_card(icon, title, description):
     </div>
     """, unsafe_allow_html=True)
 
+def save_generated_post(post_data):
+    """Save a generated post to history, feed it back as an example and make it current"""
+    save_post_history(post_data)
+    
+    # Feed the post back in as a future example when enabled in Settings
+    if st.session_state.get("save_examples_checkbox", True):
+        post = post_data["content"]
+        get_few_shot_posts().add_post(post, {
+            "line_count": len(post.strip().split("\n")),
+            "language": post_data["language"],
+            "tags": [post_data["tag"]]
+        })
+    
+    st.session_state["current_post"] = post_data
+
 # Main app layout
 def main():
     # Custom header with logo
@@ -123,7 +141,7 @@ def main():
                 st.success("API Key saved!")
         
         st.markdown("### 📊 Post History")
-        history = get_post_history()
+        history = get_post_history(limit=5)
         
         if history:
             for i, post in enumerate(history[-5:]):  # Show last 5 posts
@@ -157,6 +175,15 @@ def main():
         st.divider()
         st.markdown("### ⚙️ About")
         st.info("Created by [Subhash Gupta](https://subh24ai.github.io/)\nPowered by Llama 3.2 90B Vision")
+        
+        load_stats = get_few_shot_posts().get_load_stats()
+        memory_str = f" • {load_stats['memory_bytes'] / 1024 / 1024:.1f} MB" if load_stats['memory_bytes'] else ""
+        st.caption(f"Examples: {load_stats['posts']} posts loaded in {load_stats['load_seconds'] * 1000:.0f} ms{memory_str}")
+        
+        cache_stats = get_response_cache().stats()
+        if cache_stats['hits'] or cache_stats['misses']:
+            st.caption(f"Response cache: {cache_stats['hit_rate']:.0%} hit rate • "
+                       f"{cache_stats['latency_saved_seconds']:.1f}s saved")
 
     # Create tabs with a cleaner interface
     tab1, tab2, tab3 = st.tabs(["✏️ Generator", "⚙️ Settings", "ℹ️ Help"])
@@ -168,7 +195,7 @@ def main():
         with col1:
             st.markdown("### Post Configuration")
             
-            fs = FewShotPosts()
+            fs = get_few_shot_posts()
             tags = fs.get_tags()
             
             # Organize inputs in a grid
@@ -210,6 +237,9 @@ def main():
             
             # Additional options
             include_hashtags = st.checkbox("Include hashtags", value=st.session_state.get("include_hashtags", True), key="hashtag_checkbox")
+            num_candidates = st.slider("Variants to compare", min_value=1, max_value=4, value=1,
+                                       help="Generate several variants at once and pick the best one",
+                                       key="candidates_slider")
             
             # Custom input with better styling
             custom_instructions = st.text_area(
@@ -230,37 +260,54 @@ def main():
                 st.session_state["include_hashtags"] = include_hashtags
                 st.session_state["custom_instructions"] = custom_instructions
                 
-                # Generate with progress
-                progress_bar = st.progress(0)
-                status_text = st.empty()
+                llm_params = {
+                    "model_name": st.session_state.get("model_selector", "llama-3.2-90b-vision-preview"),
+                    "temperature": st.session_state.get("temperature_slider", 0.7),
+                    "max_tokens": st.session_state.get("max_tokens_slider", 1000)
+                }
+                post_data = {
+                    "tag": selected_tag,
+                    "length": selected_length,
+                    "language": selected_language,
+                    "tone": selected_tone
+                }
                 
-                for i in range(5):
-                    status_text.text(f"{'Analyzing your preferences' if i < 2 else 'Crafting your post'}...")
-                    progress_bar.progress((i + 1) * 20)
-                    time.sleep(0.2)
+                if num_candidates > 1:
+                    # Generate the variants concurrently; the user picks one below
+                    with st.spinner(f"Generating {num_candidates} variants..."):
+                        candidates = generate_candidates(
+                            selected_length,
+                            selected_language,
+                            selected_tag,
+                            tone=selected_tone,
+                            hashtags=include_hashtags,
+                            custom_instructions=custom_instructions,
+                            k=num_candidates,
+                            llm_params=llm_params
+                        )
+                    st.session_state.pop("current_post", None)
+                    st.session_state["candidates"] = {"post_data": post_data, "variants": candidates}
+                    st.rerun()
                 
-                with st.spinner("Finalizing your LinkedIn post..."):
-                    post = generate_post(
-                        selected_length, 
-                        selected_language, 
-                        selected_tag,
-                        tone=selected_tone,
-                        hashtags=include_hashtags,
-                        custom_instructions=custom_instructions
-                    )
-                    
-                    # Save to history
-                    post_data = {
-                        "tag": selected_tag,
-                        "length": selected_length,
-                        "language": selected_language,
-                        "tone": selected_tone,
-                        "content": post
-                    }
-                    save_post_history(post_data)
+                # Stream the post into the page as tokens arrive; generation stops
+                # once the post runs past the selected length
+                st.markdown("### Your LinkedIn Post")
+                stream_report = {}
+                post = st.write_stream(stream_post(
+                    selected_length, 
+                    selected_language, 
+                    selected_tag,
+                    tone=selected_tone,
+                    hashtags=include_hashtags,
+                    custom_instructions=custom_instructions,
+                    llm_params=llm_params,
+                    report=stream_report
+                ))
                 
-                # Store in session state
-                st.session_state["current_post"] = post_data
+                # Save to history, reuse as an example and store in session state
+                save_generated_post({**post_data, "content": post.strip()})
+                st.session_state["stream_report"] = stream_report
+                st.session_state.pop("candidates", None)
                 st.rerun()
         
         with col2:
@@ -270,18 +317,46 @@ def main():
             create_feature_card("🔍", "Smart Examples", "AI learns from proven high-engagement posts")
             create_feature_card("⚡", "Quick Generation", "Get professional content in seconds")
         
+        # Show generated variants side by side until one is picked
+        if "candidates" in st.session_state:
+            st.markdown("### Pick a Variant")
+            candidates = st.session_state["candidates"]
+            columns = st.columns(len(candidates["variants"]))
+            for i, (column, variant) in enumerate(zip(columns, candidates["variants"])):
+                with column:
+                    variant_html = variant['text'].replace('\n', '<br>')
+                    st.markdown(f"""
+                    <div class="result-container">
+                        {variant_html}
+                    </div>
+                    """, unsafe_allow_html=True)
+                    st.caption(f"{'Best match • ' if i == 0 else ''}Score {variant['score']:.2f} • "
+                               f"{variant['line_count']} lines")
+                    if st.button("Use this post", key=f"use_candidate_{i}", use_container_width=True):
+                        save_generated_post({**candidates["post_data"], "content": variant["text"]})
+                        st.session_state.pop("stream_report", None)
+                        del st.session_state["candidates"]
+                        st.rerun()
+        
         # Display current post if available
         if "current_post" in st.session_state:
             st.markdown("### Your LinkedIn Post")
             post = st.session_state["current_post"]
             
             # Show the post in a card
+            content_html = post['content'].replace('\n', '<br>')
             st.markdown(f"""
             <div class="result-container">
-                {post['content'].replace('\n', '<br>')}
+                {content_html}
             </div>
             """, unsafe_allow_html=True)
             
+            stream_report = st.session_state.get("stream_report", {})
+            if stream_report.get("stopped_early"):
+                st.caption(f"Stopped at {stream_report['line_count']} lines to fit the {post['length']} length: "
+                           f"saved an estimated {stream_report['tokens_saved']} tokens "
+                           f"(~{stream_report['seconds_saved']:.1f}s)")
+            
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.download_button(
@@ -310,7 +385,7 @@ def main():
             st.subheader("Model Configuration")
             model_name = st.selectbox(
                 "LLM Model", 
-                ["llama-3.2-90b-vision-preview", "gemma-1.1-7b-it", "mixtral-8x7b-32768"],
+                list(AVAILABLE_MODELS),
                 index=0,
                 key="model_selector"
             )
@@ -336,6 +411,52 @@ def main():
         
         if st.button("Save Settings", type="primary", key="save_settings_button"):
             st.success("Settings saved successfully!")
+        
+        st.subheader("Diagnostics")
+        record_timings = st.checkbox("Record stage timings", value=instrumentation.is_enabled(),
+                                     help="Time each generation stage and count LLM tokens",
+                                     key="instrumentation_checkbox")
+        if record_timings:
+            instrumentation.enable()
+        else:
+            instrumentation.disable()
+        
+        stage_stats = instrumentation.snapshot()
+        if stage_stats:
+            st.dataframe([
+                {
+                    "Stage": name,
+                    "Calls": stats["calls"],
+                    "Errors": stats["errors"],
+                    "p50 (ms)": round(stats["p50_ms"], 2),
+                    "p95 (ms)": round(stats["p95_ms"], 2),
+                    "p99 (ms)": round(stats["p99_ms"], 2),
+                    "Prompt tokens": stats["prompt_tokens"],
+                    "Completion tokens": stats["completion_tokens"]
+                }
+                for name, stats in stage_stats.items()
+            ], hide_index=True, use_container_width=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("Export Prometheus metrics", instrumentation.to_prometheus(),
+                                   file_name="post_generator_metrics.prom", mime="text/plain",
+                                   key="export_metrics_button", use_container_width=True)
+            with col2:
+                if st.button("Reset", key="reset_metrics_button", use_container_width=True):
+                    instrumentation.reset()
+                    st.rerun()
+        elif record_timings:
+            st.info("No stages recorded yet. Generate a post to see timings.")
+        
+        corpus_stats = get_few_shot_posts().get_stats()
+        if corpus_stats.total_posts:
+            summary = corpus_stats.summary()
+            percentiles = summary["line_count_percentiles"]
+            top_tags = sorted(summary["tags"].items(), key=lambda item: -item[1])[:5]
+            st.caption(f"Corpus: {summary['total_posts']} posts • "
+                       f"lines p50 {percentiles['p50']} / p95 {percentiles['p95']} • "
+                       f"top tags: {', '.join(tag for tag, _ in top_tags)}")
             
     with tab3:
         st.header("How to Get the Best Results")
@@ -0,0 +1,281 @@
+"""
+Headless HTTP API for post generation
+
+A dependency-free ASGI application, served with any ASGI server (uvicorn is
+used when run as a script). Endpoints:
+
+  POST /generate   JSON body with tag, length, language and optionally tone,
+                   hashtags, custom_instructions, model_name, temperature and
+                   max_tokens; responds {"post": ..., "coalesced": ...}
+  GET  /tags       {"tags": [...]} from the few-shot example store
+  GET  /health     {"status": "ok"}
+  GET  /metrics    Stage timings in the Prometheus text format
+
+Identical /generate requests that arrive while one is in flight share its LLM
+call (single-flight) instead of each making their own.
+
+Usage: python api_server.py [--host 127.0.0.1] [--port 8000] [--workers 1]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from few_shot import get_few_shot_posts
+from post_generator import agenerate_post, get_response_cache, LENGTH_RANGES
+from llm_helper import AVAILABLE_MODELS
+import instrumentation
+from instrumentation import stage
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_SECONDS = 30
+MAX_BODY_BYTES = 64 * 1024
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Bounds of the per-request model settings
+MAX_TEMPERATURE = 2.0
+MAX_TOKENS_LIMIT = 4096
+
+GENERATE_FIELDS = ("tag", "length", "language", "tone", "hashtags", "custom_instructions")
+LLM_PARAM_FIELDS = ("model_name", "temperature", "max_tokens")
+
+class RequestError(Exception):
+    """A request the service rejects; carries the HTTP status code"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one
+
+    The first caller's coroutine runs as its own task, so a caller that
+    disconnects does not cancel the call for the others waiting on it.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, func):
+        """
+        Run func() unless a call with the same key is already in flight
+
+        Returns:
+            Tuple of (result, whether it was shared with an earlier caller)
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task), shared
+
+    def in_flight(self):
+        return len(self._calls)
+
+def parse_generate_request(body):
+    """
+    Validate a /generate body
+
+    Returns:
+        Tuple of (generate_post keyword arguments, llm_params or None)
+    """
+    try:
+        request = json.loads(body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise RequestError("Body must be a JSON object")
+    if not isinstance(request, dict):
+        raise RequestError("Body must be a JSON object")
+
+    unknown = set(request) - set(GENERATE_FIELDS) - set(LLM_PARAM_FIELDS)
+    if unknown:
+        raise RequestError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    if not isinstance(request.get("tag"), str) or not request["tag"]:
+        raise RequestError("tag is required")
+
+    params = {
+        "tag": request["tag"],
+        "length": request.get("length", "Medium"),
+        "language": request.get("language", "English"),
+        "tone": request.get("tone", "Professional"),
+        "hashtags": request.get("hashtags", True),
+        "custom_instructions": request.get("custom_instructions", "")
+    }
+    if params["length"] not in LENGTH_RANGES:
+        raise RequestError(f"length must be one of {', '.join(LENGTH_RANGES)}")
+    if not isinstance(params["hashtags"], bool):
+        raise RequestError("hashtags must be true or false")
+    for field in ("language", "tone", "custom_instructions"):
+        if not isinstance(params[field], str):
+            raise RequestError(f"{field} must be a string")
+
+    llm_params = {field: request[field] for field in LLM_PARAM_FIELDS if field in request}
+    if "model_name" in llm_params and (not isinstance(llm_params["model_name"], str)
+                                       or llm_params["model_name"] not in AVAILABLE_MODELS):
+        raise RequestError(f"model_name must be one of {', '.join(AVAILABLE_MODELS)}")
+    if "temperature" in llm_params:
+        temperature = llm_params["temperature"]
+        if (isinstance(temperature, bool) or not isinstance(temperature, (int, float))
+                or not 0 <= temperature <= MAX_TEMPERATURE):
+            raise RequestError(f"temperature must be a number from 0 to {MAX_TEMPERATURE:g}")
+        llm_params["temperature"] = float(temperature)
+    if "max_tokens" in llm_params:
+        max_tokens = llm_params["max_tokens"]
+        if isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or not 1 <= max_tokens <= MAX_TOKENS_LIMIT:
+            raise RequestError(f"max_tokens must be an integer from 1 to {MAX_TOKENS_LIMIT}")
+    return params, llm_params or None
+
+class GenerationService:
+    """ASGI application serving the generation API"""
+
+    def __init__(self, coalesce=True):
+        self.single_flight = SingleFlight() if coalesce else None
+        self.routes = {
+            ("POST", "/generate"): self.generate,
+            ("GET", "/tags"): self.tags,
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        try:
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler is None:
+                if any(path == scope["path"] for _, path in self.routes):
+                    raise RequestError("Method not allowed", 405)
+                raise RequestError("Not found", 404)
+            status, payload = await handler(await read_body(receive))
+        except RequestError as e:
+            status, payload = e.status_code, {"error": str(e)}
+        except Exception as e:
+            # LLM errors carry the provider's status code (e.g. 429 when rate limited)
+            status = 429 if getattr(e, "status_code", None) == 429 else 502
+            payload = {"error": str(e)[:500]}
+        await send_response(send, status, payload)
+
+    async def lifespan(self, receive, send):
+        """Warm up the example store and caches before the first request is accepted"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await asyncio.to_thread(warm_up)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def generate(self, body):
+        params, llm_params = parse_generate_request(body)
+
+        async def call():
+            return await agenerate_post(
+                params["length"],
+                params["language"],
+                params["tag"],
+                tone=params["tone"],
+                hashtags=params["hashtags"],
+                custom_instructions=params["custom_instructions"],
+                llm_params=llm_params
+            )
+
+        with stage("api.generate"):
+            if self.single_flight is None:
+                post, coalesced = await call(), False
+            else:
+                key = json.dumps([params, llm_params], sort_keys=True)
+                post, coalesced = await self.single_flight.do(key, call)
+        return 200, {"post": post, "coalesced": coalesced}
+
+    async def tags(self, body):
+        # A changed examples file is reloaded here, so keep it off the event loop
+        return 200, {"tags": await asyncio.to_thread(lambda: get_few_shot_posts().get_tags())}
+
+    async def health(self, body):
+        status = {"status": "ok"}
+        if self.single_flight is not None:
+            status.update(llm_calls=self.single_flight.calls, coalesced=self.single_flight.coalesced,
+                          in_flight=self.single_flight.in_flight())
+        return 200, status
+
+    async def metrics(self, body):
+        return 200, instrumentation.to_prometheus()
+
+def warm_up():
+    """
+    Do the slow first-use work up front: load the example store, embed it for
+    semantic example selection and open the response cache
+    """
+    few_shot = get_few_shot_posts()
+    if few_shot.posts:
+        few_shot.get_retriever()
+    get_response_cache()
+
+async def read_body(receive):
+    """Read a request body, rejecting ones over MAX_BODY_BYTES"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise RequestError("Request body too large", 413)
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+async def send_response(send, status, payload):
+    """
+    Send a complete response: JSON for dictionaries, Prometheus text for strings
+
+    The Content-Length header lets the server keep the connection alive.
+    """
+    if isinstance(payload, str):
+        content_type = METRICS_CONTENT_TYPE
+        body = payload.encode("utf-8")
+    else:
+        content_type = "application/json"
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+app = GenerationService()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the post generation HTTP API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Server processes (coalescing is per process)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_keep_alive=KEEP_ALIVE_SECONDS)
+    return 0
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Compare the pretty-printed JSON corpus with the columnar corpus format
+
+For each format, reports file size, FewShotPosts load time (including the
+lookup index) and the Python heap retained by the store.
+
+Usage: python benchmarks/bench_corpus.py [--posts 1000000] [--words 60] [--json results.json]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from corpus_store import write_corpus
+from few_shot import FewShotPosts
+from bench_few_shot import make_corpus
+
+WORDS = ["career", "team", "growth", "learning", "remote", "hiring", "feedback", "product", "mentor", "launch"]
+
+def make_posts(size, words, seed=0):
+    """Synthetic processed posts with texts of about `words` words"""
+    rng = random.Random(seed)
+    posts = make_corpus(size, seed)
+    for post in posts:
+        post["text"] = " ".join(rng.choice(WORDS) for _ in range(words))
+    return posts
+
+def path_size(path):
+    """Size of a file, or of all files in a directory, in bytes"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+def measure(path):
+    """Load time and retained heap of a FewShotPosts over path"""
+    gc.collect()
+    start = time.perf_counter()
+    store = FewShotPosts(path)
+    load_seconds = time.perf_counter() - start
+    del store
+
+    gc.collect()
+    tracemalloc.start()
+    store = FewShotPosts(path)
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return {"size_bytes": path_size(path), "load_seconds": round(load_seconds, 3), "memory_bytes": memory_bytes}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON vs columnar corpus benchmark")
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--words", type=int, default=60, help="Words per synthetic post")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {"posts": args.posts, "words": args.words, "formats": {}}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        posts = make_posts(args.posts, args.words)
+        json_path = os.path.join(tmp_dir, "processed_posts.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(posts, f, indent=4, ensure_ascii=False)
+
+        start = time.perf_counter()
+        corpus_path = os.path.join(tmp_dir, "processed_posts.corpus")
+        write_corpus(posts, corpus_path)
+        results["convert_seconds"] = round(time.perf_counter() - start, 3)
+        del posts
+
+        for name, path in (("json", json_path), ("columnar", corpus_path)):
+            results["formats"][name] = measure(path)
+            result = results["formats"][name]
+            print(f"{name:10} size {result['size_bytes'] / 1e6:8.1f} MB   load {result['load_seconds']:7.3f} s   "
+                  f"heap {result['memory_bytes'] / 1e6:8.1f} MB")
+
+    json_result, columnar_result = results["formats"]["json"], results["formats"]["columnar"]
+    print(f"memory {json_result['memory_bytes'] / columnar_result['memory_bytes']:.1f}x smaller, "
+          f"load {json_result['load_seconds'] / columnar_result['load_seconds']:.1f}x faster")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
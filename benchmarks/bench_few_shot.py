@@ -0,0 +1,94 @@
+"""
+Benchmark indexed FewShotPosts lookups against the original linear filter
+
+Usage: python benchmarks/bench_few_shot.py [corpus sizes...]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from few_shot import FewShotPosts
+
+LANGUAGES = ["English", "Hinglish", "Hindi", "Spanish"]
+TAGS = [f"Topic {i}" for i in range(50)]
+QUERIES = [
+    ("Short", "English", "Topic 1"),
+    ("Medium", "Hinglish", "Topic 7"),
+    ("Long", "english", None),
+    (None, None, "Topic 42"),
+    ("Medium", None, None),
+]
+
+def make_corpus(size, seed=0):
+    """Build a synthetic corpus of processed posts"""
+    rng = random.Random(seed)
+    return [
+        {
+            "text": f"Synthetic post {i}",
+            "line_count": rng.randint(1, 15),
+            "language": rng.choice(LANGUAGES),
+            "tags": rng.sample(TAGS, rng.randint(1, 3))
+        }
+        for i in range(size)
+    ]
+
+def linear_filter(posts, length=None, language=None, tag=None, max_examples=5):
+    """The original list-comprehension implementation of get_filtered_posts"""
+    filtered_posts = posts.copy()
+    if length and filtered_posts:
+        if length == "Short":
+            filtered_posts = [p for p in filtered_posts if p.get('line_count', 0) <= 5]
+        elif length == "Medium":
+            filtered_posts = [p for p in filtered_posts if 6 <= p.get('line_count', 0) <= 10]
+        elif length == "Long":
+            filtered_posts = [p for p in filtered_posts if p.get('line_count', 0) >= 11]
+    if language and filtered_posts:
+        filtered_posts = [p for p in filtered_posts if p.get('language', '').lower() == language.lower()]
+    if tag and filtered_posts:
+        filtered_posts = [p for p in filtered_posts if tag in p.get('tags', [])]
+    return filtered_posts[:max_examples]
+
+def time_per_call(func, repeat):
+    """Average wall time of func() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def run(size):
+    """Benchmark one corpus size and return the results"""
+    posts = make_corpus(size)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "posts.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for post in posts:
+                f.write(json.dumps(post) + "\n")
+
+        start = time.perf_counter()
+        store = FewShotPosts(path)
+        load_seconds = time.perf_counter() - start
+
+    linear_repeat = max(1, 100_000 // size)
+    result = {"size": size, "load_seconds": round(load_seconds, 3), "queries": []}
+    for query in QUERIES:
+        assert store.get_filtered_posts(*query) == linear_filter(store.posts, *query), query
+        result["queries"].append({
+            "query": query,
+            "linear_ms": round(time_per_call(lambda: linear_filter(store.posts, *query), linear_repeat), 4),
+            "indexed_ms": round(time_per_call(lambda: store.get_filtered_posts(*query), 1000), 4)
+        })
+    return result
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    for size in sizes:
+        result = run(size)
+        print(f"\n{size:,} posts (load + index: {result['load_seconds']}s)")
+        for query in result["queries"]:
+            speedup = query["linear_ms"] / query["indexed_ms"] if query["indexed_ms"] else float("inf")
+            print(f"  {str(query['query']):40} linear {query['linear_ms']:>10.4f} ms   "
+                  f"indexed {query['indexed_ms']:>8.4f} ms   ({speedup:,.0f}x)")
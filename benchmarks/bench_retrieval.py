@@ -0,0 +1,101 @@
+"""
+Benchmark ExampleRetriever.search against a dense matrix-vector baseline
+
+The baseline is the original implementation: a (posts x features) matrix
+multiplied by the query vector, after gathering the candidate rows when the
+search is filtered. Embedding a million posts in Python takes minutes, so
+--distinct posts are embedded and tiled up to each corpus size.
+
+Usage: python benchmarks/bench_retrieval.py [--sizes 100000 1000000] [--distinct 20000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from retrieval import ExampleRetriever, embed_texts, embed_text
+
+_rng = random.Random(0)
+WORDS = ["".join(_rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_rng.randint(3, 9))) for _ in range(2000)]
+QUERIES = {
+    "topic": "Career Advice\n",
+    "topic + instructions": "Leadership\nShare a story about a time I failed and what I learned",
+    "long instructions": "Remote Work\n" + " ".join(random.Random(1).choices(WORDS, k=60))
+}
+# Fraction of the corpus passed as candidate_ids (None searches everything)
+CANDIDATE_FRACTIONS = [None, 0.3, 0.01]
+
+def make_texts(count, seed=0):
+    """Synthetic posts of 20-60 words from a fixed vocabulary"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))) for _ in range(count)]
+
+def dense_search(matrix, query, candidate_ids, k):
+    """Top-k scores of the original dense search"""
+    query_vector = embed_text(query, matrix.shape[1])
+    scores = matrix @ query_vector if candidate_ids is None else matrix[candidate_ids] @ query_vector
+    return np.sort(scores)[::-1][:k]
+
+def time_per_call(func, repeat):
+    """Best wall time of func() over repeat calls, in milliseconds"""
+    func()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run(size, distinct, repeat, k=15):
+    rows = embed_texts(make_texts(min(distinct, size)))
+    matrix = np.tile(rows, (-(-size // len(rows)), 1))[:size]
+    retriever = ExampleRetriever(np.ascontiguousarray(matrix.T), matrix.shape[1])
+    rng = np.random.default_rng(0)
+
+    result = {"size": size, "searches": []}
+    for fraction in CANDIDATE_FRACTIONS:
+        candidate_ids = None if fraction is None else np.sort(rng.choice(size, int(size * fraction), replace=False))
+        for name, query in QUERIES.items():
+            post_ids = retriever.search(query, candidate_ids, k)
+            # Ties may be ordered differently, so compare the scores found
+            query_vector = embed_text(query, matrix.shape[1])
+            found = matrix[post_ids] @ query_vector
+            assert np.allclose(found, dense_search(matrix, query, candidate_ids, k), atol=1e-5), (name, fraction)
+            result["searches"].append({
+                "query": name,
+                "query_features": int(np.count_nonzero(query_vector)),
+                "candidates": size if candidate_ids is None else len(candidate_ids),
+                "dense_ms": round(time_per_call(lambda: dense_search(matrix, query, candidate_ids, k), repeat), 3),
+                "search_ms": round(time_per_call(lambda: retriever.search(query, candidate_ids, k), repeat), 3)
+            })
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Semantic example search benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--distinct", type=int, default=20_000, help="Distinct posts embedded per corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        result = run(size, args.distinct, args.repeat)
+        results.append(result)
+        print(f"\n{size:,} posts x 256 features")
+        for search in result["searches"]:
+            speedup = search["dense_ms"] / search["search_ms"] if search["search_ms"] else float("inf")
+            print(f"  {search['query']:22} {search['query_features']:3} features  "
+                  f"{search['candidates']:>9,} candidates   dense {search['dense_ms']:8.2f} ms   "
+                  f"search {search['search_ms']:8.2f} ms   ({speedup:.1f}x)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
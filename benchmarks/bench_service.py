@@ -0,0 +1,161 @@
+"""
+Load-test the HTTP generation service against the offline fake LLM
+
+Starts api_server in-process under uvicorn, then fires --requests /generate
+calls with --concurrency clients over keep-alive connections. Requests cycle
+through --distinct parameter sets, so concurrent duplicates can be coalesced.
+Each mode (single-flight on and off) reports throughput, latency
+percentiles, LLM calls and TCP connections opened.
+
+Usage: python benchmarks/bench_service.py [--requests 500] [--concurrency 50] [--distinct 10]
+                                          [--latency 0.2] [--no-keepalive] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import httpx
+import uvicorn
+import llm_helper
+import instrumentation
+from fake_llm import fake_client_factory
+from api_server import GenerationService, KEEP_ALIVE_SECONDS
+from bench_suite import percentiles
+
+TAGS = ["Career Advice", "Leadership", "Remote Work", "Hiring", "Product Launch"]
+LENGTHS = ["Short", "Medium", "Long"]
+
+def make_requests(count, distinct):
+    """Request bodies cycling through `distinct` parameter sets"""
+    bodies = [
+        {"tag": TAGS[i % len(TAGS)], "length": LENGTHS[i % len(LENGTHS)], "language": "English",
+         "custom_instructions": f"Variant {i}"}
+        for i in range(distinct)
+    ]
+    return [bodies[i % distinct] for i in range(count)]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class ServerThread(threading.Thread):
+    """Runs a uvicorn server for an ASGI app until stop() is called"""
+
+    def __init__(self, app, port):
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                                    timeout_keep_alive=KEEP_ALIVE_SECONDS))
+        self.connections = 0
+        # Count accepted TCP connections by wrapping uvicorn's protocol factory
+        config = self.server.config
+        config.load()
+        protocol_class = config.http_protocol_class
+        server_thread = self
+
+        class CountingProtocol(protocol_class):
+            def connection_made(self, transport):
+                server_thread.connections += 1
+                super().connection_made(transport)
+
+        config.http_protocol_class = CountingProtocol
+
+    def run(self):
+        self.server.run()
+
+    def wait_started(self):
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join()
+
+async def run_load(url, bodies, concurrency, keepalive):
+    """Send all requests with `concurrency` workers; returns per-request latencies"""
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency if keepalive else 0)
+    headers = {} if keepalive else {"Connection": "close"}
+    latencies = []
+    errors = 0
+    queue = list(reversed(bodies))
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, headers=headers, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while queue:
+                body = queue.pop()
+                start = time.perf_counter()
+                response = await client.post("/generate", json=body)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+def bench_mode(args, coalesce):
+    instrumentation.reset()
+    port = free_port()
+    server = ServerThread(GenerationService(coalesce=coalesce), port)
+    server.start()
+    server.wait_started()
+    try:
+        bodies = make_requests(args.requests, args.distinct)
+        start = time.perf_counter()
+        latencies, errors = asyncio.run(run_load(f"http://127.0.0.1:{port}", bodies, args.concurrency,
+                                                 not args.no_keepalive))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    llm_calls = instrumentation.snapshot().get("llm.invoke", {}).get("calls", 0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "llm_calls": llm_calls,
+        "connections": server.connections,
+        **percentiles(latencies)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP generation service load test")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct request bodies")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    parser.add_argument("--no-keepalive", action="store_true", help="Open a new connection per request")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    llm_helper.set_client_factory(fake_client_factory(latency=args.latency))
+    instrumentation.enable()
+
+    results = {"config": vars(args), "modes": {}}
+    # Keep post history and caches out of the working tree
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            for name, coalesce in (("single_flight", True), ("no_coalescing", False)):
+                result = results["modes"][name] = bench_mode(args, coalesce)
+                print(f"{name:14} {result['requests_per_second']:8.1f} req/s   p50 {result['p50_ms']:7.1f} ms   "
+                      f"p95 {result['p95_ms']:7.1f} ms   LLM calls {result['llm_calls']:4}   "
+                      f"connections {result['connections']:4}   errors {result['errors']}")
+        finally:
+            os.chdir(cwd)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measure cold-start cost of the app and CLI entry points
+
+For each module, a fresh interpreter runs `python -X importtime -c "import <module>"`
+and the module's cumulative import time is read from the importtime output.
+Time-to-first-render runs App.py once through Streamlit's AppTest harness.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--json results.json] [--skip-app]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["llm_helper", "few_shot", "post_generator", "bulk_generate", "preprocess"]
+
+FIRST_RENDER_SCRIPT = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("App.py", default_timeout=120)
+app.run()
+if app.exception:
+    raise SystemExit(app.exception[0].message)
+print(time.perf_counter() - start)
+"""
+
+def run_python(args):
+    """Run a fresh interpreter in the repo root and return (exit status, stdout, stderr, wall seconds)"""
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True)
+    return result.returncode, result.stdout, result.stderr, time.perf_counter() - start
+
+def measure_import(module):
+    """Cumulative import time of a module and the interpreter's wall time, in seconds"""
+    returncode, _, stderr, wall = run_python(["-X", "importtime", "-c", f"import {module}"])
+    # importtime also logs modules whose import failed, so check the exit status first
+    if returncode != 0:
+        raise RuntimeError(f"Could not import {module}:\n{stderr[-2000:]}")
+    for line in reversed(stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6, wall
+    raise RuntimeError(f"Could not import {module}:\n{stderr[-2000:]}")
+
+def measure_first_render():
+    """Seconds from importing Streamlit's test harness to the end of App.py's first run"""
+    returncode, stdout, stderr, wall = run_python(["-c", FIRST_RENDER_SCRIPT])
+    if returncode != 0:
+        raise RuntimeError(f"App.py did not render:\n{stderr[-2000:]}")
+    try:
+        return float(stdout.strip().splitlines()[-1]), wall
+    except (IndexError, ValueError):
+        raise RuntimeError(f"App.py did not render:\n{stderr[-2000:]}")
+
+def summarise(samples):
+    """Median and minimum of a list of timings"""
+    return {"median": round(statistics.median(samples), 4), "min": round(min(samples), 4)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--skip-app", action="store_true", help="Skip the Streamlit first-render measurement")
+    args = parser.parse_args(argv)
+
+    results = {"python": sys.version.split()[0], "runs": args.runs, "imports": {}}
+    for module in MODULES:
+        samples = [measure_import(module) for _ in range(args.runs)]
+        result = {
+            "import_seconds": summarise([s[0] for s in samples]),
+            "process_seconds": summarise([s[1] for s in samples])
+        }
+        results["imports"][module] = result
+        print(f"{module:16} import {result['import_seconds']['median'] * 1000:8.1f} ms   "
+              f"process {result['process_seconds']['median'] * 1000:8.1f} ms")
+
+    if not args.skip_app:
+        samples = [measure_first_render() for _ in range(args.runs)]
+        results["first_render_seconds"] = summarise([s[0] for s in samples])
+        print(f"{'App.py':16} first render {results['first_render_seconds']['median'] * 1000:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == "__main__":
+    main()
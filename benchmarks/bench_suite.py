@@ -0,0 +1,213 @@
+"""
+Offline benchmark suite using the fake LLM backend (no Groq key needed)
+
+Measures, over a synthetic corpus:
+  - process_posts throughput (posts/s)
+  - FewShotPosts.get_filtered_posts lookup latency
+  - get_prompt build time
+  - post history write and read cost
+  - FewShotPosts.add_post cost (including periodic compaction)
+  - end-to-end generate_post latency (p50/p95/p99)
+
+Everything runs in a temporary working directory, and results are written as
+JSON so they can be compared between releases.
+
+Usage: python benchmarks/bench_suite.py --posts 10000 --latency 0.05 --jitter 0.02 --failure-rate 0.01 --json results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import llm_helper
+import instrumentation
+from fake_llm import fake_client_factory
+from bench_few_shot import make_corpus
+
+def percentiles(samples):
+    """p50/p95/p99, mean and max of a list of timings in seconds, reported in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": round(rank(50) * 1000, 4),
+        "p95_ms": round(rank(95) * 1000, 4),
+        "p99_ms": round(rank(99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4)
+    }
+
+def timed(func, repeat):
+    """Run func() repeat times and return the individual timings"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+@contextlib.contextmanager
+def quiet():
+    """Silence progress bars and prints from the code under test"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+def bench_process_posts(args):
+    import preprocess
+
+    raw_posts = [{"text": post["text"]} for post in make_corpus(args.preprocess_posts, seed=1)]
+    with open("raw_posts.json", "w", encoding="utf-8") as f:
+        json.dump(raw_posts, f)
+
+    start = time.perf_counter()
+    with quiet():
+        preprocess.process_posts("raw_posts.json", "data/preprocessed.json", max_workers=args.workers,
+                                 use_cache=False)
+    elapsed = time.perf_counter() - start
+    return {
+        "posts": len(raw_posts),
+        "workers": args.workers,
+        "seconds": round(elapsed, 4),
+        "posts_per_second": round(len(raw_posts) / elapsed, 2)
+    }
+
+def bench_filtered_posts(store, args):
+    queries = [("Short", "English", "Topic 1"), ("Medium", None, None), (None, "Hindi", "Topic 9"), ("Long", "Hinglish", None)]
+    start = time.perf_counter()
+    store.get_filtered_posts("Short", "English", "Topic 1")
+    cold = time.perf_counter() - start
+    samples = timed(lambda: store.get_filtered_posts(*random.choice(queries)), args.lookups)
+    return {"cold_ms": round(cold * 1000, 4), **percentiles(samples)}
+
+def bench_get_prompt(args):
+    import post_generator
+
+    def build():
+        post_generator.get_prompt(random.choice(["Short", "Medium", "Long"]), "English",
+                                  f"Topic {random.randint(0, 49)}", custom_instructions="Mention remote teams")
+    build()  # Embeds the corpus once; steady-state timings follow
+    return percentiles(timed(build, args.lookups))
+
+def bench_history(args):
+    import post_generator
+
+    entry = {"tag": "Topic 1", "length": "Short", "language": "English", "tone": "Professional",
+             "content": "Synthetic post\n" * 5}
+    writes = timed(lambda: post_generator.save_post_history(dict(entry)), args.history_ops)
+    reads = timed(lambda: post_generator.get_post_history(limit=5), args.history_ops)
+    return {"write": percentiles(writes), "read_latest_5": percentiles(reads)}
+
+def bench_add_post(store, args):
+    samples = timed(lambda: store.add_post("Synthetic example\n" * 3, {"line_count": 3, "language": "English",
+                                                                      "tags": [f"Topic {random.randint(0, 49)}"]}),
+                    args.history_ops)
+    return percentiles(samples)
+
+def bench_generate_post(args):
+    import post_generator
+
+    samples = []
+    errors = 0
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        try:
+            post_generator.generate_post(random.choice(["Short", "Medium", "Long"]), "English",
+                                         f"Topic {random.randint(0, 49)}")
+        except Exception:
+            errors += 1
+            continue
+        samples.append(time.perf_counter() - start)
+    return {"errors": errors, "error_rate": round(errors / args.requests, 4), **(percentiles(samples) or {})}
+
+def run(args):
+    random.seed(args.seed)
+    if args.instrument:
+        instrumentation.enable()
+    llm_helper.set_client_factory(fake_client_factory(
+        latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+        post_lines=args.post_lines, words_per_line=args.words_per_line
+    ))
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": {}
+    }
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            os.makedirs("data", exist_ok=True)
+            with open("data/processed_posts.json", "w", encoding="utf-8") as f:
+                json.dump(make_corpus(args.posts, seed=args.seed), f)
+
+            from few_shot import get_few_shot_posts
+            start = time.perf_counter()
+            store = get_few_shot_posts()
+            results["results"]["corpus_load"] = {"posts": args.posts,
+                                                 "seconds": round(time.perf_counter() - start, 4)}
+
+            benchmarks = [
+                ("process_posts", lambda: bench_process_posts(args)),
+                ("get_filtered_posts", lambda: bench_filtered_posts(store, args)),
+                ("get_prompt", lambda: bench_get_prompt(args)),
+                ("history", lambda: bench_history(args)),
+                ("add_post", lambda: bench_add_post(store, args)),
+                ("generate_post", lambda: bench_generate_post(args)),
+            ]
+            for name, bench in benchmarks:
+                if name in args.skip:
+                    continue
+                results["results"][name] = bench()
+                print(f"{name:20} {json.dumps(results['results'][name])}")
+            if args.instrument:
+                results["stages"] = instrumentation.snapshot()
+        finally:
+            os.chdir(previous_dir)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with a fake LLM backend")
+    parser.add_argument("--posts", type=int, default=10_000, help="Synthetic example corpus size")
+    parser.add_argument("--preprocess-posts", type=int, default=200, help="Raw posts fed to process_posts")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent workers for process_posts")
+    parser.add_argument("--requests", type=int, default=200, help="generate_post calls")
+    parser.add_argument("--lookups", type=int, default=1000, help="Lookup and prompt-build iterations")
+    parser.add_argument("--history-ops", type=int, default=200, help="History writes/reads and add_post calls")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Fake LLM latency jitter in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fake LLM failure probability")
+    parser.add_argument("--post-lines", type=int, default=6, help="Lines in each fake generated post")
+    parser.add_argument("--words-per-line", type=int, default=10, help="Words per fake generated line")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", nargs="*", default=[], help="Benchmarks to skip")
+    parser.add_argument("--instrument", action="store_true", help="Record and report per-stage timings")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    results = run(args)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {json_path}")
+
+if __name__ == "__main__":
+    main()
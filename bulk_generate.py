@@ -0,0 +1,156 @@
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from tqdm import tqdm
+from post_generator import generate_post, save_post_history_batch
+from retry import DEFAULT_MAX_RETRIES, RateLimiter, call_with_retries
+
+DEFAULT_WORKERS = 4
+DEFAULT_REQUESTS_PER_MINUTE = 30
+
+def parse_bool(value, default=True):
+    """Parse a CSV/JSON boolean such as "yes", "false" or 1"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def load_jobs(file_path):
+    """
+    Load a matrix of generation parameters from CSV or JSONL
+    
+    Each row needs a tag; length, language, tone, hashtags and
+    custom_instructions are optional.
+    
+    Args:
+        file_path: Path to a .csv or .jsonl file
+        
+    Returns:
+        List of job dictionaries
+        
+    Raises:
+        ValueError: If a row has no tag, naming the file line it is on
+    """
+    with open(file_path, encoding='utf-8', newline='') as f:
+        if str(file_path).endswith('.csv'):
+            reader = csv.DictReader(f)
+            rows = [(reader.line_num, row) for row in reader]
+        else:
+            rows = [(line_number, json.loads(line)) for line_number, line in enumerate(f, 1) if line.strip()]
+    
+    jobs = []
+    for line_number, row in rows:
+        if not row.get("tag"):
+            raise ValueError(f"{file_path} line {line_number}: missing required field 'tag'")
+        jobs.append({
+            "tag": row["tag"],
+            "length": row.get("length") or "Medium",
+            "language": row.get("language") or "English",
+            "tone": row.get("tone") or "Professional",
+            "hashtags": parse_bool(row.get("hashtags")),
+            "custom_instructions": row.get("custom_instructions") or ""
+        })
+    return jobs
+
+def generate_batch(jobs, output_path, max_workers=DEFAULT_WORKERS,
+                   requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                   max_retries=DEFAULT_MAX_RETRIES, save_history=True):
+    """
+    Generate posts for many parameter combinations concurrently
+    
+    Results are appended to a JSONL file as each post completes (tagged with
+    the job's index, so the file can be re-ordered if needed). Successful
+    posts are saved to post history in one write at the end.
+    
+    Args:
+        jobs: List of job dictionaries (see load_jobs)
+        output_path: JSONL file to stream results to
+        max_workers: Number of concurrent generation requests
+        requests_per_minute: Upper bound on request starts per minute (0 for no limit)
+        max_retries: Retries per job on transient or rate-limit errors
+        save_history: Add successful posts to post history
+        
+    Returns:
+        Tuple of (number of successful posts, number of failures)
+    """
+    Path(output_path).parent.mkdir(exist_ok=True, parents=True)
+    rate_limiter = RateLimiter(requests_per_minute)
+    
+    def run_job(job):
+        def attempt():
+            rate_limiter.acquire()
+            return generate_post(
+                job["length"],
+                job["language"],
+                job["tag"],
+                tone=job["tone"],
+                hashtags=job["hashtags"],
+                custom_instructions=job["custom_instructions"]
+            )
+        return call_with_retries(attempt, max_retries)
+    
+    history_entries = []
+    failures = 0
+    with open(output_path, 'w', encoding='utf-8') as outfile, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job, job): index for index, job in enumerate(jobs)}
+        
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Generating posts"):
+            index = futures[future]
+            job = jobs[index]
+            result = {"index": index, **job}
+            try:
+                result["content"] = future.result()
+                history_entries.append({
+                    "tag": job["tag"],
+                    "length": job["length"],
+                    "language": job["language"],
+                    "tone": job["tone"],
+                    "content": result["content"]
+                })
+            except Exception as e:
+                failures += 1
+                result["error"] = str(e)[:500]
+            
+            outfile.write(json.dumps(result, ensure_ascii=False) + '\n')
+            outfile.flush()
+    
+    if save_history and history_entries:
+        save_post_history_batch(history_entries)
+    
+    return len(history_entries), failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate LinkedIn posts in bulk from a parameter matrix")
+    parser.add_argument("jobs", help="CSV or JSONL file with tag, length, language, tone, hashtags, custom_instructions")
+    parser.add_argument("-o", "--output", default="data/bulk_posts.jsonl", help="JSONL file for results")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="Maximum requests per minute (0 for no limit)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_RETRIES, help="Retries per post")
+    parser.add_argument("--no-history", action="store_true", help="Do not save results to post history")
+    args = parser.parse_args(argv)
+    
+    try:
+        jobs = load_jobs(args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Generating {len(jobs)} posts with {args.workers} workers...")
+    succeeded, failed = generate_batch(
+        jobs,
+        args.output,
+        max_workers=args.workers,
+        requests_per_minute=args.rpm,
+        max_retries=args.retries,
+        save_history=not args.no_history
+    )
+    print(f"Done: {succeeded} generated, {failed} failed. Results saved to {args.output}")
+    return 0 if not failed else 1
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
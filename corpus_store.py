@@ -0,0 +1,264 @@
+"""
+Compact columnar storage for the processed example corpus
+
+A corpus is a directory holding:
+  meta.json           format version, post count, language and tag vocabularies
+  text.bin            UTF-8 post texts, concatenated
+  text_offsets.npy    int64, start of each post's text in text.bin (n + 1 entries)
+  line_counts.npy     int32, -1 where a post has no line_count
+  language_ids.npy    int32 index into the language vocabulary, -1 where missing
+  tag_ids.npy         int32 index into the tag vocabulary, all posts' tags flattened
+  tag_offsets.npy     int64, start of each post's tags in tag_ids (n + 1 entries)
+  cluster_ids.npy     int64 near-duplicate cluster, -1 where missing (absent in older corpora)
+  flags.npy           uint8, HAS_TEXT / HAS_TAGS bits
+  extras.bin          JSON of any other keys, per post (empty for most posts)
+  extra_offsets.npy   int64 (n + 1 entries)
+
+Arrays are memory-mapped and the text blob is mmap'd, so opening a corpus
+costs the same regardless of its size and posts are decoded only on access.
+
+Usage: python corpus_store.py data/processed_posts.json data/processed_posts.corpus
+"""
+import json
+import mmap
+import os
+import shutil
+import sys
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+import numpy as np
+
+CORPUS_SUFFIX = ".corpus"
+CORPUS_FORMAT_VERSION = 1
+
+HAS_TEXT = 1
+HAS_TAGS = 2
+
+def is_corpus_path(path):
+    """Whether a path names a columnar corpus (rather than a JSON/JSONL file)"""
+    return str(path).endswith(CORPUS_SUFFIX) or os.path.isdir(path)
+
+def write_corpus(posts, path):
+    """
+    Write posts to a columnar corpus directory, replacing any existing one
+
+    The corpus is built next to the destination and swapped in at the end, so
+    readers never see a half-written corpus.
+
+    Args:
+        posts: Iterable of post dictionaries (read once)
+        path: Corpus directory to write
+
+    Returns:
+        Number of posts written
+    """
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+    if temp_path.exists():
+        shutil.rmtree(temp_path)
+    temp_path.mkdir(parents=True)
+
+    languages = {}
+    tags = {}
+    text_offsets = array('q', [0])
+    line_counts = array('i')
+    language_ids = array('i')
+    tag_ids = array('i')
+    tag_offsets = array('q', [0])
+    cluster_ids = array('q')
+    flags = bytearray()
+    extra_offsets = array('q', [0])
+
+    with open(temp_path / "text.bin", "wb") as text_file, open(temp_path / "extras.bin", "wb") as extras_file:
+        for post in posts:
+            post_flags = 0
+            extras = {}
+            for key, value in post.items():
+                if key == 'text' and isinstance(value, str):
+                    continue
+                if key == 'line_count' and type(value) is int and 0 <= value < 2 ** 31:
+                    continue
+                if key == 'language' and isinstance(value, str):
+                    continue
+                if key == 'tags' and isinstance(value, list) and all(isinstance(tag, str) for tag in value):
+                    continue
+                if key == 'cluster_id' and type(value) is int and 0 <= value < 2 ** 63:
+                    continue
+                extras[key] = value
+
+            text = post.get('text')
+            if 'text' not in extras and text is not None:
+                post_flags |= HAS_TEXT
+                text_offsets.append(text_offsets[-1] + text_file.write(text.encode('utf-8')))
+            else:
+                text_offsets.append(text_offsets[-1])
+
+            line_counts.append(post['line_count'] if 'line_count' in post and 'line_count' not in extras else -1)
+
+            if 'language' in post and 'language' not in extras:
+                language_ids.append(languages.setdefault(post['language'], len(languages)))
+            else:
+                language_ids.append(-1)
+
+            if 'tags' in post and 'tags' not in extras:
+                post_flags |= HAS_TAGS
+                tag_ids.extend(tags.setdefault(tag, len(tags)) for tag in post['tags'])
+            tag_offsets.append(len(tag_ids))
+            cluster_ids.append(post['cluster_id'] if 'cluster_id' in post and 'cluster_id' not in extras else -1)
+
+            if extras:
+                data = json.dumps(extras, ensure_ascii=False).encode('utf-8')
+                extra_offsets.append(extra_offsets[-1] + extras_file.write(data))
+            else:
+                extra_offsets.append(extra_offsets[-1])
+            flags.append(post_flags)
+
+    columns = {
+        "text_offsets": np.frombuffer(text_offsets, dtype=np.int64),
+        "line_counts": np.frombuffer(line_counts, dtype=np.int32),
+        "language_ids": np.frombuffer(language_ids, dtype=np.int32),
+        "tag_ids": np.frombuffer(tag_ids, dtype=np.int32),
+        "tag_offsets": np.frombuffer(tag_offsets, dtype=np.int64),
+        "cluster_ids": np.frombuffer(cluster_ids, dtype=np.int64),
+        "flags": np.frombuffer(bytes(flags), dtype=np.uint8),
+        "extra_offsets": np.frombuffer(extra_offsets, dtype=np.int64)
+    }
+    for name, column in columns.items():
+        np.save(temp_path / f"{name}.npy", column)
+
+    meta = {
+        "format_version": CORPUS_FORMAT_VERSION,
+        "posts": len(flags),
+        "languages": list(languages),
+        "tags": list(tags)
+    }
+    with open(temp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Swap the new corpus in; the old one is removed only after the rename
+    old_path = path.with_name(path.name + ".old")
+    if old_path.exists():
+        shutil.rmtree(old_path)
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(temp_path, path)
+    if old_path.exists():
+        shutil.rmtree(old_path)
+    return len(flags)
+
+def map_blob(file_path):
+    """Memory-map a binary file read-only (empty files map to b'')"""
+    if os.path.getsize(file_path) == 0:
+        return b''
+    with open(file_path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class PostCorpus(Sequence):
+    """
+    Read-only, list-like view of a columnar corpus
+
+    Indexing decodes one post into a dictionary equal to the one that was
+    written; slicing returns a list. Posts appended with append() are held in
+    memory after the stored ones.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != CORPUS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format version: {meta.get('format_version')}")
+
+        self.size = meta["posts"]
+        self.language_names = meta["languages"]
+        self.tag_names = meta["tags"]
+
+        def column(name):
+            return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+        self.text_offsets = column("text_offsets")
+        self.line_counts = column("line_counts")
+        self.language_ids = column("language_ids")
+        self.tag_ids = column("tag_ids")
+        self.tag_offsets = column("tag_offsets")
+        self.flags = column("flags")
+        self.cluster_ids = column("cluster_ids") if (self.path / "cluster_ids.npy").exists() else None
+        self.extra_offsets = column("extra_offsets")
+        self._text = map_blob(self.path / "text.bin")
+        self._extras = map_blob(self.path / "extras.bin")
+
+        self.appended = []
+
+    def __len__(self):
+        return self.size + len(self.appended)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("corpus index out of range")
+        if index >= self.size:
+            return self.appended[index - self.size]
+        return self._decode(index)
+
+    def _decode(self, index):
+        """Build the dictionary for a stored post"""
+        post = {}
+        flags = int(self.flags[index])
+        if flags & HAS_TEXT:
+            post['text'] = self._text[int(self.text_offsets[index]):int(self.text_offsets[index + 1])].decode('utf-8')
+
+        line_count = int(self.line_counts[index])
+        if line_count >= 0:
+            post['line_count'] = line_count
+
+        language_id = int(self.language_ids[index])
+        if language_id >= 0:
+            post['language'] = self.language_names[language_id]
+
+        if flags & HAS_TAGS:
+            tag_ids = self.tag_ids[int(self.tag_offsets[index]):int(self.tag_offsets[index + 1])]
+            post['tags'] = [self.tag_names[tag_id] for tag_id in tag_ids.tolist()]
+
+        if self.cluster_ids is not None and self.cluster_ids[index] >= 0:
+            post['cluster_id'] = int(self.cluster_ids[index])
+
+        start, end = int(self.extra_offsets[index]), int(self.extra_offsets[index + 1])
+        if start < end:
+            post.update(json.loads(self._extras[start:end].decode('utf-8')))
+        return post
+
+    def append(self, post):
+        """Add a post in memory (it is not written to the corpus directory)"""
+        self.appended.append(post)
+
+    def texts(self):
+        """Iterate over post texts without decoding the other fields"""
+        for index in range(self.size):
+            if self.flags[index] & HAS_TEXT:
+                yield self._text[int(self.text_offsets[index]):int(self.text_offsets[index + 1])].decode('utf-8')
+            else:
+                yield self._decode(index).get('text', '')
+        for post in self.appended:
+            yield post.get('text', '')
+
+def iter_posts_file(file_path):
+    """Iterate over the posts of a JSON array or JSONL file"""
+    with open(file_path, encoding="utf-8") as f:
+        if str(file_path).endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    count = write_corpus(iter_posts_file(sys.argv[1]), sys.argv[2])
+    print(f"Wrote {count} posts to {sys.argv[2]}")
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import random
+import re
+import time
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+FILLER_WORDS = ("growth", "team", "career", "learning", "leadership", "impact", "journey",
+                "mentor", "skills", "opportunity", "network", "success", "feedback", "goals")
+
+class FakeLLMError(Exception):
+    """Simulated LLM failure; carries status_code like a Groq API error"""
+
+    def __init__(self, message="Simulated LLM failure", status_code=429):
+        super().__init__(message)
+        self.status_code = status_code
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model for local runs and benchmarks (no Groq key needed)
+
+    Sleeps for `latency` seconds (plus up to `jitter` seconds either way) per
+    call and fails with probability `failure_rate`. Metadata prompts get a
+    small JSON object; everything else gets `post_text`, or a generated post
+    of `post_lines` lines with `words_per_line` words when post_lines is set.
+    When streamed, the response arrives word by word, `token_latency`
+    seconds apart, after the initial latency. Async calls wait with
+    asyncio.sleep, like a real async HTTP client, without holding a thread.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    token_latency: float = 0.0
+    failure_rate: float = 0.0
+    post_text: str = "Excited to share a new milestone!\nHard work pays off.\n#Growth"
+    post_lines: int = 0
+    words_per_line: int = 8
+    model_name: str = "fake-chat-model"
+    temperature: float = 0.7
+    max_tokens: int = 1000
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def _respond(self, prompt):
+        """Build the response text for a prompt"""
+        tag_groups = re.findall(r'^\s*- Canonical "(.+?)": (.+)$', prompt, flags=re.MULTILINE)
+        if "JSON RESPONSE" in prompt and tag_groups:
+            # Ambiguous tag resolution: merge every candidate into its canonical tag
+            return json.dumps({
+                tag: canonical for canonical, tags in tag_groups for tag in re.findall(r'"(.+?)"', tags)
+            })
+        batch_indexes = re.findall(r"^\s*Post (\d+):", prompt, flags=re.MULTILINE)
+        if "JSON RESPONSE" in prompt and batch_indexes:
+            return json.dumps([
+                {"index": int(i), "line_count": 3, "language": "English", "tags": ["Career Advice"]}
+                for i in batch_indexes
+            ])
+        if "JSON RESPONSE" in prompt:
+            return json.dumps({
+                "line_count": 3,
+                "language": "English",
+                "tags": ["Career Advice"]
+            })
+        if self.post_lines:
+            lines = [" ".join(random.choice(FILLER_WORDS) for _ in range(self.words_per_line)).capitalize() + "."
+                     for _ in range(self.post_lines)]
+            return "\n".join(lines) + "\n#Growth #Career"
+        return self.post_text
+
+    def _delay(self):
+        """Simulated latency of one call"""
+        delay = self.latency + random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        return max(0.0, delay)
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise FakeLLMError()
+
+    def _wait(self):
+        """Simulate network latency and random failures"""
+        time.sleep(self._delay())
+        self._maybe_fail()
+
+    async def _await(self):
+        """Async variant of _wait"""
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._wait()
+        prompt = "\n".join(str(m.content) for m in messages)
+        message = AIMessage(content=self._respond(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._wait()
+        prompt = "\n".join(str(m.content) for m in messages)
+        for token in re.findall(r"\S+\s*", self._respond(prompt)):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await self._await()
+        prompt = "\n".join(str(m.content) for m in messages)
+        message = AIMessage(content=self._respond(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await self._await()
+        prompt = "\n".join(str(m.content) for m in messages)
+        for token in re.findall(r"\S+\s*", self._respond(prompt)):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+def fake_client_factory(**settings):
+    """
+    Build a llm_helper client factory returning FakeChatModel instances
+
+    Usage: llm_helper.set_client_factory(fake_client_factory(latency=0.2, failure_rate=0.05))
+    """
+    def factory(model_name, temperature, max_tokens, api_key):
+        return FakeChatModel(model_name=model_name, temperature=temperature, max_tokens=max_tokens, **settings)
+    return factory
+
+if __name__ == "__main__":
+    llm = FakeChatModel(latency=0.1)
+    print(llm.invoke("Generate a LinkedIn post").content)
@@ -1,31 +1,225 @@
 import json
 import os
+import time
+import heapq
+import itertools
+import bisect
+import hashlib
+import threading
+import tracemalloc
+from array import array
 from pathlib import Path
+from instrumentation import instrumented
+
+# JSON, JSONL, or a columnar corpus directory written by corpus_store
+DEFAULT_POSTS_PATH = os.getenv("FEW_SHOT_POSTS_PATH", "data/processed_posts.json")
+LENGTH_BUCKETS = ("Short", "Medium", "Long")
+# Trace the heap used by shared loads (slows loading several times; for diagnostics)
+MEASURE_LOAD_MEMORY = os.getenv("FEW_SHOT_MEASURE_MEMORY", "0") == "1"
+
+# Posts added to a JSON or columnar corpus go to an append-only JSONL segment next
+# to it, which is folded back in once it holds COMPACT_RATIO of the base (at least
+# COMPACT_MIN_POSTS posts), so each add costs O(1) amortised
+SEGMENT_SUFFIX = ".append.jsonl"
+COMPACT_MIN_POSTS = 1000
+COMPACT_RATIO = 0.5
+
+# Similar-post searches fetch this many times max_examples, widening by the same
+# factor until enough remain after near duplicates (posts sharing a cluster_id)
+# are dropped
+DIVERSITY_OVERFETCH = 3
+
+# Process-wide example stores shared by the app and the generator, keyed by file path
+_shared_stores = {}
+_shared_lock = threading.Lock()
+
+def get_file_signature(file_path):
+    """Cheap change marker for a file: (mtime in ns, size), or None if it is missing"""
+    if os.path.isdir(file_path):
+        # A corpus directory is swapped in whole, with meta.json written last
+        file_path = os.path.join(file_path, "meta.json")
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_segment_path(file_path):
+    """Path of the append segment holding posts added since the last compaction"""
+    return str(file_path).rstrip("/\\") + SEGMENT_SUFFIX
+
+def read_jsonl(file_path):
+    """Read the records of a JSONL file, skipping a torn final line"""
+    records = []
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+def get_few_shot_posts(file_path=DEFAULT_POSTS_PATH):
+    """
+    Get the process-wide FewShotPosts for a file
+    
+    The store is loaded once and reused on every call. It is reloaded only
+    when the file's mtime/size changes and its content hash differs too, so
+    touching the file does not trigger a reparse, or when another process
+    appended to its segment.
+    
+    Args:
+        file_path: Path to the processed posts file
+        
+    Returns:
+        Shared FewShotPosts instance
+    """
+    with _shared_lock:
+        store = _shared_stores.get(file_path)
+        
+        if store is not None and get_file_signature(get_segment_path(file_path)) == store.segment_signature:
+            signature = get_file_signature(file_path)
+            if signature == store.file_signature:
+                return store
+            if signature is not None and store.file_hash is not None and store.file_hash == hash_file(file_path):
+                store.file_signature = signature
+                return store
+        
+        # Measure memory only when asked to, and if nobody else is tracing allocations
+        measure_memory = MEASURE_LOAD_MEMORY and not tracemalloc.is_tracing()
+        if measure_memory:
+            tracemalloc.start()
+        try:
+            store = FewShotPosts(file_path)
+            if measure_memory:
+                store.memory_bytes = tracemalloc.get_traced_memory()[0]
+        finally:
+            if measure_memory:
+                tracemalloc.stop()
+        
+        _shared_stores[file_path] = store
+        return store
+
+def hash_file(file_path):
+    """SHA-1 of a file's content"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_length_bucket(line_count):
+    """Map a line count to its "Short", "Medium" or "Long" bucket (None if it fits none)"""
+    if line_count <= 5:
+        return "Short"
+    if 6 <= line_count <= 10:
+        return "Medium"
+    if line_count >= 11:
+        return "Long"
+    return None
 
 class FewShotPosts:
     """Class to manage few-shot examples for post generation"""
     
-    def __init__(self, file_path="data/processed_posts.json"):
+    def __init__(self, file_path=DEFAULT_POSTS_PATH):
         self.file_path = file_path
+        self.file_signature = None
+        self.segment_signature = None
+        self.file_hash = None
+        self.memory_bytes = None
+        # Serialises add_post, compaction and lazy builds across the threads sharing this store
+        self._lock = threading.RLock()
+        
+        start = time.perf_counter()
         self.posts = self._load_posts()
         self.tags = self._extract_tags()
+        self._index = self._build_index()
+        self._retriever = None
+        self._stats = None
+        self.load_seconds = time.perf_counter() - start
         
     def _load_posts(self):
-        """Load posts from the JSON file"""
+        """Load the base posts followed by the append segment"""
+        posts = self._load_base()
+        self.base_count = len(posts)
+        
+        segment_posts = self._load_segment()
+        if isinstance(posts, list):
+            posts.extend(segment_posts)
+        else:
+            posts.appended.extend(segment_posts)
+        return posts
+    
+    def _load_segment(self):
+        """Load posts appended since the last compaction"""
+        segment_path = get_segment_path(self.file_path)
+        if not self.file_path.endswith('.jsonl'):
+            self._recover_compaction(segment_path)
+        
+        self.segment_signature = get_file_signature(segment_path)
+        if self.segment_signature is None or self.file_path.endswith('.jsonl'):
+            return []
+        return read_jsonl(segment_path)
+    
+    def _recover_compaction(self, segment_path):
+        """
+        Finish a compaction that was interrupted
+        
+        Compaction moves the segment aside under a name recording the base's
+        post count. If the base still has that count it was never rewritten, so
+        the posts go back in front of the segment; otherwise they are already in
+        the base and the leftover file is dropped.
+        """
+        segment = Path(segment_path)
+        for pending_path in sorted(segment.parent.glob(segment.name + ".*.compacting")):
+            if pending_path.name.split('.')[-2] == str(self.base_count):
+                records = read_jsonl(pending_path)
+                if segment.exists():
+                    records += read_jsonl(segment)
+                temp_path = Path(str(segment) + ".tmp")
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                os.replace(temp_path, segment)
+            pending_path.unlink()
+    
+    def _load_base(self):
+        """Load posts from the JSON or JSONL file or corpus, recording its signature and hash"""
         if not os.path.exists(self.file_path):
             return []
+        
+        if os.path.isdir(self.file_path):
+            # Memory-mapped columnar corpus; changes are detected by signature alone
+            from corpus_store import PostCorpus
+            self.file_signature = get_file_signature(self.file_path)
+            return PostCorpus(self.file_path)
             
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
+        self.file_signature = get_file_signature(self.file_path)
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+        self.file_hash = hashlib.sha1(data).hexdigest()
+        text = data.decode('utf-8')
+            
+        if self.file_path.endswith('.jsonl'):
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+            
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return []
     
     def _extract_tags(self):
         """Extract all unique tags from posts"""
         if not self.posts:
             return ["Job Search", "Motivation", "Career Advice", "Leadership", "Self Improvement"]
             
+        if self.is_columnar():
+            all_tags = set(self.posts.tag_names)
+            for post in self.posts.appended:
+                if 'tags' in post and isinstance(post['tags'], list):
+                    all_tags.update(post['tags'])
+            return sorted(all_tags)
+            
         all_tags = set()
         for post in self.posts:
             if 'tags' in post and isinstance(post['tags'], list):
@@ -33,10 +227,133 @@ class FewShotPosts:
         
         return sorted(list(all_tags))
     
+    def _build_index(self):
+        """
+        Build the lookup index: length bucket -> language -> tag -> post ids
+        
+        Post ids are kept in ascending order in compact arrays, so filtered
+        lookups return posts in the same order as a linear scan.
+        """
+        if self.is_columnar():
+            return self._build_columnar_index()
+        
+        index = {}
+        for post_id, post in enumerate(self.posts):
+            self._index_post(index, post_id, post)
+        return index
+    
+    def _build_columnar_index(self):
+        """Build the lookup index from corpus columns with vectorised grouping"""
+        import numpy as np
+        
+        corpus = self.posts
+        n_posts = corpus.size
+        n_tags = len(corpus.tag_names)
+        index = {}
+        if not n_posts:
+            return index
+        
+        # Bucket ids follow get_length_bucket; a missing line count counts as 0 (Short)
+        buckets = np.digitize(corpus.line_counts, [6, 11])
+        
+        # Languages are matched case-insensitively, so ids are merged by lowered name
+        language_keys = sorted({name.lower() for name in corpus.language_names} | {''})
+        key_ids = {key: i for i, key in enumerate(language_keys)}
+        language_map = np.array([key_ids[name.lower()] for name in corpus.language_names] + [key_ids['']],
+                                dtype=np.int64)
+        # Missing languages (-1) pick the trailing '' entry
+        languages = language_map[corpus.language_ids]
+        
+        # One (post, tag) pair per distinct tag of a post; untagged posts get tag -1
+        tag_counts = np.diff(corpus.tag_offsets)
+        post_ids = np.repeat(np.arange(n_posts, dtype=np.int64), tag_counts)
+        untagged = np.flatnonzero(tag_counts == 0)
+        post_ids = np.concatenate([post_ids, untagged])
+        tag_ids = np.concatenate([np.asarray(corpus.tag_ids, dtype=np.int64), np.full(len(untagged), -1)])
+        
+        # Sort (bucket, language, tag, post) keys once: this groups the pairs, keeps
+        # post ids ascending within each group and puts repeated tags side by side
+        group_keys = (buckets[post_ids] * len(language_keys) + languages[post_ids]) * (n_tags + 1) + tag_ids + 1
+        keys = np.sort(group_keys * n_posts + post_ids)
+        keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+        group_keys, post_ids = np.divmod(keys, n_posts)
+        starts = np.flatnonzero(np.r_[True, group_keys[1:] != group_keys[:-1]])
+        ends = np.r_[starts[1:], len(group_keys)]
+        
+        id_dtype = np.uint64 if array('L').itemsize == 8 else np.uint32
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            bucket_language, tag_id = divmod(int(group_keys[start]), n_tags + 1)
+            bucket_id, language_id = divmod(bucket_language, len(language_keys))
+            ids = array('L')
+            ids.frombytes(post_ids[start:end].astype(id_dtype).tobytes())
+            tag = corpus.tag_names[tag_id - 1] if tag_id else None
+            index.setdefault(LENGTH_BUCKETS[bucket_id], {}).setdefault(language_keys[language_id], {})[tag] = ids
+        
+        for post_id, post in enumerate(corpus.appended, start=n_posts):
+            self._index_post(index, post_id, post)
+        return index
+    
+    @staticmethod
+    def _index_post(index, post_id, post):
+        """Add one post to the lookup index"""
+        bucket = get_length_bucket(post.get('line_count', 0))
+        language = (post.get('language') or '').lower()
+        tags = post.get('tags')
+        # Posts without tags are indexed under None so unfiltered lookups still see them
+        tag_keys = set(tags) if isinstance(tags, list) and tags else {None}
+        
+        by_language = index.setdefault(bucket, {}).setdefault(language, {})
+        for tag in tag_keys:
+            by_language.setdefault(tag, array('L')).append(post_id)
+    
+    def is_columnar(self):
+        """Whether the posts come from a memory-mapped columnar corpus"""
+        return not isinstance(self.posts, list)
+    
+    def get_load_stats(self):
+        """Get the number of posts, load time and (if measured) memory use"""
+        return {
+            "posts": len(self.posts),
+            "load_seconds": self.load_seconds,
+            "memory_bytes": self.memory_bytes
+        }
+    
+    def get_stats(self):
+        """
+        Get corpus statistics (language, tag and line-count aggregates)
+        
+        Computed once on first use and then kept up to date by add_post, so
+        repeated reads never rescan the corpus.
+        """
+        with self._lock:
+            if self._stats is None:
+                from post_stats import PostStats
+                if self.is_columnar():
+                    self._stats = self._columnar_stats()
+                else:
+                    self._stats = PostStats.from_posts(self.posts)
+            return self._stats
+    
+    def _columnar_stats(self):
+        """Compute statistics straight from the corpus columns"""
+        import numpy as np
+        from post_stats import PostStats
+        
+        corpus = self.posts
+        # Missing values count as line_count 0 and language "Unknown", as in PostStats.add
+        language_names = corpus.language_names + ["Unknown"]
+        language_ids = np.where(corpus.language_ids < 0, len(language_names) - 1, corpus.language_ids)
+        stats = PostStats.from_columns(np.maximum(corpus.line_counts, 0), language_ids, language_names,
+                                       corpus.tag_ids, corpus.tag_names)
+        for post in corpus.appended:
+            stats.add(post)
+        return stats
+    
     def get_tags(self):
         """Get all available tags"""
         return self.tags
     
+    @instrumented("get_filtered_posts")
     def get_filtered_posts(self, length=None, language=None, tag=None, max_examples=5):
         """
         Get posts filtered by length, language, and tag
@@ -50,32 +367,152 @@ class FewShotPosts:
         Returns:
             List of matching posts
         """
-        filtered_posts = self.posts.copy()
+        if not length and not language and not tag:
+            return [self.posts[post_id] for post_id in self.get_diverse_ids(range(len(self.posts)), max_examples)]
         
-        # Apply length filter
-        if length and filtered_posts:
-            if length == "Short":
-                filtered_posts = [p for p in filtered_posts if p.get('line_count', 0) <= 5]
-            elif length == "Medium":
-                filtered_posts = [p for p in filtered_posts if 6 <= p.get('line_count', 0) <= 10]
-            elif length == "Long":
-                filtered_posts = [p for p in filtered_posts if p.get('line_count', 0) >= 11]
+        return [self.posts[post_id] for post_id in self.get_filtered_ids(length, language, tag, max_examples)]
+    
+    def get_filtered_ids(self, length=None, language=None, tag=None, max_examples=None):
+        """
+        Get ids of posts matching the filters, in ascending order
         
-        # Apply language filter
-        if language and filtered_posts:
-            filtered_posts = [p for p in filtered_posts if p.get('language', '').lower() == language.lower()]
+        Unset filters match everything. The matching id arrays are merged
+        lazily, so only the first max_examples ids are ever materialised.
+        Only the first post of each near-duplicate cluster is returned.
         
-        # Apply tag filter
-        if tag and filtered_posts:
-            filtered_posts = [p for p in filtered_posts if tag in p.get('tags', [])]
+        Args:
+            length: "Short", "Medium", or "Long" (other values do not filter)
+            language: Language name, matched case-insensitively
+            tag: Topic tag
+            max_examples: Maximum number of ids to return (None for all)
+            
+        Returns:
+            List of post ids
+        """
+        id_lists = self.get_id_arrays(length, language, tag)
+        if not id_lists:
+            return []
         
-        # Return at most max_examples posts
-        return filtered_posts[:max_examples]
+        # A post with several tags appears in several arrays; skip repeats
+        merged = id_lists[0] if len(id_lists) == 1 else heapq.merge(*id_lists)
+        return self.get_diverse_ids((post_id for post_id, _ in itertools.groupby(merged)), max_examples)
+    
+    def get_diverse_ids(self, post_ids, max_examples=None):
+        """
+        Keep the first of any posts in the same near-duplicate cluster
+        
+        Args:
+            post_ids: Iterable of post ids in order of preference
+            max_examples: Maximum number of ids to return (None for all)
+            
+        Returns:
+            List of post ids
+        """
+        diverse_ids = []
+        seen_clusters = set()
+        for post_id in post_ids:
+            if max_examples is not None and len(diverse_ids) >= max_examples:
+                break
+            cluster_id = self.get_cluster_id(post_id)
+            if cluster_id is not None:
+                if cluster_id in seen_clusters:
+                    continue
+                seen_clusters.add(cluster_id)
+            diverse_ids.append(post_id)
+        return diverse_ids
+    
+    def get_cluster_id(self, post_id):
+        """Near-duplicate cluster of a post (set by preprocessing), or None"""
+        if post_id < self.base_count and self.is_columnar():
+            cluster_ids = self.posts.cluster_ids
+            if cluster_ids is None:
+                return None
+            cluster_id = int(cluster_ids[post_id])
+            return cluster_id if cluster_id >= 0 else None
+        return self.posts[post_id].get('cluster_id')
+    
+    def get_id_arrays(self, length=None, language=None, tag=None):
+        """
+        Get the index arrays whose union is the set of posts matching the filters
+        
+        Each array is sorted, but a post with several tags can appear in more
+        than one of them.
+        """
+        buckets = [length] if length in LENGTH_BUCKETS else list(self._index)
+        language_key = language.lower() if language else None
+        
+        id_lists = []
+        for bucket in buckets:
+            by_language = self._index.get(bucket, {})
+            languages = [language_key] if language_key is not None else list(by_language)
+            for lang in languages:
+                by_tag = by_language.get(lang, {})
+                if tag:
+                    if tag in by_tag:
+                        id_lists.append(by_tag[tag])
+                else:
+                    id_lists.extend(by_tag.values())
+        return id_lists
+    
+    @instrumented("get_similar_posts")
+    def get_similar_posts(self, query, length=None, language=None, tag=None, max_examples=5):
+        """
+        Get the posts most similar to a query among those matching the filters
+        
+        Args:
+            query: Free text describing the request (topic, custom instructions)
+            length: "Short", "Medium", or "Long"
+            language: "English", "Hinglish", etc.
+            tag: Topic tag
+            max_examples: Maximum number of examples to return
+            
+        Returns:
+            List of matching posts, most similar first. Falls back to
+            get_filtered_posts when there is no usable query.
+        """
+        if not query or not query.strip() or not self.posts:
+            return self.get_filtered_posts(length, language, tag, max_examples)
+        
+        import numpy as np
+        
+        candidate_ids = None
+        if length or language or tag:
+            id_lists = self.get_id_arrays(length, language, tag)
+            if not id_lists:
+                return []
+            arrays = [np.frombuffer(ids, dtype=f"u{ids.itemsize}") for ids in id_lists]
+            candidate_ids = np.unique(np.concatenate(arrays)).astype(np.int64)
+        
+        candidate_count = len(candidate_ids) if candidate_ids is not None else len(self.posts)
+        k = max_examples * DIVERSITY_OVERFETCH
+        while True:
+            post_ids = self.get_retriever().search(query, candidate_ids, k)
+            if post_ids is None:
+                return self.get_filtered_posts(length, language, tag, max_examples)
+            diverse_ids = self.get_diverse_ids(post_ids, max_examples)
+            # A large cluster can fill the whole window; widen it until enough distinct posts remain
+            if len(diverse_ids) >= max_examples or len(post_ids) >= candidate_count:
+                return [self.posts[post_id] for post_id in diverse_ids]
+            k *= DIVERSITY_OVERFETCH
+    
+    def get_retriever(self):
+        """Get the semantic retriever, embedding the corpus on first use"""
+        with self._lock:
+            if self._retriever is None:
+                from retrieval import ExampleRetriever
+                # The cached matrix covers the base file; segment posts are embedded on top
+                self._retriever = ExampleRetriever.from_posts(self.posts, self.file_path,
+                                                              base_count=self.base_count)
+            return self._retriever
     
     def add_post(self, post_text, metadata=None):
         """
         Add a new post to the collection
         
+        The index, tags, retriever and statistics are updated incrementally and
+        the post is appended to disk, so the cost does not grow with the corpus
+        (apart from the occasional compaction).
+        
         Args:
             post_text: The text content of the post
             metadata: Dictionary with keys like tags, language, line_count
@@ -88,11 +525,72 @@ class FewShotPosts:
             **metadata
         }
         
-        self.posts.append(new_post)
-        
-        # Save to file
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(self.posts, f, indent=4, ensure_ascii=False)
+        # Ids must stay unique and ascending in the index arrays, and compaction
+        # must not run between an append and its segment write
+        with self._lock:
+            self.posts.append(new_post)
+            self._index_post(self._index, len(self.posts) - 1, new_post)
+            self._add_tags(new_post)
+            if self._retriever is not None:
+                self._retriever.add(post_text)
+            if self._stats is not None:
+                self._stats.add(new_post)
+            
+            # Save to file: JSONL files are appended to directly, other formats via the segment
+            if self.file_path.endswith('.jsonl'):
+                with open(self.file_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(new_post, ensure_ascii=False) + '\n')
+                self.base_count = len(self.posts)
+            else:
+                with open(get_segment_path(self.file_path), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(new_post, ensure_ascii=False) + '\n')
+                if len(self.posts) - self.base_count >= max(COMPACT_MIN_POSTS, COMPACT_RATIO * self.base_count):
+                    self.compact()
+            
+            # The in-memory store already has this change, so shared lookups must not reload it
+            self.file_signature = get_file_signature(self.file_path)
+            self.segment_signature = get_file_signature(get_segment_path(self.file_path))
+            self.file_hash = None
+    
+    def _add_tags(self, post):
+        """Merge a new post's tags into the sorted tag list"""
+        if len(self.posts) == 1:
+            # The first real post replaces the placeholder tags of an empty corpus
+            self.tags = []
         
-        # Refresh tags
-        self.tags = self._extract_tags()
\ No newline at end of file
+        tags = post.get('tags')
+        if not isinstance(tags, list):
+            return
+        for tag in tags:
+            position = bisect.bisect_left(self.tags, tag)
+            if position == len(self.tags) or self.tags[position] != tag:
+                self.tags.insert(position, tag)
+    
+    def compact(self):
+        """Rewrite the base file with all posts and drop the append segment"""
+        with self._lock:
+            if self.file_path.endswith('.jsonl') or len(self.posts) == self.base_count:
+                return
+            
+            # Move the segment aside first, so a crash part-way never loads its posts twice
+            segment_path = get_segment_path(self.file_path)
+            pending_path = f"{segment_path}.{self.base_count}.compacting"
+            if os.path.exists(segment_path):
+                os.replace(segment_path, pending_path)
+            
+            from corpus_store import is_corpus_path
+            if is_corpus_path(self.file_path):
+                from corpus_store import write_corpus, PostCorpus
+                write_corpus(self.posts, self.file_path)
+                self.posts = PostCorpus(self.file_path)
+            else:
+                temp_path = self.file_path + ".tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.posts, f, indent=4, ensure_ascii=False)
+                os.replace(temp_path, self.file_path)
+            
+            Path(pending_path).unlink(missing_ok=True)
+            self.base_count = len(self.posts)
+            self.file_signature = get_file_signature(self.file_path)
+            self.segment_signature = None
+            self.file_hash = None
@@ -0,0 +1,121 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_RETENTION = 50
+
+class PostHistory:
+    """
+    Append-only post history backed by SQLite in WAL mode
+
+    Appends are a single indexed INSERT, "latest N" reads walk the primary
+    key backwards, and SQLite's locking keeps concurrent writers (several
+    app sessions or processes) from losing each other's entries.
+    """
+
+    def __init__(self, db_path, retention=DEFAULT_RETENTION, legacy_json_path=None):
+        self.db_path = str(db_path)
+        self.retention = retention
+
+        Path(self.db_path).parent.mkdir(exist_ok=True, parents=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS post_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection and commit on success (safe across threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _migrate_json(self, json_path):
+        """Import a rewrite-on-save post_history.json once, then set it aside"""
+        if not os.path.exists(json_path):
+            return
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            try:
+                entries = json.load(f)
+            except json.JSONDecodeError:
+                entries = []
+
+        with self._connect() as conn:
+            empty = conn.execute("SELECT 1 FROM post_history LIMIT 1").fetchone() is None
+            if empty and isinstance(entries, list):
+                conn.executemany(
+                    "INSERT INTO post_history (timestamp, data) VALUES (?, ?)",
+                    [(entry.get('timestamp', ''), json.dumps(entry, ensure_ascii=False))
+                     for entry in entries if isinstance(entry, dict)]
+                )
+        os.replace(json_path, f"{json_path}.migrated")
+
+    def append(self, entry):
+        """
+        Append one history entry and drop entries beyond the retention limit
+
+        Args:
+            entry: JSON-serialisable dictionary (should carry a 'timestamp')
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO post_history (timestamp, data) VALUES (?, ?)",
+                (entry.get('timestamp', ''), json.dumps(entry, ensure_ascii=False))
+            )
+            self._prune(conn, cursor.lastrowid)
+
+    def extend(self, entries):
+        """
+        Append several history entries in a single transaction
+
+        Args:
+            entries: List of JSON-serialisable dictionaries
+        """
+        if not entries:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO post_history (timestamp, data) VALUES (?, ?)",
+                [(entry.get('timestamp', ''), json.dumps(entry, ensure_ascii=False)) for entry in entries]
+            )
+            last_id = conn.execute("SELECT MAX(id) FROM post_history").fetchone()[0]
+            self._prune(conn, last_id)
+
+    def _prune(self, conn, last_id):
+        """Delete entries older than the newest `retention` ones"""
+        if self.retention is not None:
+            conn.execute("DELETE FROM post_history WHERE id <= ?", (last_id - self.retention,))
+
+    def latest(self, limit=None):
+        """
+        Get the most recent entries, oldest first
+
+        Args:
+            limit: Maximum number of entries (None for everything retained)
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM post_history ORDER BY id DESC LIMIT ?",
+                (-1 if limit is None else limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def count(self):
+        """Number of retained entries"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM post_history").fetchone()[0]
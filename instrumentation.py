@@ -0,0 +1,205 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from token_budget import estimate_tokens
+
+# Set INSTRUMENTATION=1 to record from startup, and INSTRUMENTATION_JSONL to a path
+# to also stream every event to a JSONL file
+ROLLING_WINDOW = 1000
+
+_enabled = os.getenv("INSTRUMENTATION", "0") == "1"
+_jsonl_path = os.getenv("INSTRUMENTATION_JSONL") or None
+_lock = threading.Lock()
+_stages = {}
+
+class StageStats:
+    """Counters and a rolling window of durations for one stage"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.durations = deque(maxlen=ROLLING_WINDOW)
+
+class Span:
+    """One timed execution of a stage; token counts can be attached before it ends"""
+    # Callers check this before counting tokens, which costs more than the span itself
+    recording = True
+
+    def __init__(self, name):
+        self.name = name
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._start = time.perf_counter()
+
+    def set_tokens(self, prompt_tokens=0, completion_tokens=0):
+        """Attach prompt/completion token counts to this span"""
+        self.prompt_tokens = prompt_tokens or 0
+        self.completion_tokens = completion_tokens or 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A stream closed early by its consumer is not an error
+        error = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        record(self.name, time.perf_counter() - self._start, error=error,
+               prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens)
+        return False
+
+class _NoopSpan:
+    """Span used while instrumentation is off; does nothing"""
+    recording = False
+
+    def set_tokens(self, prompt_tokens=0, completion_tokens=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def enable(jsonl_path=None):
+    """Start recording; optionally stream every event to a JSONL file"""
+    global _enabled, _jsonl_path
+    _enabled = True
+    if jsonl_path:
+        _jsonl_path = jsonl_path
+
+def disable():
+    """Stop recording (already recorded stats are kept)"""
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Drop all recorded stats"""
+    with _lock:
+        _stages.clear()
+
+def stage(name):
+    """
+    Context manager timing one execution of a stage
+
+    Usage:
+        with stage("llm.invoke") as span:
+            response = llm.invoke(prompt)
+            if span.recording:
+                span.set_tokens(*get_token_counts(prompt, response))
+    """
+    return Span(name) if _enabled else _NOOP_SPAN
+
+def instrumented(name):
+    """Decorator timing every call of a function as a stage (one flag check when off)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record(name, seconds, error=False, prompt_tokens=0, completion_tokens=0):
+    """Record one stage execution"""
+    with _lock:
+        stats = _stages.get(name)
+        if stats is None:
+            stats = _stages[name] = StageStats()
+        stats.calls += 1
+        stats.errors += int(error)
+        stats.total_seconds += seconds
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.durations.append(seconds)
+
+    if _jsonl_path:
+        event = {
+            "ts": time.time(),
+            "stage": name,
+            "seconds": round(seconds, 6),
+            "error": error,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens
+        }
+        with _lock, open(_jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+def get_token_counts(prompt, response):
+    """
+    Prompt and completion token counts for an LLM response
+
+    Uses the provider's usage metadata when present, otherwise the local
+    token estimate.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    completion_tokens = usage.get("output_tokens")
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(str(prompt))
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(str(getattr(response, "content", response)))
+    return prompt_tokens, completion_tokens
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def snapshot():
+    """
+    Summary of every stage: counts, errors, tokens and rolling percentiles
+
+    Returns:
+        Dictionary mapping stage name to its summary (durations in milliseconds)
+    """
+    with _lock:
+        items = [(name, stats, sorted(stats.durations)) for name, stats in _stages.items()]
+
+    summary = {}
+    for name, stats, ordered in items:
+        summary[name] = {
+            "calls": stats.calls,
+            "errors": stats.errors,
+            "total_seconds": stats.total_seconds,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "p50_ms": _quantile(ordered, 0.50) * 1000 if ordered else None,
+            "p95_ms": _quantile(ordered, 0.95) * 1000 if ordered else None,
+            "p99_ms": _quantile(ordered, 0.99) * 1000 if ordered else None,
+        }
+    return summary
+
+def to_prometheus():
+    """Render the recorded stats in the Prometheus text exposition format"""
+    lines = [
+        "# HELP post_generator_stage_seconds Stage duration (rolling window quantiles)",
+        "# TYPE post_generator_stage_seconds summary",
+    ]
+    summary = snapshot()
+    for name, stats in summary.items():
+        for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            if stats[key] is not None:
+                lines.append(f'post_generator_stage_seconds{{stage="{name}",quantile="{quantile}"}} {stats[key] / 1000:.6f}')
+        lines.append(f'post_generator_stage_seconds_sum{{stage="{name}"}} {stats["total_seconds"]:.6f}')
+        lines.append(f'post_generator_stage_seconds_count{{stage="{name}"}} {stats["calls"]}')
+
+    lines.append("# TYPE post_generator_stage_errors_total counter")
+    for name, stats in summary.items():
+        lines.append(f'post_generator_stage_errors_total{{stage="{name}"}} {stats["errors"]}')
+
+    lines.append("# TYPE post_generator_tokens_total counter")
+    for name, stats in summary.items():
+        if stats["prompt_tokens"] or stats["completion_tokens"]:
+            lines.append(f'post_generator_tokens_total{{stage="{name}",kind="prompt"}} {stats["prompt_tokens"]}')
+            lines.append(f'post_generator_tokens_total{{stage="{name}",kind="completion"}} {stats["completion_tokens"]}')
+    return "\n".join(lines) + "\n"
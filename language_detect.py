@@ -0,0 +1,134 @@
+"""
+Local detection of post metadata that does not need an LLM
+
+Line counts are exact. Language is told apart for the corpus's three main
+languages: Hindi by its Devanagari script, and English vs. Hinglish (Hindi
+written in Latin script) by a small character-trigram model trained on
+common words of each, plus function-word lexicons. Everything else (other
+scripts, accented Latin languages, short or mixed texts) comes back with low
+confidence so the caller can ask the LLM instead.
+"""
+import math
+import re
+from collections import Counter
+
+# Confidence below which callers should fall back to the LLM
+LANGUAGE_CONFIDENCE_THRESHOLD = 0.8
+# Texts with fewer classifiable words than this get proportionally lower confidence
+MIN_CONFIDENT_WORDS = 8
+
+ENGLISH_WORDS = set("""
+a about after all also am an and any are as at be because been before being but by can could did do does
+doing don't down during each few for from further get got had has have having he her here hers him his
+how i if in into is it its itself just know let like made make many may me more most much must my never
+new no not now of off on once one only or other our out over own people really right same say see she
+should so some still such take than that the their them then there these they thing think this those
+through time to too under until up us very was way we well were what when where which while who why will
+with work would year you your
+""".split())
+
+HINGLISH_WORDS = set("""
+aap aapka aapke aapko abhi accha acha agar apna apne apni aur baat bahut bas bhai bhi bilkul bohot chahiye
+chalo dekho dil din dost ek fir ghar gaya gaye haan hai hain hamara hamare hamesha hoga hoon hota hote hoti
+hum humein hun iska iske isliye jab jaana jaise jo kaam kab kabhi kaha kaise kar kara kare karein karna karo
+karte karti kaun ke ki kisi kitna ko koi kuch kya kyun kyunki lekin liye log logo logon maine main mat mein
+mera mere meri mujhe naa nahi nahin naukri par pe pehle phir pyaar raha rahe rahi rakho sab sabse sach sakta
+sakte sapne se sirf tab tha the thi toh tum tumhara tumhe uska uske unka unke unhe wala wale wali waqt woh
+ya yaar yeh yahi yahan zindagi zaroor
+""".split())
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+TRIGRAM_SPACE = 27 ** 3
+
+def is_devanagari(char):
+    return "ऀ" <= char <= "ॿ"
+
+def count_lines(text):
+    """Number of lines, counted the same way as the LLM fallback"""
+    return len(text.split('\n'))
+
+def train_trigrams(words):
+    """Character-trigram counts of space-padded words"""
+    counts = Counter()
+    for word in words:
+        padded = f" {word} "
+        counts.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return counts, sum(counts.values())
+
+ENGLISH_MODEL = train_trigrams(ENGLISH_WORDS)
+HINGLISH_MODEL = train_trigrams(HINGLISH_WORDS)
+
+def trigram_score(word, model):
+    """Mean add-one-smoothed log-probability of a word's trigrams under a model"""
+    counts, total = model
+    padded = f" {word} "
+    trigrams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return sum(math.log((counts[t] + 1) / (total + TRIGRAM_SPACE)) for t in trigrams) / len(trigrams)
+
+def classify_word(word):
+    """'en', 'hi' or None for one lowercase Latin-script word"""
+    if word in HINGLISH_WORDS:
+        return 'hi'
+    if word in ENGLISH_WORDS:
+        return 'en'
+    if len(word) < 3:
+        return None
+    ratio = trigram_score(word, HINGLISH_MODEL) - trigram_score(word, ENGLISH_MODEL)
+    if ratio > 0.5:
+        return 'hi'
+    if ratio < -0.5:
+        return 'en'
+    return None
+
+def detect_language(text):
+    """
+    Detect whether a post is English, Hinglish or Hindi
+
+    Returns:
+        Tuple of (language or None, confidence between 0 and 1)
+    """
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return None, 0.0
+
+    devanagari = sum(1 for char in letters if is_devanagari(char))
+    ascii_letters = sum(1 for char in letters if char.isascii())
+    other = len(letters) - devanagari - ascii_letters
+
+    if devanagari / len(letters) >= 0.8:
+        return 'Hindi', devanagari / len(letters)
+    if devanagari or other / len(letters) > 0.02:
+        # Mixed scripts, another script, or accented Latin (e.g. Spanish): ask the LLM
+        return None, 0.0
+
+    words = [word.lower() for word in WORD_PATTERN.findall(text)]
+    votes = Counter(classify_word(word) for word in words)
+    voted = votes['en'] + votes['hi']
+    if not voted:
+        return None, 0.0
+
+    # Real English or Hinglish prose is full of function words; other Latin languages are not
+    known = sum(1 for word in words if word in ENGLISH_WORDS or word in HINGLISH_WORDS)
+    if known / len(words) < 0.15:
+        return None, 0.0
+
+    length_factor = min(1.0, voted / MIN_CONFIDENT_WORDS)
+    hindi_ratio = votes['hi'] / voted
+    if hindi_ratio < 0.1:
+        return 'English', length_factor * (1 - hindi_ratio)
+    if hindi_ratio >= 0.3:
+        return 'Hinglish', length_factor * min(1.0, 0.7 + hindi_ratio)
+    return ('Hinglish' if hindi_ratio >= 0.2 else 'English'), 0.5 * length_factor
+
+def get_local_metadata(text, threshold=LANGUAGE_CONFIDENCE_THRESHOLD):
+    """
+    line_count and language for a post, if the language is detected confidently
+
+    Returns:
+        Dictionary with line_count and language, or None when the language
+        confidence is below threshold
+    """
+    language, confidence = detect_language(text)
+    if language is None or confidence < threshold:
+        return None
+    return {'line_count': count_lines(text), 'language': language}
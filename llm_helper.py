@@ -1,49 +1,164 @@
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 import os
-import streamlit as st
+import sys
+import threading
+from collections import OrderedDict
 
-# Load environment variables
-load_dotenv()
+# langchain_groq, httpx and dotenv are imported on first use so that importing
+# this module (and everything that depends on it) stays cheap
+_env_loaded = False
 
-def get_llm(model_name="llama-3.2-90b-vision-preview", temperature=0.7, max_tokens=1000):
+DEFAULT_MODEL = "llama-3.2-90b-vision-preview"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_TOKENS = 1000
+# Models offered by the app and accepted by the API
+AVAILABLE_MODELS = ("llama-3.2-90b-vision-preview", "gemma-1.1-7b-it", "mixtral-8x7b-32768")
+# Pooled clients beyond this are dropped, least recently used first
+MAX_POOLED_CLIENTS = 32
+
+# Pooled clients keyed by (model_name, temperature, max_tokens, api_key), oldest use first
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+_http_client = None
+_http_async_client = None
+_http_client_lock = threading.Lock()
+
+def get_api_key():
     """
-    Get a configured LLM instance with the given parameters.
-    Uses API key from environment variables or Streamlit session state.
+    Get the Groq API key.
+    Uses the key from Streamlit session state (web UI) or the environment.
     """
-    # Try to get API key from session state first (for web UI)
-    api_key = st.session_state.get("api_key", None) if "st" in globals() else None
+    load_env()
+    
+    # Try to get API key from session state first (for web UI). Streamlit is
+    # only consulted when the app has already imported it.
+    st = sys.modules.get("streamlit")
+    api_key = st.session_state.get("api_key", None) if st is not None else None
     
     # Fall back to environment variable if not in session state
     if not api_key:
         api_key = os.getenv("GROQ_API_KEY")
+    return api_key
+
+def load_env():
+    """Load environment variables from .env once"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def _pool_settings():
+    import httpx
+    return {
+        "limits": httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        "timeout": httpx.Timeout(60.0, connect=10.0)
+    }
+
+def get_http_client():
+    """Shared HTTP client, so every LLM client reuses one keep-alive connection pool"""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(**_pool_settings())
+    return _http_client
+
+def get_http_async_client():
+    """
+    Shared async HTTP client for ainvoke/astream calls
     
-    # Create and return the LLM
+    Pooled connections belong to the event loop that opened them, so async
+    callers should run on one long-lived loop (as the API server does).
+    """
+    global _http_async_client
+    if _http_async_client is None:
+        import httpx
+        with _http_client_lock:
+            if _http_async_client is None:
+                _http_async_client = httpx.AsyncClient(**_pool_settings())
+    return _http_async_client
+
+def create_client(model_name, temperature, max_tokens, api_key):
+    """Create a new ChatGroq client on the shared connection pools"""
+    from langchain_groq import ChatGroq
     return ChatGroq(
         groq_api_key=api_key,
         model_name=model_name,
         temperature=temperature,
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
+        http_client=get_http_client(),
+        http_async_client=get_http_async_client()
     )
 
-# Initialize default LLM
-llm = get_llm()
+_client_factory = create_client
+
+def set_client_factory(factory):
+    """
+    Replace the function that builds LLM clients, e.g. with an offline fake model
+    
+    The factory is called with model_name, temperature, max_tokens and api_key.
+    Pass None to restore the default ChatGroq factory. Pooled clients are dropped.
+    """
+    global _client_factory
+    with _clients_lock:
+        _client_factory = factory or create_client
+        _clients.clear()
+    # The default client is rebuilt lazily by __getattr__
+    globals().pop("llm", None)
+
+def get_llm(model_name=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, max_tokens=DEFAULT_MAX_TOKENS, api_key=None):
+    """
+    Get a configured LLM instance with the given parameters.
+    Clients are pooled: the same settings return the same instance while it
+    is among the MAX_POOLED_CLIENTS most recently used, and all instances
+    share one sync and one async HTTP connection pool. Safe to call from
+    several threads, so callers can pick per-call settings without touching
+    the global `llm`.
+    """
+    api_key = api_key or get_api_key()
+    key = (model_name, temperature, max_tokens, api_key)
+    
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+        client = _client_factory(
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=api_key
+        )
+        _clients[key] = client
+        if len(_clients) > MAX_POOLED_CLIENTS:
+            _clients.popitem(last=False)
+    return client
+
+def __getattr__(name):
+    """Build the default `llm` lazily on first access"""
+    if name == "llm":
+        global llm
+        llm = get_llm()
+        return llm
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Function to refresh LLM with new settings
 def refresh_llm(model_name=None, temperature=None, max_tokens=None):
-    """Refresh the LLM with new settings"""
+    """Refresh the default LLM with new settings (prefer get_llm for per-call settings)"""
     global llm
-    current_model = getattr(llm, "model_name", "llama-3.2-90b-vision-preview")
-    current_temp = getattr(llm, "temperature", 0.7)
-    current_max_tokens = getattr(llm, "max_tokens", 1000)
+    current = globals().get("llm")
+    current_model = getattr(current, "model_name", DEFAULT_MODEL)
+    current_temp = getattr(current, "temperature", DEFAULT_TEMPERATURE)
+    current_max_tokens = getattr(current, "max_tokens", DEFAULT_MAX_TOKENS)
     
     llm = get_llm(
         model_name=model_name or current_model,
-        temperature=temperature or current_temp,
+        temperature=temperature if temperature is not None else current_temp,
         max_tokens=max_tokens or current_max_tokens
     )
     return llm
 
 if __name__ == "__main__":
-    response = llm.invoke("What are the two main ingredients in samosa?")
+    response = get_llm().invoke("What are the two main ingredients in samosa?")
     print(response.content)
\ No newline at end of file
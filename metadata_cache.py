@@ -0,0 +1,158 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = "data/cache/metadata_cache.db"
+# Eviction frees space down to this fraction of the limit, so a full cache
+# is not scanned again on every insert
+EVICT_TARGET_RATIO = 0.9
+
+class MetadataCache:
+    """
+    Persistent, content-addressed cache for LLM-extracted metadata
+
+    Entries are keyed by a hash of the post text, the model name and the
+    prompt-template version, so editing a post or changing the prompt
+    produces a miss while unchanged posts are never sent to the LLM twice.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_size_bytes=None):
+        self.db_path = db_path
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        Path(db_path).parent.mkdir(exist_ok=True, parents=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS metadata_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_metadata_cache_access ON metadata_cache (last_access)"
+        )
+        self._conn.commit()
+        # Running size of the entries, so set() can check the limit without a table scan
+        self._total_bytes = self._sum_sizes()
+
+    @staticmethod
+    def make_key(text, model_name, prompt_version):
+        """Build the cache key for a post text, model and prompt version"""
+        payload = f"{prompt_version}\x00{model_name}\x00{text}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM metadata_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE metadata_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value under key"""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM metadata_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, size, time.time())
+            )
+            self._conn.commit()
+            self._total_bytes += size - (old[0] if old else 0)
+            if self.max_size_bytes is not None:
+                self._evict(self.max_size_bytes)
+
+    def evict(self, max_size_bytes=None):
+        """
+        Remove least recently used entries until the cache fits the size limit
+
+        Args:
+            max_size_bytes: Size limit in bytes (defaults to the cache's own limit)
+
+        Returns:
+            Number of entries removed
+        """
+        limit = max_size_bytes if max_size_bytes is not None else self.max_size_bytes
+        if limit is None:
+            return 0
+        with self._lock:
+            return self._evict(limit)
+
+    def _evict(self, limit):
+        """Evict entries down to limit (caller must hold the lock)"""
+        if self._total_bytes <= limit:
+            return 0
+        # Another process may share the database; use the exact size before evicting
+        total = self._total_bytes = self._sum_sizes()
+        if total <= limit:
+            return 0
+
+        target = int(limit * EVICT_TARGET_RATIO)
+        removed = 0
+        rows = self._conn.execute(
+            "SELECT key, size FROM metadata_cache ORDER BY last_access ASC"
+        )
+        stale_keys = []
+        for key, size in rows:
+            if total <= target:
+                break
+            stale_keys.append((key,))
+            total -= size
+            removed += 1
+
+        self._conn.executemany("DELETE FROM metadata_cache WHERE key = ?", stale_keys)
+        self._conn.commit()
+        self._total_bytes = total
+        return removed
+
+    def _sum_sizes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM metadata_cache").fetchone()[0]
+
+    def stats(self):
+        """Get hit/miss counters and the current cache size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size
+        }
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata_cache")
+            self._conn.commit()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
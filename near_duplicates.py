@@ -0,0 +1,172 @@
+"""
+Near-duplicate detection for raw posts with MinHash and LSH
+
+Each post's word 3-gram shingles are hashed into a MinHash signature whose
+slots agree between two posts with probability equal to their Jaccard
+similarity. Signatures are split into bands; posts sharing any band are
+candidate duplicates and are confirmed by comparing the signatures.
+
+Only the first post of each cluster (its representative) is indexed, and
+the index lives in SQLite, so memory stays flat however many posts are
+seen: a run over millions of posts keeps one signature per distinct post on
+disk and only the current post in memory.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# Estimated Jaccard similarity at which two posts count as duplicates.
+# 16 bands of 4 rows make posts at this similarity candidates >99.9% of the time;
+# less similar candidates are rejected by the signature comparison.
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+
+# Universal hashing (a * x + b) mod p, with p a prime above 2**32
+HASH_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(1)
+PERM_A = _rng.randint(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def get_shingles(text):
+    """Lowercased word 3-grams of a text (the whole text if it is shorter)"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def minhash(text):
+    """
+    MinHash signature of a text
+
+    Returns:
+        uint32 array of NUM_PERM values
+    """
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in get_shingles(text)),
+                         dtype=np.uint64)
+    # NUM_PERM x shingles; products stay below 2**64 since a, x < 2**32
+    permuted = (PERM_A[:, None] * hashes[None, :] + PERM_B[:, None]) % HASH_PRIME
+    return (permuted.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+def band_keys(signature):
+    """One signed 64-bit key per band of a signature"""
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in signature.reshape(BANDS, ROWS_PER_BAND)
+    ]
+
+def similarity(signature, other):
+    """Jaccard similarity estimated from two signatures"""
+    return float(np.count_nonzero(signature == other)) / NUM_PERM
+
+class DuplicateIndex:
+    """
+    Assigns posts to near-duplicate clusters and remembers cluster metadata
+
+    Clusters are numbered from 1 in order of first appearance. Metadata
+    extracted for a cluster's representative is stored with the cluster so
+    later duplicates (even in a later run resumed from disk) can copy it.
+    """
+
+    def __init__(self, db_path=":memory:", threshold=DUPLICATE_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(exist_ok=True, parents=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS clusters (
+                id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL,
+                metadata TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lsh_bands (
+                band INTEGER NOT NULL,
+                key INTEGER NOT NULL,
+                cluster_id INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lsh_bands ON lsh_bands (band, key)")
+        self._conn.commit()
+
+    def assign(self, text):
+        """
+        Find the cluster of a post, starting a new one if it has no near duplicate
+
+        Returns:
+            Tuple of (cluster id, whether the cluster is new)
+        """
+        signature = minhash(text)
+        keys = band_keys(signature)
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(keys):
+                rows = self._conn.execute(
+                    "SELECT cluster_id FROM lsh_bands WHERE band = ? AND key = ?", (band, key)
+                ).fetchall()
+                candidates.update(row[0] for row in rows)
+
+            best_id, best_similarity = None, self.threshold
+            for cluster_id in sorted(candidates):
+                stored = self._conn.execute(
+                    "SELECT signature FROM clusters WHERE id = ?", (cluster_id,)
+                ).fetchone()[0]
+                score = similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+                if score >= best_similarity:
+                    best_id, best_similarity = cluster_id, score
+                    if score == 1.0:
+                        break
+            if best_id is not None:
+                self.duplicates += 1
+                return best_id, False
+
+            cluster_id = self._conn.execute(
+                "INSERT INTO clusters (signature) VALUES (?)", (signature.tobytes(),)
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO lsh_bands (band, key, cluster_id) VALUES (?, ?, ?)",
+                [(band, key, cluster_id) for band, key in enumerate(keys)]
+            )
+            return cluster_id, True
+
+    def get_metadata(self, cluster_id):
+        """Metadata stored for a cluster, or None if none was stored yet"""
+        with self._lock:
+            row = self._conn.execute("SELECT metadata FROM clusters WHERE id = ?", (cluster_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def set_metadata(self, cluster_id, metadata):
+        """Store the metadata shared by a cluster's posts"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE clusters SET metadata = ? WHERE id = ?",
+                (json.dumps(metadata, ensure_ascii=False), cluster_id)
+            )
+
+    def commit(self):
+        """Persist clusters assigned since the last commit"""
+        with self._lock:
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM clusters").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,33 +1,77 @@
+import asyncio
 import sys
-import json
 import os
+import re
+import time
 from datetime import datetime
 from pathlib import Path
-sys.stdout.reconfigure(encoding='utf-8')
-from llm_helper import llm
-from data.few_shot import FewShotPosts
+from llm_helper import get_llm
+from few_shot import get_few_shot_posts
+from history_store import PostHistory, DEFAULT_RETENTION
+from response_cache import ResponseCache
+import instrumentation
+from instrumentation import instrumented, stage, get_token_counts
+from token_budget import estimate_tokens, select_examples
 
-# Initialize few-shot example manager
-few_shot = FewShotPosts()
-
-# Ensure history directory exists
+# History store is opened (and its directory created) on first use
 HISTORY_DIR = Path("data/history")
-HISTORY_DIR.mkdir(exist_ok=True, parents=True)
+HISTORY_DB = HISTORY_DIR / "post_history.db"
+# Legacy rewrite-on-save history, imported into HISTORY_DB on first use
 HISTORY_FILE = HISTORY_DIR / "post_history.json"
+HISTORY_RETENTION = int(os.getenv("POST_HISTORY_RETENTION", DEFAULT_RETENTION))
+
+_post_history = None
+
+# Response cache mode: "off", "deterministic" (temperature 0 only) or "reuse" (always)
+RESPONSE_CACHE_MODE = os.getenv("RESPONSE_CACHE_MODE", "deterministic")
+_response_cache = None
+
+# Prompt size cap (estimated tokens); examples are fitted into what the instructions leave
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 1500))
+MAX_EXAMPLES = 2
+# Close matches considered, so a shorter one can stand in for an overlong best match
+EXAMPLE_CANDIDATES = 5
+EXAMPLES_HEADER_TOKENS = estimate_tokens("\n\nUse the writing style from these examples:")
+EXAMPLE_HEADER_TOKENS = estimate_tokens("\n\nExample 1:\n")
+
+# Requested line range per length option
+LENGTH_RANGES = {"Short": (1, 5), "Medium": (6, 10), "Long": (11, 15)}
+
+# Candidate mode: variants generated per request, and the weights used to rank them
+DEFAULT_CANDIDATES = 3
+LENGTH_WEIGHT = 0.5
+HASHTAG_WEIGHT = 0.25
+DIVERSITY_WEIGHT = 0.25
+# Models whose API returns several completions for one request (comma-separated).
+# Groq only supports n=1, so by default each variant is its own concurrent request.
+N_COMPLETION_MODELS = set(filter(None, os.getenv("N_COMPLETION_MODELS", "").split(",")))
+HASHTAG_PATTERN = re.compile(r"#\w+")
+
+# Streams are stopped once a post runs past its requested line range, or past this
+# many estimated tokens per allowed line (a run-on paragraph counts as one line)
+MAX_TOKENS_PER_LINE = 80
+# End of a sentence: terminal punctuation (and closing quotes) followed by whitespace
+SENTENCE_END_PATTERN = re.compile(r"[.!?]+[\"')\]]*(?=\s)")
 
 def get_length_str(length):
-    if length == "Short":
-        return "1 to 5 lines"
-    if length == "Medium":
-        return "6 to 10 lines"
-    if length == "Long":
-        return "11 to 15 lines"
+    if length in LENGTH_RANGES:
+        low, high = LENGTH_RANGES[length]
+        return f"{low} to {high} lines"
 
 
-def get_prompt(length, language, tag, tone="Professional", hashtags=True, custom_instructions=""):
+@instrumented("get_prompt")
+def get_prompt(length, language, tag, tone="Professional", hashtags=True, custom_instructions="",
+               semantic_examples=True, token_budget=None):
+    """
+    Build the generation prompt, fitting examples into a token budget
+    
+    The instructions always go in; examples fill what is left of token_budget
+    (PROMPT_TOKEN_BUDGET by default), preferring shorter close matches over
+    overlong ones and truncating the best match if nothing else fits.
+    """
     length_str = get_length_str(length)
 
-    prompt = f'''
+    parts = [f'''
     Generate a LinkedIn post using the below information. No preamble or explanations - just the post content.
 
     1) Topic: {tag}
@@ -35,74 +79,551 @@ def get_prompt(length, language, tag, tone="Professional", hashtags=True, custom
     3) Language: {language}
     4) Tone: {tone}
     5) Include hashtags: {"Yes" if hashtags else "No"}
-    '''
+    ''']
     
     if language == "Hinglish":
-        prompt += "Note: Hinglish means a mix of Hindi and English. The script should always be in English characters."
+        parts.append("Note: Hinglish means a mix of Hindi and English. The script should always be in English characters.")
     
     if custom_instructions:
-        prompt += f"\n6) Additional instructions: {custom_instructions}"
+        parts.append(f"\n6) Additional instructions: {custom_instructions}")
 
-    examples = few_shot.get_filtered_posts(length, language, tag)
+    # Shared with the app; reloaded only when the examples file changes
+    few_shot = get_few_shot_posts()
+    if semantic_examples:
+        # Pick the examples closest to the topic and instructions, not just the first matches
+        candidates = few_shot.get_similar_posts(f"{tag}\n{custom_instructions}", length, language, tag,
+                                                max_examples=EXAMPLE_CANDIDATES)
+    else:
+        candidates = few_shot.get_filtered_posts(length, language, tag, max_examples=EXAMPLE_CANDIDATES)
 
-    if len(examples) > 0:
-        prompt += "\n\nUse the writing style from these examples:"
+    if token_budget is None:
+        token_budget = PROMPT_TOKEN_BUDGET
+    examples_budget = (token_budget - sum(estimate_tokens(part) for part in parts)
+                       - EXAMPLES_HEADER_TOKENS - EXAMPLE_HEADER_TOKENS * MAX_EXAMPLES)
+    examples = select_examples(candidates, examples_budget, MAX_EXAMPLES)
 
-    for i, post in enumerate(examples):
-        post_text = post['text']
-        prompt += f'\n\nExample {i+1}:\n{post_text}'
+    if len(examples) > 0:
+        parts.append("\n\nUse the writing style from these examples:")
 
-        if i == 1:  # Use max two samples
-            break
+    for i, post_text in enumerate(examples):
+        parts.append(f'\n\nExample {i+1}:\n{post_text}')
 
-    return prompt
+    return "".join(parts)
 
 
-def generate_post(length, language, tag, tone="Professional", hashtags=True, custom_instructions=""):
-    """Generate a LinkedIn post with the given parameters"""
+def prepare_request(length, language, tag, tone="Professional", hashtags=True, custom_instructions="",
+                    reuse=False, llm_params=None):
+    """
+    Build a request's prompt and client and look it up in the response cache
+    
+    Returns:
+        Tuple of (prompt, llm, cache key or None, cached post or None)
+    """
     prompt = get_prompt(length, language, tag, tone, hashtags, custom_instructions)
+    llm = get_llm(**(llm_params or {}))
+    
+    cache_key = get_response_cache_key(prompt, llm, reuse)
+    cached = get_response_cache().get(cache_key) if cache_key else None
+    return prompt, llm, cache_key, cached
+
+
+def generate_post(length, language, tag, tone="Professional", hashtags=True, custom_instructions="", reuse=False,
+                  llm_params=None):
+    """
+    Generate a LinkedIn post with the given parameters
+    
+    Responses are served from the response cache when the model runs at
+    temperature 0, or when reuse=True / RESPONSE_CACHE_MODE=reuse.
+    llm_params (model_name, temperature, max_tokens) override the model
+    settings for this call only.
+    """
+    prompt, llm, cache_key, cached = prepare_request(length, language, tag, tone, hashtags, custom_instructions,
+                                                     reuse, llm_params)
+    if cached is not None:
+        return cached
     
     # Optional: Pass any model parameters
-    response = llm.invoke(prompt)
+    start = time.perf_counter()
+    with stage("llm.invoke") as span:
+        response = llm.invoke(prompt)
+        if span.recording:
+            span.set_tokens(*get_token_counts(prompt, response))
+    if cache_key:
+        get_response_cache().set(cache_key, response.content, time.perf_counter() - start)
+    return response.content
+
+
+async def agenerate_post(length, language, tag, tone="Professional", hashtags=True, custom_instructions="",
+                         reuse=False, llm_params=None):
+    """
+    Generate a LinkedIn post without blocking the event loop
+    
+    Building the prompt (which may embed the query or load the examples) and
+    the response cache's SQLite reads and writes run in worker threads.
+    """
+    prompt, llm, cache_key, cached = await asyncio.to_thread(
+        prepare_request, length, language, tag, tone, hashtags, custom_instructions, reuse, llm_params
+    )
+    if cached is not None:
+        return cached
+    
+    start = time.perf_counter()
+    with stage("llm.invoke") as span:
+        response = await llm.ainvoke(prompt)
+        if span.recording:
+            span.set_tokens(*get_token_counts(prompt, response))
+    if cache_key:
+        await asyncio.to_thread(get_response_cache().set, cache_key, response.content, time.perf_counter() - start)
     return response.content
 
 
+def stream_post(length, language, tag, tone="Professional", hashtags=True, custom_instructions="", reuse=False,
+                llm_params=None, early_stop=True, report=None):
+    """
+    Generate a LinkedIn post, yielding text chunks as the model produces them
+    
+    Suitable for st.write_stream, which renders each chunk as it arrives.
+    A cached response is yielded as a single chunk.
+    
+    With early_stop, generation is cancelled as soon as the post runs past
+    the requested length and the post is trimmed at a line or sentence
+    boundary (see LengthGuard). Pass a dictionary as report to receive the
+    request's stream report (see get_stream_report).
+    """
+    prompt, llm, cache_key, cached = prepare_request(length, language, tag, tone, hashtags, custom_instructions,
+                                                     reuse, llm_params)
+    if cached is not None:
+        yield cached
+        return
+    
+    start = time.perf_counter()
+    guard = LengthGuard(length, hashtags, enabled=early_stop, tag=tag)
+    with stage("llm.stream") as span:
+        stream = llm.stream(prompt)
+        try:
+            for chunk in stream:
+                if chunk.content:
+                    text = guard.feed(chunk.content)
+                    if text:
+                        yield text
+                    if guard.stopped:
+                        break
+        finally:
+            # Closing the stream cancels the request, so the model stops generating
+            stream.close()
+        text = guard.flush()
+        if text:
+            yield text
+        if span.recording:
+            span.set_tokens(estimate_tokens(prompt), guard.tokens_generated())
+    finish_stream(guard, llm, start, cache_key, report)
+
+
+async def astream_post(length, language, tag, tone="Professional", hashtags=True, custom_instructions="",
+                       reuse=False, llm_params=None, early_stop=True, report=None):
+    """Async variant of stream_post; prompt and cache work run in worker threads"""
+    prompt, llm, cache_key, cached = await asyncio.to_thread(
+        prepare_request, length, language, tag, tone, hashtags, custom_instructions, reuse, llm_params
+    )
+    if cached is not None:
+        yield cached
+        return
+    
+    start = time.perf_counter()
+    guard = LengthGuard(length, hashtags, enabled=early_stop, tag=tag)
+    with stage("llm.stream") as span:
+        stream = llm.astream(prompt)
+        try:
+            async for chunk in stream:
+                if chunk.content:
+                    text = guard.feed(chunk.content)
+                    if text:
+                        yield text
+                    if guard.stopped:
+                        break
+        finally:
+            await stream.aclose()
+        text = guard.flush()
+        if text:
+            yield text
+        if span.recording:
+            span.set_tokens(estimate_tokens(prompt), guard.tokens_generated())
+    await asyncio.to_thread(finish_stream, guard, llm, start, cache_key, report)
+
+
+class LengthGuard:
+    """
+    Watches a streamed post and stops it once it runs past the requested length
+    
+    A post is stopped when a line beyond the top of its LENGTH_RANGES range
+    begins (hashtag-only lines do not count when hashtags were asked for), and
+    is cut just before that line. A post that exceeds MAX_TOKENS_PER_LINE per
+    allowed line without enough line breaks is cut at its last sentence end.
+    Text is only released once it can no longer be trimmed away.
+    
+    Models put hashtags at the end, so a cut post usually loses them; when
+    hashtags were asked for and none were kept, a hashtag line made from the
+    post's tag is appended instead.
+    """
+    
+    def __init__(self, length, hashtags=True, enabled=True, tag=None):
+        self.enabled = enabled and length in LENGTH_RANGES
+        self.length_range = LENGTH_RANGES[length] if self.enabled else None
+        self.max_lines = self.length_range[1] if self.enabled else None
+        self.max_tokens = self.max_lines * MAX_TOKENS_PER_LINE if self.enabled else None
+        self.allow_hashtags = hashtags
+        self.hashtag_line = make_hashtag_line(tag) if hashtags and tag else ""
+        # Text the guard added itself (the hashtag line of a cut post)
+        self.appended = ""
+        self.generated = []
+        self.text = ""
+        self.released = 0
+        self.stopped = False
+        self.first_chunk_time = None
+        self.stop_time = None
+    
+    def feed(self, chunk):
+        """
+        Add a streamed chunk
+        
+        Returns:
+            Text that is now safe to show (possibly empty)
+        """
+        if self.first_chunk_time is None:
+            self.first_chunk_time = time.perf_counter()
+        self.generated.append(chunk)
+        self.text += chunk
+        if not self.enabled:
+            return self._release(len(self.text))
+        
+        cut = find_line_cutoff(self.text, self.max_lines, self.allow_hashtags)
+        tokens = estimate_tokens(self.text)
+        if cut is None and tokens > self.max_tokens:
+            cut = find_sentence_cutoff(self.text)
+        if cut is not None:
+            self.stopped = True
+            self.stop_time = time.perf_counter()
+            self.text = self.text[:cut].rstrip()
+            if self.hashtag_line and not HASHTAG_PATTERN.search(self.text):
+                self.appended = "\n\n" + self.hashtag_line
+                self.text += self.appended
+            return self._release(len(self.text))
+        
+        if tokens > self.max_tokens - MAX_TOKENS_PER_LINE:
+            # Close to the token cap: hold back the unfinished sentence in case it is cut
+            return self._release(find_sentence_cutoff(self.text))
+        return self._release(len(self.text))
+    
+    def flush(self):
+        """Release any held-back text once the stream has ended"""
+        return self._release(len(self.text))
+    
+    def _release(self, end):
+        end = max(end, self.released)
+        released = self.text[self.released:end]
+        self.released = end
+        return released
+    
+    def tokens_generated(self):
+        """Estimated tokens the model produced, including any trimmed tail"""
+        return estimate_tokens("".join(self.generated)) if self.generated else 0
+
+
+def make_hashtag_line(tag):
+    """Hashtag for a post's tag, e.g. "#CareerAdvice" for "Career Advice" (empty if it has no words)"""
+    words = re.findall(r"\w+", tag)
+    return "#" + "".join(word[:1].upper() + word[1:] for word in words) if words else ""
+
+
+def find_line_cutoff(text, max_lines, allow_hashtags=True):
+    """
+    Position at which a line beyond max_lines begins, or None
+    
+    Blank lines are not counted, nor (when allow_hashtags) lines of hashtags.
+    """
+    line_count = 0
+    position = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if stripped and not (allow_hashtags and stripped.startswith("#")):
+            line_count += 1
+            if line_count > max_lines:
+                return position
+        position += len(line) + 1
+    return None
+
+
+def find_sentence_cutoff(text):
+    """Position just after the last complete sentence or line, else after the last word"""
+    sentence_end = max((match.end() for match in SENTENCE_END_PATTERN.finditer(text)), default=0)
+    line_end = text.rfind("\n") + 1
+    cutoff = max(sentence_end, line_end)
+    if cutoff == 0:
+        cutoff = max(text.rfind(" "), 0)
+    return cutoff
+
+
+def finish_stream(guard, llm, start, cache_key=None, report=None):
+    """Cache a finished stream's post, record savings and fill in the report"""
+    seconds = time.perf_counter() - start
+    if cache_key:
+        get_response_cache().set(cache_key, guard.text, seconds)
+    if report is None and not instrumentation.is_enabled():
+        # Nobody reads the report, so skip its token estimates
+        return
+    
+    stream_report = get_stream_report(guard, llm, seconds)
+    if stream_report["stopped_early"] and instrumentation.is_enabled():
+        # Calls count early stops and seconds estimate the time they saved. Saved tokens
+        # were never generated, so they are not recorded as completion tokens.
+        instrumentation.record("llm.stream.saved", stream_report["seconds_saved"])
+    if report is not None:
+        report.update(stream_report)
+
+
+def get_stream_report(guard, llm, seconds):
+    """
+    Summarise one streamed request
+    
+    tokens_trimmed counts generated text cut from the post. tokens_saved
+    estimates what the model would still have written: a post that overruns
+    its range is assumed to run on by one range width of lines (at the
+    post's own tokens per line, up to MAX_TOKENS_PER_LINE), less what was
+    already trimmed, and never more than the model's max_tokens allows.
+    seconds_saved converts it at the stream's observed token rate.
+    
+    Returns:
+        Dictionary with stopped_early, line_count, tokens, tokens_trimmed,
+        tokens_saved, seconds and seconds_saved
+    """
+    tokens_generated = guard.tokens_generated()
+    tokens = estimate_tokens(guard.text) if guard.text else 0
+    line_count = count_post_lines(guard.text)
+    kept = guard.text[:len(guard.text) - len(guard.appended)]
+    kept_tokens = estimate_tokens(kept) if kept else 0
+    tokens_trimmed = max(0, tokens_generated - kept_tokens)
+    tokens_saved = 0
+    seconds_saved = 0.0
+    if guard.stopped:
+        low, high = guard.length_range
+        tokens_per_line = min(kept_tokens / max(count_post_lines(kept), 1), MAX_TOKENS_PER_LINE)
+        tokens_saved = round((high - low + 1) * tokens_per_line) - tokens_trimmed
+        max_tokens = getattr(llm, "max_tokens", None)
+        if max_tokens:
+            tokens_saved = min(tokens_saved, max_tokens - tokens_generated)
+        tokens_saved = max(0, tokens_saved)
+        generation_seconds = guard.stop_time - guard.first_chunk_time
+        if generation_seconds > 0 and tokens_generated:
+            seconds_saved = tokens_saved * generation_seconds / tokens_generated
+    return {
+        "stopped_early": guard.stopped,
+        "line_count": line_count,
+        "tokens": tokens,
+        "tokens_trimmed": tokens_trimmed,
+        "tokens_saved": tokens_saved,
+        "seconds": round(seconds, 4),
+        "seconds_saved": round(seconds_saved, 4)
+    }
+
+
+def generate_candidates(length, language, tag, tone="Professional", hashtags=True, custom_instructions="",
+                        k=DEFAULT_CANDIDATES, llm_params=None):
+    """
+    Generate k variants of a LinkedIn post concurrently and rank them locally
+    
+    Variants come from one n-completions request on models listed in
+    N_COMPLETION_MODELS, otherwise from k concurrent requests for the same
+    prompt. They are sampled, so the response cache is bypassed.
+    
+    Returns:
+        List of ranked candidates, best first (see rank_candidates)
+    """
+    prompt = get_prompt(length, language, tag, tone, hashtags, custom_instructions)
+    llm = get_llm(**(llm_params or {}))
+    
+    with stage("llm.candidates") as span:
+        if uses_n_completions(llm, k):
+            from langchain_core.messages import HumanMessage
+            result = llm.generate([[HumanMessage(content=prompt)]], n=k)
+            texts = [generation.text for generation in result.generations[0]]
+            requests = 1
+        else:
+            texts = get_candidate_texts(llm.batch([prompt] * k, config={"max_concurrency": k},
+                                                  return_exceptions=True))
+            requests = k
+        if span.recording:
+            span.set_tokens(estimate_tokens(prompt) * requests, sum(estimate_tokens(text) for text in texts))
+    return rank_candidates(texts, length, hashtags)
+
+
+async def agenerate_candidates(length, language, tag, tone="Professional", hashtags=True, custom_instructions="",
+                               k=DEFAULT_CANDIDATES, llm_params=None):
+    """Async variant of generate_candidates"""
+    prompt = await asyncio.to_thread(get_prompt, length, language, tag, tone, hashtags, custom_instructions)
+    llm = get_llm(**(llm_params or {}))
+    
+    with stage("llm.candidates") as span:
+        if uses_n_completions(llm, k):
+            from langchain_core.messages import HumanMessage
+            result = await llm.agenerate([[HumanMessage(content=prompt)]], n=k)
+            texts = [generation.text for generation in result.generations[0]]
+            requests = 1
+        else:
+            texts = get_candidate_texts(await llm.abatch([prompt] * k, config={"max_concurrency": k},
+                                                         return_exceptions=True))
+            requests = k
+        if span.recording:
+            span.set_tokens(estimate_tokens(prompt) * requests, sum(estimate_tokens(text) for text in texts))
+    return rank_candidates(texts, length, hashtags)
+
+
+def uses_n_completions(llm, k):
+    """Whether k variants can come from a single n-completions request"""
+    return k > 1 and getattr(llm, "model_name", None) in N_COMPLETION_MODELS
+
+
+def get_candidate_texts(responses):
+    """
+    Texts of the variant responses that succeeded
+    
+    Raises the first error when every variant failed.
+    """
+    texts = [response.content for response in responses if not isinstance(response, Exception)]
+    if not texts and responses:
+        raise responses[0]
+    return texts
+
+
+def count_post_lines(text):
+    """Number of non-blank lines in a generated post"""
+    return sum(1 for line in text.split("\n") if line.strip())
+
+
+def score_length(text, length):
+    """1.0 when a post is within the requested line range, falling off linearly outside it"""
+    if length not in LENGTH_RANGES:
+        return 1.0
+    low, high = LENGTH_RANGES[length]
+    line_count = count_post_lines(text)
+    distance = max(low - line_count, line_count - high, 0)
+    return max(0.0, 1 - distance / (high - low + 1))
+
+
+def score_hashtags(text, hashtags=True):
+    """1.0 when a post has hashtags exactly when they were asked for"""
+    return 1.0 if bool(HASHTAG_PATTERN.search(text)) == hashtags else 0.0
+
+
+def rank_candidates(texts, length, hashtags=True):
+    """
+    Rank post variants, best first
+    
+    A variant's quality is its weighted length and hashtag score. Variants
+    are picked greedily by quality plus DIVERSITY_WEIGHT times their word
+    3-gram Jaccard distance to the closest variant already picked, so a
+    near copy of a better variant sinks to the bottom.
+    
+    Returns:
+        List of dictionaries with text, score, line_count, length_score,
+        hashtag_score and diversity
+    """
+    from near_duplicates import get_shingles
+    
+    shingles = [get_shingles(text) for text in texts]
+    length_scores = [score_length(text, length) for text in texts]
+    hashtag_scores = [score_hashtags(text, hashtags) for text in texts]
+    
+    def distance(i, j):
+        union = shingles[i] | shingles[j]
+        return 1 - len(shingles[i] & shingles[j]) / len(union) if union else 0.0
+    
+    ranked = []
+    picked = []
+    remaining = list(range(len(texts)))
+    while remaining:
+        best = None
+        for i in remaining:
+            diversity = min((distance(i, j) for j in picked), default=1.0)
+            score = LENGTH_WEIGHT * length_scores[i] + HASHTAG_WEIGHT * hashtag_scores[i] + DIVERSITY_WEIGHT * diversity
+            if best is None or score > best[1]:
+                best = (i, score, diversity)
+        i, score, diversity = best
+        picked.append(i)
+        remaining.remove(i)
+        ranked.append({
+            "text": texts[i],
+            "score": round(score, 3),
+            "line_count": count_post_lines(texts[i]),
+            "length_score": round(length_scores[i], 3),
+            "hashtag_score": hashtag_scores[i],
+            "diversity": round(diversity, 3)
+        })
+    return ranked
+
+
+def get_response_cache():
+    """Get the shared generation response cache, opening it on first use"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+def get_response_cache_key(prompt, llm, reuse=False):
+    """
+    Cache key for a final prompt under the current model parameters
+    
+    Returns None when caching does not apply: the cache is off, or the model
+    samples (temperature above 0) and reuse was not requested.
+    """
+    if RESPONSE_CACHE_MODE == "off":
+        return None
+    
+    temperature = getattr(llm, "temperature", None)
+    if not (reuse or RESPONSE_CACHE_MODE == "reuse" or temperature == 0):
+        return None
+    
+    model_params = {
+        "model_name": getattr(llm, "model_name", None),
+        "temperature": temperature,
+        "max_tokens": getattr(llm, "max_tokens", None)
+    }
+    return ResponseCache.make_key(prompt, model_params)
+
+
+@instrumented("save_post_history")
 def save_post_history(post_data):
     """Save generated post to history"""
     # Add timestamp
     post_data['timestamp'] = datetime.now().isoformat()
     
-    # Load existing history
-    history = []
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            try:
-                history = json.load(f)
-            except json.JSONDecodeError:
-                history = []
-    
-    # Add new post and save
-    history.append(post_data)
-    
-    # Keep only last 50 posts
-    if len(history) > 50:
-        history = history[-50:]
-        
-    with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-        json.dump(history, f, indent=4, ensure_ascii=False)
+    # Append-only; entries beyond HISTORY_RETENTION are dropped
+    get_post_history_store().append(post_data)
+
+
+def save_post_history_batch(posts_data):
+    """Save several generated posts to history with a single write"""
+    timestamp = datetime.now().isoformat()
+    for post_data in posts_data:
+        post_data['timestamp'] = timestamp
+    
+    get_post_history_store().extend(posts_data)
+
+
+def get_post_history(limit=None):
+    """Get post history, oldest first (only the latest `limit` entries if given)"""
+    return get_post_history_store().latest(limit)
 
 
-def get_post_history():
-    """Get post history"""
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
-    return []
+def get_post_history_store():
+    """Get the shared post history store, opening it on first use"""
+    global _post_history
+    if _post_history is None:
+        _post_history = PostHistory(HISTORY_DB, retention=HISTORY_RETENTION, legacy_json_path=HISTORY_FILE)
+    return _post_history
 
 
 if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
     post = generate_post("Short", "English", "Job Search", "Professional", True)
     print(post)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import csv
+import json
+from pathlib import Path
+import numpy as np
+
+DEFAULT_STATS_DIR = "data/statistics"
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+class PostStats:
+    """
+    Aggregate statistics over a post corpus that can be updated one post at a time
+
+    Keeps language and tag counts and a line-count histogram. Mean, min, max,
+    percentiles and length buckets are all derived from the histogram, so a
+    summary costs O(distinct line counts) instead of a corpus scan.
+    """
+
+    def __init__(self):
+        self.total_posts = 0
+        self.languages = {}
+        self.tags = {}
+        self.line_counts = {}
+
+    def add(self, post):
+        """Update the aggregates with one post"""
+        self.total_posts += 1
+
+        language = post.get('language', 'Unknown')
+        self.languages[language] = self.languages.get(language, 0) + 1
+
+        tags = post.get('tags', [])
+        for tag in tags if isinstance(tags, list) else []:
+            self.tags[tag] = self.tags.get(tag, 0) + 1
+
+        line_count = int(post.get('line_count', 0) or 0)
+        self.line_counts[line_count] = self.line_counts.get(line_count, 0) + 1
+
+    @classmethod
+    def from_columns(cls, line_counts, language_ids, language_names, tag_ids, tag_names):
+        """
+        Compute statistics from columnar data with vectorised counts
+
+        Args:
+            line_counts: Integer array with one line count per post
+            language_ids: Integer array with one language id per post
+            language_names: Sequence mapping language ids to names
+            tag_ids: Integer array of every tag id of every post, flattened
+            tag_names: Sequence mapping tag ids to names
+
+        Returns:
+            PostStats instance
+        """
+        stats = cls()
+        line_counts = np.asarray(line_counts, dtype=np.int64)
+        stats.total_posts = int(len(line_counts))
+
+        language_counts = np.bincount(np.asarray(language_ids, dtype=np.int64), minlength=len(language_names))
+        stats.languages = {language_names[i]: int(count) for i, count in enumerate(language_counts) if count}
+
+        tag_counts = np.bincount(np.asarray(tag_ids, dtype=np.int64), minlength=len(tag_names))
+        stats.tags = {tag_names[i]: int(count) for i, count in enumerate(tag_counts) if count}
+
+        values, counts = np.unique(line_counts, return_counts=True)
+        stats.line_counts = dict(zip(values.tolist(), counts.tolist()))
+        return stats
+
+    @classmethod
+    def from_posts(cls, posts):
+        """
+        Compute statistics over an iterable of posts
+
+        Posts are read once into columns (languages and tags interned to ids)
+        and then counted with from_columns.
+        """
+        line_counts = []
+        language_ids = []
+        tag_ids = []
+        languages = {}
+        tags = {}
+
+        for post in posts:
+            line_counts.append(int(post.get('line_count', 0) or 0))
+            language_ids.append(languages.setdefault(post.get('language', 'Unknown'), len(languages)))
+            post_tags = post.get('tags', [])
+            for tag in post_tags if isinstance(post_tags, list) else []:
+                tag_ids.append(tags.setdefault(tag, len(tags)))
+
+        return cls.from_columns(line_counts, language_ids, list(languages), tag_ids, list(tags))
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """Nearest-rank line-count percentiles, e.g. {"p50": 6, "p95": 14}"""
+        if not self.total_posts:
+            return {}
+        values = np.array(sorted(self.line_counts), dtype=np.int64)
+        cumulative = np.cumsum([self.line_counts[value] for value in values.tolist()])
+        ranks = np.ceil(np.array(percentiles) / 100 * self.total_posts).clip(1, self.total_posts)
+        positions = np.searchsorted(cumulative, ranks)
+        return {f"p{p}": int(values[position]) for p, position in zip(percentiles, positions)}
+
+    def length_buckets(self):
+        """Posts per "Short"/"Medium"/"Long" bucket"""
+        from few_shot import get_length_bucket
+
+        buckets = {}
+        for line_count, count in self.line_counts.items():
+            bucket = get_length_bucket(line_count)
+            buckets[bucket] = buckets.get(bucket, 0) + count
+        return buckets
+
+    def summary(self):
+        """
+        Get the statistics as a JSON-serialisable dictionary
+
+        Keeps the keys of the original post_stats.json and adds percentiles,
+        the line-count histogram and length buckets.
+        """
+        if not self.total_posts:
+            return {"total_posts": 0, "languages": {}, "tags": {}}
+
+        line_count_sum = sum(value * count for value, count in self.line_counts.items())
+        return {
+            "total_posts": self.total_posts,
+            "languages": self.languages,
+            "tags": self.tags,
+            "line_count_avg": line_count_sum / self.total_posts,
+            "line_count_min": min(self.line_counts),
+            "line_count_max": max(self.line_counts),
+            "line_count_percentiles": self.percentiles(),
+            "line_count_histogram": {str(value): self.line_counts[value] for value in sorted(self.line_counts)},
+            "length_buckets": self.length_buckets()
+        }
+
+    def save(self, stats_dir=DEFAULT_STATS_DIR):
+        """Write post_stats.json and the tag, language and line-count CSVs"""
+        stats_dir = Path(stats_dir)
+        stats_dir.mkdir(exist_ok=True, parents=True)
+
+        with open(stats_dir / "post_stats.json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=4, ensure_ascii=False)
+
+        tables = [
+            ("tag_stats.csv", "tag", self.tags.items()),
+            ("language_stats.csv", "language", self.languages.items()),
+            ("line_count_histogram.csv", "line_count", sorted(self.line_counts.items()))
+        ]
+        for file_name, column, rows in tables:
+            with open(stats_dir / file_name, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([column, "count"])
+                writer.writerows(rows)
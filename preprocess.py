@@ -1,22 +1,84 @@
 import json
 import sys
 import os
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-import pandas as pd
 from tqdm import tqdm
-from llm_helper import llm, refresh_llm
+from llm_helper import get_llm
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
+from metadata_cache import MetadataCache, DEFAULT_CACHE_PATH
+from corpus_store import is_corpus_path, write_corpus
+from post_stats import PostStats, DEFAULT_STATS_DIR
+from token_budget import estimate_tokens
+from language_detect import get_local_metadata, count_lines
+from near_duplicates import DuplicateIndex
+from tag_normalizer import TagDictionary, TagNormalizer, DEFAULT_DICTIONARY_PATH
+from retry import DEFAULT_MAX_RETRIES, call_with_retries
+from instrumentation import instrumented, stage, get_token_counts
 
-def process_posts(raw_file_path, processed_file_path="data/processed_posts.json", batch_size=10):
+# Lower temperature for more consistent metadata extraction
+METADATA_TEMPERATURE = 0.3
+METADATA_MAX_TOKENS = 500
+
+# Token budgets for multi-post (batched) metadata extraction
+DEFAULT_MAX_BATCH_TOKENS = 3000
+BATCH_OUTPUT_TOKENS = 2000
+BATCH_OUTPUT_TOKENS_PER_POST = 40
+
+# Tags-only extraction, used when line count and language are found locally
+TAGS_MAX_TOKENS = 100
+
+# Bump when the extraction prompts change so cached metadata is not reused
+METADATA_PROMPT_VERSION = "1"
+TAGS_PROMPT_VERSION = f"tags-{METADATA_PROMPT_VERSION}"
+METADATA_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+_metadata_cache = None
+
+def get_metadata_cache():
+    """Get the shared on-disk metadata cache, opening it on first use"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache(DEFAULT_CACHE_PATH, max_size_bytes=METADATA_CACHE_MAX_BYTES)
+    return _metadata_cache
+
+def get_metadata_cache_key(text, prompt_version=METADATA_PROMPT_VERSION):
+    """Cache key for a post text under the current model and prompt version"""
+    return MetadataCache.make_key(text, getattr(get_extraction_llm(), 'model_name', ''), prompt_version)
+
+def get_extraction_llm(batched=False, max_tokens=None):
+    """
+    Get the pooled LLM client used for metadata extraction
+    
+    Settings are chosen per call, so extraction never changes the
+    default client used for post generation.
+    """
+    return get_llm(
+        temperature=METADATA_TEMPERATURE,
+        max_tokens=max_tokens or (BATCH_OUTPUT_TOKENS if batched else METADATA_MAX_TOKENS)
+    )
+
+def process_posts(raw_file_path, processed_file_path="data/processed_posts.json", batch_size=10,
+                  max_workers=1, max_retries=DEFAULT_MAX_RETRIES, batch_prompts=False,
+                  max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, use_cache=True, dedupe=True):
     """
     Process raw LinkedIn posts to extract metadata and unify tags
     
     Args:
         raw_file_path: Path to raw posts JSON file
-        processed_file_path: Output path for processed posts
-        batch_size: Number of posts to process in one batch (for progress tracking)
+        processed_file_path: Output path for processed posts (JSON, or a columnar corpus ending in .corpus)
+        batch_size: Number of extracted groups between progress bar refreshes
+        max_workers: Number of concurrent LLM requests (1 = sequential)
+        max_retries: Retries per post on transient or rate-limit errors
+        batch_prompts: Pack several posts into one extraction prompt
+        max_batch_tokens: Estimated prompt token budget per batched prompt
+        use_cache: Reuse metadata from the on-disk cache instead of calling the LLM
+        dedupe: Extract metadata once per cluster of near-duplicate posts and
+            copy it to the rest, recording each post's cluster_id
     """
     # Ensure output directory exists
     Path(processed_file_path).parent.mkdir(exist_ok=True, parents=True)
@@ -29,68 +91,549 @@ def process_posts(raw_file_path, processed_file_path="data/processed_posts.json"
         enriched_posts = []
         print(f"Processing {len(posts)} posts...")
         
-        # Configure LLM with higher temperature for more varied metadata extraction
-        refresh_llm(temperature=0.3, max_tokens=500)
+        pending = posts
+        if dedupe:
+            duplicate_index = DuplicateIndex()
+            clusters, pending = assign_clusters(posts, duplicate_index)
+            print(f"Found {duplicate_index.duplicates} near duplicates ({len(duplicate_index)} clusters)")
         
-        for i in tqdm(range(0, len(posts), batch_size), desc="Extracting metadata"):
-            batch = posts[i:i+batch_size]
-            
-            for post in batch:
-                try:
-                    # Skip if already processed
-                    if 'tags' in post and 'line_count' in post and 'language' in post:
-                        enriched_posts.append(post)
-                        continue
-                        
-                    metadata = extract_metadata(post['text'])
-                    post_with_metadata = {**post, **metadata}
-                    enriched_posts.append(post_with_metadata)
-                except Exception as e:
-                    print(f"Error processing post: {str(e)[:100]}...")
-                    # Add with default metadata
-                    enriched_posts.append({
-                        **post, 
-                        'tags': ['Other'],
-                        'line_count': len(post['text'].split('\n')),
-                        'language': 'English'
-                    })
+        groups, enrich_group = make_enrich_groups(pending, max_retries, batch_prompts, max_batch_tokens, use_cache)
         
-        # Reset LLM to default settings
-        refresh_llm()
+        # Run extraction concurrently when more than one worker is requested.
+        # One executor.map over every group keeps max_workers calls in flight
+        # and returns results in input order.
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            results = executor.map(enrich_group, groups) if executor else map(enrich_group, groups)
+            for group_posts in tqdm(results, total=len(groups), desc="Extracting metadata", miniters=batch_size):
+                enriched_posts.extend(group_posts)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+        
+        if dedupe:
+            enriched_posts = fill_duplicates(posts, clusters, enriched_posts, duplicate_index)
+            duplicate_index.close()
         
         print("Unifying tags...")
-        unified_tags = get_unified_tags(enriched_posts)
+        unified_tags = get_unified_tags(enriched_posts, use_cache)
         
         # Apply unified tags
         for post in enriched_posts:
-            if 'tags' in post:
-                current_tags = post['tags']
-                new_tags = [unified_tags.get(tag, tag) for tag in current_tags]
-                post['tags'] = list(set(new_tags))  # Remove duplicates
-            else:
-                post['tags'] = ['Other']
+            apply_unified_tags(post, unified_tags)
 
     # Save processed posts
     print(f"Saving processed posts to {processed_file_path}...")
-    with open(processed_file_path, encoding='utf-8', mode="w") as outfile:
-        json.dump(enriched_posts, outfile, indent=4, ensure_ascii=False)
+    if is_corpus_path(processed_file_path):
+        # Compact columnar corpus, memory-mapped by FewShotPosts
+        write_corpus(enriched_posts, processed_file_path)
+    else:
+        with open(processed_file_path, encoding='utf-8', mode="w") as outfile:
+            json.dump(enriched_posts, outfile, indent=4, ensure_ascii=False)
     
     # Generate statistics
     generate_statistics(enriched_posts)
     
+    if use_cache:
+        stats = get_metadata_cache().stats()
+        print(f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries)")
+    
     print("Processing complete!")
     return enriched_posts
 
-def extract_metadata(post):
+def process_posts_streaming(raw_file_path, processed_file_path="data/processed_posts.jsonl", chunk_size=100,
+                            max_workers=1, max_retries=DEFAULT_MAX_RETRIES, batch_prompts=False,
+                            max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, use_cache=True, dedupe=True):
+    """
+    Process raw posts as a stream, writing enriched posts to JSONL as they complete
+    
+    Raw posts are read incrementally from a JSON array or JSONL file, so memory
+    does not grow with corpus size. Groups are submitted to the worker pool
+    ahead of the chunk being written, so the pool does not drain at chunk
+    boundaries. A checkpoint file next to the output records progress after
+    every chunk, and an interrupted run resumes from it.
+    Near-duplicate clusters are kept in an SQLite index next to the output,
+    so deduplication does not hold the corpus in memory either.
+    Tag unification and statistics run over the output stream afterwards.
+    
+    Args:
+        raw_file_path: Path to raw posts JSON or JSONL file
+        processed_file_path: Output path for processed posts (JSONL)
+        chunk_size: Number of posts written and checkpointed at a time
+        max_workers: Number of concurrent LLM requests (1 = sequential)
+        max_retries: Retries per post on transient or rate-limit errors
+        batch_prompts: Pack several posts into one extraction prompt
+        max_batch_tokens: Estimated prompt token budget per batched prompt
+        use_cache: Reuse metadata from the on-disk cache instead of calling the LLM
+        dedupe: Extract metadata once per cluster of near-duplicate posts and
+            copy it to the rest, recording each post's cluster_id
+        
+    Returns:
+        Number of processed posts
+    """
+    output_path = Path(processed_file_path)
+    output_path.parent.mkdir(exist_ok=True, parents=True)
+    checkpoint_path = output_path.with_name(output_path.name + ".checkpoint")
+    clusters_path = output_path.with_name(output_path.name + ".clusters.db")
+    
+    # Parameters that change the output; resuming under different ones would mix two runs
+    params = {'batch_prompts': batch_prompts, 'max_batch_tokens': max_batch_tokens, 'dedupe': dedupe}
+    checkpoint = load_checkpoint(checkpoint_path, raw_file_path, params)
+    if checkpoint['posts_done']:
+        print(f"Resuming after {checkpoint['posts_done']} posts from {checkpoint_path}...")
+    elif checkpoint['phase'] == 'extract':
+        remove_sqlite_files(clusters_path)
+    
+    if checkpoint['phase'] == 'extract':
+        print(f"Streaming posts from {raw_file_path}...")
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        duplicate_index = DuplicateIndex(clusters_path) if dedupe else None
+        try:
+            with open(output_path, 'a+', encoding='utf-8') as outfile:
+                # Drop any partial records written after the last checkpoint
+                outfile.truncate(checkpoint['output_bytes'])
+                
+                raw_posts = iter_raw_posts(raw_file_path)
+                for _ in range(checkpoint['posts_done']):
+                    next(raw_posts, None)
+                
+                progress = tqdm(desc="Extracting metadata", unit="post", initial=checkpoint['posts_done'])
+                chunks = iter(lambda: list(itertools.islice(raw_posts, chunk_size)), [])
+                enrich_args = (max_retries, batch_prompts, max_batch_tokens, use_cache)
+                for chunk, enriched_chunk in enrich_chunks(chunks, enrich_args, executor, duplicate_index,
+                                                           max_queued=2 * max_workers):
+                    for post in enriched_chunk:
+                        outfile.write(json.dumps(post, ensure_ascii=False) + '\n')
+                    
+                    outfile.flush()
+                    os.fsync(outfile.fileno())
+                    checkpoint['posts_done'] += len(chunk)
+                    checkpoint['output_bytes'] = outfile.tell()
+                    save_checkpoint(checkpoint_path, checkpoint)
+                    progress.update(len(chunk))
+                progress.close()
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if duplicate_index is not None:
+                print(f"Found {duplicate_index.duplicates} near duplicates")
+                duplicate_index.close()
+        
+        checkpoint['phase'] = 'unify'
+        save_checkpoint(checkpoint_path, checkpoint)
+    
+    # Tag unification only needs the set of tags, which is read from the stream
+    print("Unifying tags...")
+    unified_tags = get_unified_tags(iter_jsonl(output_path), use_cache)
+    
+    print(f"Saving processed posts to {processed_file_path}...")
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    # Statistics are updated while the final output is written, not in a separate pass
+    stats = PostStats()
+    with open(temp_path, 'w', encoding='utf-8') as outfile:
+        for post in iter_jsonl(output_path):
+            apply_unified_tags(post, unified_tags)
+            outfile.write(json.dumps(post, ensure_ascii=False) + '\n')
+            stats.add(post)
+    os.replace(temp_path, output_path)
+    checkpoint_path.unlink(missing_ok=True)
+    remove_sqlite_files(clusters_path)
+    
+    if stats.total_posts:
+        stats.save()
+        print(f"Generated statistics saved to {DEFAULT_STATS_DIR}")
+    
+    if use_cache:
+        stats = get_metadata_cache().stats()
+        print(f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries)")
+    
+    print("Processing complete!")
+    return checkpoint['posts_done']
+
+def load_checkpoint(checkpoint_path, raw_file_path, params=None):
+    """
+    Load a streaming checkpoint, or start a fresh one
+    
+    A checkpoint recorded for a different raw file, for the same file since
+    modified (by size or mtime), or with different processing parameters is
+    ignored.
+    """
+    stat = os.stat(raw_file_path)
+    fresh = {'raw_file': str(raw_file_path), 'raw_size': stat.st_size, 'raw_mtime_ns': stat.st_mtime_ns,
+             'params': params or {}, 'phase': 'extract', 'posts_done': 0, 'output_bytes': 0}
+    if not Path(checkpoint_path).exists():
+        return fresh
+    
+    with open(checkpoint_path, encoding='utf-8') as f:
+        try:
+            checkpoint = json.load(f)
+        except json.JSONDecodeError:
+            return fresh
+    
+    if any(checkpoint.get(key) != fresh[key] for key in ('raw_file', 'raw_size', 'raw_mtime_ns', 'params')):
+        return fresh
+    return {**fresh, **checkpoint}
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Atomically write a streaming checkpoint"""
+    temp_path = Path(str(checkpoint_path) + ".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, checkpoint_path)
+
+def remove_sqlite_files(db_path):
+    """Delete an SQLite database along with its WAL and shared-memory files"""
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(db_path) + suffix).unlink(missing_ok=True)
+
+def iter_raw_posts(file_path):
+    """
+    Iterate over raw posts without loading the whole file
+    
+    Args:
+        file_path: Path to a JSONL file or a file holding a JSON array
+        
+    Yields:
+        Post dictionaries in file order
+    """
+    if str(file_path).endswith('.jsonl'):
+        yield from iter_jsonl(file_path)
+        return
+    
+    with open(file_path, encoding='utf-8') as file:
+        yield from iter_json_array(file)
+
+def iter_jsonl(file_path):
+    """Iterate over the records of a JSONL file, skipping blank lines"""
+    with open(file_path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def iter_json_array(file, read_size=65536):
+    """
+    Incrementally decode the elements of a top-level JSON array
+    
+    Args:
+        file: Text file object positioned at the start of the array
+        read_size: Number of characters read from the file at a time
+        
+    Yields:
+        Decoded array elements
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    
+    while True:
+        buffer = buffer.lstrip()
+        if buffer:
+            if not started:
+                if buffer[0] != '[':
+                    raise ValueError("Expected a JSON array of posts")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer[0] == ',':
+                buffer = buffer[1:]
+                continue
+            if buffer[0] == ']':
+                return
+            
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # Element is incomplete, read more unless the file is exhausted
+                if eof:
+                    raise
+            else:
+                yield element
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        
+        chunk = file.read(read_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+def make_enrich_groups(posts, max_retries=DEFAULT_MAX_RETRIES, batch_prompts=False,
+                       max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, use_cache=True):
+    """
+    Split posts into units of work that each share one LLM call
+    
+    Returns:
+        Tuple of (list of post groups, function enriching one group)
+    """
+    if batch_prompts:
+        groups = make_prompt_batches(posts, max_batch_tokens)
+        enrich_group = lambda group: enrich_post_batch(group, max_retries, use_cache)
+    else:
+        groups = [[post] for post in posts]
+        enrich_group = lambda group: [enrich_post(group[0], max_retries, use_cache)]
+    return groups, enrich_group
+
+def enrich_chunks(chunks, enrich_args, executor=None, duplicate_index=None, max_queued=0):
+    """
+    Enrich chunks of posts, yielding them in input order
+    
+    Groups of later chunks are submitted before earlier chunks are yielded,
+    so while one chunk is written up to max_queued more groups stay queued
+    and the workers do not drain at chunk boundaries.
+    
+    Args:
+        chunks: Iterable of lists of raw posts
+        enrich_args: Arguments passed to make_enrich_groups after the posts
+        executor: Executor running the groups, or None to run them in turn
+        duplicate_index: DuplicateIndex for deduplication, or None
+        max_queued: Groups kept queued behind the chunk being yielded
+        
+    Yields:
+        Tuples of (raw chunk, enriched posts in the order of the chunk)
+    """
+    in_flight = deque()
+    queued_groups = 0
+    # Clusters whose representative is being extracted by a chunk in flight
+    extracting = set()
+    
+    def finish_oldest():
+        nonlocal queued_groups
+        chunk, clusters, futures = in_flight.popleft()
+        queued_groups -= len(futures)
+        enriched_chunk = [post for future in futures for post in future.result()]
+        if duplicate_index is not None:
+            enriched_chunk = fill_duplicates(chunk, clusters, enriched_chunk, duplicate_index)
+            extracting.difference_update(cluster_id for cluster_id, extracted in clusters if extracted)
+        return chunk, enriched_chunk
+    
+    for chunk in chunks:
+        pending = chunk
+        clusters = None
+        if duplicate_index is not None:
+            clusters, pending = assign_clusters(chunk, duplicate_index, extracting)
+        
+        groups, enrich_group = make_enrich_groups(pending, *enrich_args)
+        futures = [submit_group(executor, enrich_group, group) for group in groups]
+        in_flight.append((chunk, clusters, futures))
+        queued_groups += len(futures)
+        
+        while in_flight and (len(in_flight) > 1 and queued_groups > max_queued
+                             or all(future.done() for future in in_flight[0][2])):
+            yield finish_oldest()
+    
+    while in_flight:
+        yield finish_oldest()
+
+def submit_group(executor, enrich_group, group):
+    """Start enriching a group on executor, or enrich it right away without one"""
+    if executor:
+        return executor.submit(enrich_group, group)
+    future = Future()
+    future.set_result(enrich_group(group))
+    return future
+
+def assign_clusters(posts, duplicate_index, pending_clusters=None):
+    """
+    Assign posts to near-duplicate clusters and pick the ones that need extraction
+    
+    A post needs extraction if it starts a cluster, or if its cluster has no
+    stored metadata and no earlier post is extracting it.
+    
+    Args:
+        posts: Posts to assign
+        duplicate_index: DuplicateIndex holding the clusters
+        pending_clusters: Set of cluster ids already being extracted, e.g. by
+            earlier chunks still in flight; updated with this call's clusters
+        
+    Returns:
+        Tuple of (list of (cluster id, extracted) per post, posts to extract)
+    """
+    clusters = []
+    pending = []
+    pending_clusters = set() if pending_clusters is None else pending_clusters
+    for post in posts:
+        cluster_id, is_new = duplicate_index.assign(post.get('text', ''))
+        extracted = cluster_id not in pending_clusters and (is_new or duplicate_index.get_metadata(cluster_id) is None)
+        if extracted:
+            pending_clusters.add(cluster_id)
+            pending.append(post)
+        clusters.append((cluster_id, extracted))
+    return clusters, pending
+
+def fill_duplicates(posts, clusters, enriched_posts, duplicate_index):
+    """
+    Merge extracted posts with copies of their metadata for the duplicates
+    
+    Args:
+        posts: Posts passed to assign_clusters
+        clusters: Cluster assignments returned by assign_clusters
+        enriched_posts: The extracted posts, in order
+        duplicate_index: DuplicateIndex the clusters came from
+        
+    Returns:
+        List of enriched posts in the order of posts, each with a cluster_id
+    """
+    enriched = iter(enriched_posts)
+    filled = []
+    for post, (cluster_id, extracted) in zip(posts, clusters):
+        if extracted:
+            post = next(enriched)
+            # Default metadata from a failed extraction is not stored, so later posts of the cluster retry it
+            if not isinstance(post, FallbackPost):
+                duplicate_index.set_metadata(cluster_id, {key: post[key] for key in ('language', 'tags') if key in post})
+        else:
+            metadata = duplicate_index.get_metadata(cluster_id)
+            if metadata is None:
+                post = with_default_metadata(post)
+            else:
+                # Line counts differ between edited copies; fields the post already carries win
+                post = {'line_count': count_lines(post.get('text', '')), **metadata, **post}
+        filled.append({**post, 'cluster_id': cluster_id})
+    duplicate_index.commit()
+    return filled
+
+def apply_unified_tags(post, unified_tags):
+    """Replace a post's tags with their unified versions, in place"""
+    if 'tags' in post:
+        current_tags = post['tags']
+        new_tags = [unified_tags.get(tag, tag) for tag in current_tags]
+        post['tags'] = list(set(new_tags))  # Remove duplicates
+    else:
+        post['tags'] = ['Other']
+
+def enrich_post(post, max_retries=DEFAULT_MAX_RETRIES, use_cache=True):
+    """
+    Attach metadata to a single raw post, retrying transient LLM errors
+    
+    Args:
+        post: Raw post dictionary with a 'text' key
+        max_retries: Number of retries before falling back to default metadata
+        use_cache: Check the metadata cache before calling the LLM
+        
+    Returns:
+        Post dictionary with line_count, language and tags
+    """
+    # Skip if already processed
+    if is_processed(post):
+        return post
+    
+    completed = complete_locally(post)
+    if completed:
+        return completed
+
+    try:
+        metadata = call_with_retries(lambda: extract_metadata(post['text'], use_cache), max_retries)
+        return with_existing_tags(post, metadata)
+    except Exception as e:
+        print(f"Error processing post: {str(e)[:100]}...")
+
+    return with_default_metadata(post)
+
+class FallbackPost(dict):
+    """A post carrying default metadata because its extraction failed"""
+
+def with_default_metadata(post):
+    """Add default metadata to a post whose extraction failed"""
+    return FallbackPost({
+        **post, 
+        'tags': ['Other'],
+        'line_count': len(post['text'].split('\n')),
+        'language': 'English'
+    })
+
+def enrich_post_batch(posts, max_retries=DEFAULT_MAX_RETRIES, use_cache=True):
+    """
+    Attach metadata to a group of posts using a single batched LLM call
+    
+    Posts missing from the batched response, or with malformed metadata,
+    are retried on their own through enrich_post.
+    
+    Args:
+        posts: List of raw post dictionaries
+        max_retries: Number of retries for the batched call
+        use_cache: Check the metadata cache before calling the LLM
+        
+    Returns:
+        List of posts with metadata, in input order
+    """
+    posts = [post if is_processed(post) else complete_locally(post) or post for post in posts]
+    pending = [i for i, post in enumerate(posts) if not is_processed(post)]
+    if not pending:
+        return posts
+
+    try:
+        texts = [posts[i]['text'] for i in pending]
+        batch_metadata = call_with_retries(lambda: extract_metadata_batch(texts, use_cache), max_retries)
+    except Exception as e:
+        print(f"Error processing batch, retrying posts individually: {str(e)[:100]}...")
+        batch_metadata = {}
+
+    enriched = posts
+    for batch_index, post_index in enumerate(pending):
+        post = posts[post_index]
+        metadata = batch_metadata.get(batch_index)
+        if metadata:
+            enriched[post_index] = with_existing_tags(post, metadata)
+        else:
+            enriched[post_index] = enrich_post(post, max_retries, use_cache)
+
+    return enriched
+
+def is_processed(post):
+    """Check whether a post already carries extracted metadata"""
+    return 'tags' in post and 'line_count' in post and 'language' in post
+
+def with_existing_tags(post, metadata):
+    """Merge extracted metadata into a post, keeping tags the post already had"""
+    if isinstance(post.get('tags'), list):
+        return {**post, **metadata, 'tags': post['tags']}
+    return {**post, **metadata}
+
+def complete_locally(post):
+    """
+    Fill in line_count and language for a post that already has tags
+    
+    Returns:
+        The completed post, or None if it has no tags or its language
+        cannot be detected confidently (the LLM is needed then)
+    """
+    if not isinstance(post.get('tags'), list):
+        return None
+    local_metadata = get_local_metadata(post['text'])
+    if local_metadata is None:
+        return None
+    # Fields the post already carries win over local guesses
+    return {**local_metadata, **post}
+
+@instrumented("extract_metadata")
+def extract_metadata(post, use_cache=True, local_fields=True):
     """
     Extract metadata from post text using LLM
     
+    With local_fields, line_count and language are computed locally and the
+    LLM is only asked for tags; posts whose language cannot be detected
+    confidently still go through the full LLM extraction.
+    
     Args:
         post: Text content of the post
+        use_cache: Read from and write to the on-disk metadata cache
+        local_fields: Compute line_count and language without the LLM when possible
         
     Returns:
         Dictionary with keys: line_count, language, tags
     """
+    local_metadata = get_local_metadata(post) if local_fields else None
+    if local_metadata:
+        return {**local_metadata, 'tags': extract_tags(post, use_cache)}
+
     template = '''
     You are given a LinkedIn post. Extract the following metadata:
     1. Number of lines in the post
@@ -108,9 +651,19 @@ def extract_metadata(post):
     JSON RESPONSE:
     '''
 
+    cache = get_metadata_cache() if use_cache else None
+    if cache:
+        cache_key = get_metadata_cache_key(post)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     pt = PromptTemplate.from_template(template)
-    chain = pt | llm
-    response = chain.invoke(input={"post": post})
+    chain = pt | get_extraction_llm()
+    with stage("llm.extract_metadata") as span:
+        response = chain.invoke(input={"post": post})
+        if span.recording:
+            span.set_tokens(*get_token_counts(post, response))
 
     try:
         json_parser = JsonOutputParser()
@@ -126,6 +679,8 @@ def extract_metadata(post):
         # Ensure tags are properly formatted
         result['tags'] = [tag.strip() for tag in result.get('tags', ['Other'])]
         
+        if cache:
+            cache.set(cache_key, result)
         return result
     except Exception as e:
         # Fallback to basic metadata extraction
@@ -136,12 +691,239 @@ def extract_metadata(post):
             'tags': ['Other']
         }
 
-def get_unified_tags(posts_with_metadata):
+def extract_tags(post, use_cache=True):
+    """
+    Extract only the topic tags of a post using LLM
+    
+    Args:
+        post: Text content of the post
+        use_cache: Read from and write to the on-disk metadata cache
+        
+    Returns:
+        List of up to 3 tags (['Other'] if the response cannot be parsed)
+    """
+    template = '''
+    You are given a LinkedIn post. Give up to 3 topic tags that best represent this post.
+    
+    Return a valid JSON object with exactly one key:
+    - tags: Array of strings (maximum 3 tags)
+    
+    Post:
+    {post}
+    
+    JSON RESPONSE:
+    '''
+
+    cache = get_metadata_cache() if use_cache else None
+    if cache:
+        cache_key = get_metadata_cache_key(post, TAGS_PROMPT_VERSION)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    pt = PromptTemplate.from_template(template)
+    chain = pt | get_extraction_llm(max_tokens=TAGS_MAX_TOKENS)
+    with stage("llm.extract_tags") as span:
+        response = chain.invoke(input={"post": post})
+        if span.recording:
+            span.set_tokens(*get_token_counts(post, response))
+
+    try:
+        tags = JsonOutputParser().parse(response.content).get('tags')
+    except Exception:
+        return ['Other']
+    if not isinstance(tags, list) or not tags:
+        return ['Other']
+
+    tags = [str(tag).strip() for tag in tags][:3]
+    if cache:
+        cache.set(cache_key, tags)
+    return tags
+
+BATCH_METADATA_TEMPLATE = '''
+    You are given several LinkedIn posts, each labelled with an index. For every post extract:
+    1. Number of lines in the post
+    2. Language (English, Hinglish, Hindi, or other)
+    3. Up to 3 topic tags that best represent this post
+    
+    Return a valid JSON array with one object per post. Each object must have exactly four keys:
+    - index: Integer index of the post as labelled below
+    - line_count: Integer representing number of lines
+    - language: String (English, Hinglish, Hindi, or other language name)
+    - tags: Array of strings (maximum 3 tags)
+    
+    Posts:
+    {posts}
+    
+    JSON RESPONSE:
+    '''
+
+def make_prompt_batches(posts, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """
+    Group posts for batched extraction, capped by estimated token counts
+    
+    A batch is closed when adding the next post would exceed the prompt
+    budget, or when the expected JSON response would exceed BATCH_OUTPUT_TOKENS.
+    A single post larger than the budget still gets a batch of its own.
+    
+    Args:
+        posts: List of raw post dictionaries
+        max_batch_tokens: Estimated prompt token budget per batch
+        
+    Returns:
+        List of post lists, in input order
+    """
+    max_posts = max(1, BATCH_OUTPUT_TOKENS // BATCH_OUTPUT_TOKENS_PER_POST)
+    budget = max_batch_tokens - estimate_tokens(BATCH_METADATA_TEMPLATE)
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for post in posts:
+        # Account for the "Post N:" header and separators around each post
+        post_tokens = estimate_tokens(post.get('text', '')) + 5
+        if current and (current_tokens + post_tokens > budget or len(current) >= max_posts):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(post)
+        current_tokens += post_tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+BATCH_TAGS_TEMPLATE = '''
+    You are given several LinkedIn posts, each labelled with an index. For every post give up to 3
+    topic tags that best represent it.
+    
+    Return a valid JSON array with one object per post. Each object must have exactly two keys:
+    - index: Integer index of the post as labelled below
+    - tags: Array of strings (maximum 3 tags)
+    
+    Posts:
+    {posts}
+    
+    JSON RESPONSE:
+    '''
+
+def extract_metadata_batch(posts, use_cache=True, local_fields=True):
+    """
+    Extract metadata for several posts with a single LLM call
+    
+    With local_fields, posts whose language is detected confidently get
+    line_count and language locally and are sent in a tags-only batch; the
+    rest go through the full batched extraction.
+    
+    Args:
+        posts: List of post texts
+        use_cache: Serve cached posts from the on-disk cache and only send misses
+        local_fields: Compute line_count and language without the LLM when possible
+        
+    Returns:
+        Dictionary mapping post index to metadata. Posts that are missing
+        from the response or malformed are left out.
+    """
+    metadata_by_index = {}
+    cache = get_metadata_cache() if use_cache else None
+
+    # Only posts missing from the cache are sent to the LLM
+    misses = []
+    tag_misses = {}
+    for index, text in enumerate(posts):
+        local_metadata = get_local_metadata(text) if local_fields else None
+        if local_metadata:
+            cached = cache.get(get_metadata_cache_key(text, TAGS_PROMPT_VERSION)) if cache else None
+            if cached is not None:
+                metadata_by_index[index] = {**local_metadata, 'tags': cached}
+            else:
+                tag_misses[index] = local_metadata
+            continue
+
+        cached = cache.get(get_metadata_cache_key(text)) if cache else None
+        if cached is not None:
+            metadata_by_index[index] = cached
+        else:
+            misses.append(index)
+
+    if tag_misses:
+        indexes = list(tag_misses)
+        for batch_index, item in invoke_metadata_batch(BATCH_TAGS_TEMPLATE, [posts[i] for i in indexes]):
+            if not isinstance(item.get('tags'), list):
+                continue
+            index = indexes[batch_index]
+            tags = [str(tag).strip() for tag in item['tags']][:3] or ['Other']
+            metadata_by_index[index] = {**tag_misses[index], 'tags': tags}
+            if cache:
+                cache.set(get_metadata_cache_key(posts[index], TAGS_PROMPT_VERSION), tags)
+
+    if not misses:
+        return metadata_by_index
+
+    for batch_index, item in invoke_metadata_batch(BATCH_METADATA_TEMPLATE, [posts[i] for i in misses]):
+        if not isinstance(item.get('tags'), list) or not isinstance(item.get('language'), str):
+            continue
+
+        index = misses[batch_index]
+        line_count = item.get('line_count')
+        if not isinstance(line_count, int):
+            line_count = len(posts[index].split('\n'))
+
+        metadata = {
+            'line_count': line_count,
+            'language': item['language'],
+            'tags': [str(tag).strip() for tag in item['tags']][:3] or ['Other']
+        }
+        metadata_by_index[index] = metadata
+        if cache:
+            cache.set(get_metadata_cache_key(posts[index]), metadata)
+
+    return metadata_by_index
+
+def invoke_metadata_batch(template, texts):
+    """
+    Send posts to the LLM in one batched prompt
+    
+    Returns:
+        List of (batch index, response object) pairs for the well-formed
+        objects in the response
+    """
+    posts_block = '\n\n'.join(f"Post {i}:\n{text}" for i, text in enumerate(texts))
+
+    pt = PromptTemplate.from_template(template)
+    chain = pt | get_extraction_llm(batched=True)
+    response = chain.invoke(input={"posts": posts_block})
+
+    try:
+        json_parser = JsonOutputParser()
+        result = json_parser.parse(response.content)
+    except OutputParserException:
+        return []
+
+    if not isinstance(result, list):
+        return []
+
+    items = []
+    for item in result:
+        if not isinstance(item, dict):
+            continue
+        batch_index = item.get('index')
+        if not isinstance(batch_index, int) or not 0 <= batch_index < len(texts):
+            continue
+        items.append((batch_index, item))
+    return items
+
+def get_unified_tags(posts_with_metadata, use_cache=True):
     """
     Create a unified tag mapping to consolidate similar tags
     
+    Tags are clustered locally against the persistent canonical-tag dictionary,
+    so only tags never seen before are examined, and only ambiguous clusters
+    are sent to the LLM (see resolve_ambiguous_tags).
+    
     Args:
         posts_with_metadata: List of posts with metadata including tags
+        use_cache: Read from and extend the on-disk canonical-tag dictionary
         
     Returns:
         Dictionary mapping original tags to unified tags
@@ -153,116 +935,67 @@ def get_unified_tags(posts_with_metadata):
         if 'tags' in post and isinstance(post['tags'], list):
             unique_tags.update(post['tags'])
     
-    # If too few tags, no need to unify
-    if len(unique_tags) < 5:
-        return {tag: tag for tag in unique_tags}
-        
-    unique_tags_list = ', '.join(unique_tags)
+    dictionary = TagDictionary(DEFAULT_DICTIONARY_PATH if use_cache else None)
+    normalizer = TagNormalizer(dictionary, resolver=resolve_ambiguous_tags)
+    return normalizer.normalize(unique_tags)
 
-    template = '''
-    I will give you a list of tags from LinkedIn posts. Create a unified tag mapping with these requirements:
-    
-    1. Similar tags should be mapped to a single standardized tag
-       Examples:
-       - "Jobseekers", "Job Hunting" → "Job Search"
-       - "Motivation", "Inspiration" → "Motivation"
-       - "Personal Growth", "Self Improvement" → "Self Improvement"
+def resolve_ambiguous_tags(clusters):
+    """
+    Ask the LLM whether ambiguous tags belong to their closest canonical tag
     
-    2. Use title case for all unified tags (e.g., "Job Search", "Career Advice")
+    Args:
+        clusters: Dictionary mapping a canonical tag to tags that may be synonyms of it
+        
+    Returns:
+        Dictionary mapping each tag to the canonical tag, or to itself if it is distinct
+    """
+    template = '''
+    I will give you groups of tags from LinkedIn posts. Each group has a canonical tag and candidate tags.
+    For each candidate, decide whether it means the same topic as the canonical tag.
     
-    3. Limit the final set to 10-15 broad categories maximum
+    Examples:
+    - Canonical "Job Search": "Jobseekers" → "Job Search", "Job Offers" → "Job Offers"
+    - Canonical "Motivation": "Inspiration" → "Motivation"
     
-    4. Output must be a valid JSON object mapping original tags to unified tags
-       Format: {"original_tag1": "Unified Tag", "original_tag2": "Unified Tag"}
+    Output must be a valid JSON object mapping every candidate tag either to its
+    canonical tag or to itself.
+    Format: {{"candidate_tag1": "Canonical Tag", "candidate_tag2": "candidate_tag2"}}
     
-    Tags to unify:
-    {tags}
+    Groups:
+    {groups}
     
     JSON RESPONSE:
     '''
+    groups = '\n'.join(f'- Canonical "{canonical}": ' + ', '.join(f'"{tag}"' for tag in tags)
+                       for canonical, tags in clusters.items())
     
-    try:
-        pt = PromptTemplate.from_template(template)
-        chain = pt | llm
-        response = chain.invoke(input={"tags": str(unique_tags_list)})
-        
-        json_parser = JsonOutputParser()
-        unified_tags = json_parser.parse(response.content)
-        
-        # Validate result
-        if not isinstance(unified_tags, dict):
-            raise ValueError("Invalid unified tags response")
-            
-        # Ensure all unique tags are included
-        for tag in unique_tags:
-            if tag not in unified_tags:
-                unified_tags[tag] = tag
-                
-        return unified_tags
-    except Exception as e:
-        print(f"Error unifying tags: {str(e)}")
-        # Fallback: return identity mapping
-        return {tag: tag for tag in unique_tags}
+    pt = PromptTemplate.from_template(template)
+    chain = pt | get_llm()
+    response = chain.invoke(input={"groups": groups})
+    
+    decisions = JsonOutputParser().parse(response.content)
+    if not isinstance(decisions, dict):
+        raise ValueError("Invalid tag resolution response")
+    return decisions
 
-def generate_statistics(posts):
+def generate_statistics(posts, stats_dir=DEFAULT_STATS_DIR):
     """
     Generate statistics about the processed posts
     
     Args:
-        posts: List of processed posts with metadata
-    """
-    if not posts:
-        return
-        
-    # Create directory for statistics
-    stats_dir = Path("data/statistics")
-    stats_dir.mkdir(exist_ok=True, parents=True)
-    
-    # Extract basic stats
-    total_posts = len(posts)
-    languages = {}
-    tags = {}
-    line_counts = []
-    
-    for post in posts:
-        # Language stats
-        lang = post.get('language', 'Unknown')
-        languages[lang] = languages.get(lang, 0) + 1
+        posts: List or iterable of processed posts with metadata
+        stats_dir: Directory for post_stats.json and the CSV tables
         
-        # Tag stats
-        for tag in post.get('tags', []):
-            tags[tag] = tags.get(tag, 0) + 1
-            
-        # Line count stats
-        line_counts.append(post.get('line_count', 0))
-    
-    # Create stats
-    stats = {
-        "total_posts": total_posts,
-        "languages": languages,
-        "tags": tags,
-        "line_count_avg": sum(line_counts) / len(line_counts) if line_counts else 0,
-        "line_count_min": min(line_counts) if line_counts else 0,
-        "line_count_max": max(line_counts) if line_counts else 0,
-    }
-    
-    # Save statistics
-    with open(stats_dir / "post_stats.json", "w", encoding="utf-8") as f:
-        json.dump(stats, f, indent=4, ensure_ascii=False)
-    
-    # Create CSV versions for analysis
-    try:
-        # Tags CSV
-        pd.DataFrame([{"tag": k, "count": v} for k, v in tags.items()]) \
-            .to_csv(stats_dir / "tag_stats.csv", index=False)
-            
-        # Languages CSV
-        pd.DataFrame([{"language": k, "count": v} for k, v in languages.items()]) \
-            .to_csv(stats_dir / "language_stats.csv", index=False)
-    except Exception as e:
-        print(f"Error creating statistics CSVs: {e}")
+    Returns:
+        PostStats instance, or None if there were no posts
+    """
+    stats = PostStats.from_posts(posts)
+    if not stats.total_posts:
+        return None
     
+    stats.save(stats_dir)
     print(f"Generated statistics saved to {stats_dir}")
+    return stats
 
 if __name__ == "__main__":
     sys.stdout.reconfigure(encoding='utf-8')  # Ensure UTF-8 encoding for output
@@ -277,4 +1010,11 @@ if __name__ == "__main__":
     if len(sys.argv) > 2:
         processed_path = sys.argv[2]
     
-    process_posts(raw_path, processed_path)
\ No newline at end of file
+    # Optional third argument: number of concurrent extraction workers
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    
+    # JSONL output uses the streaming, resumable pipeline
+    if processed_path.endswith('.jsonl'):
+        process_posts_streaming(raw_path, processed_path, max_workers=max_workers)
+    else:
+        process_posts(raw_path, processed_path, max_workers=max_workers)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = "data/cache/response_cache.db"
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Expired disk entries are purged once every this many writes
+PURGE_INTERVAL = 100
+
+class ResponseCache:
+    """
+    Two-tier cache for generated posts: an in-memory LRU in front of SQLite
+
+    Entries expire after ttl_seconds in both tiers. Each entry remembers how
+    long the LLM call took, so hits can report the latency they saved.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        Path(db_path).parent.mkdir(exist_ok=True, parents=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_created ON response_cache (created_at)"
+        )
+        self._conn.commit()
+        self.purge_expired()
+
+    @staticmethod
+    def make_key(prompt, model_params):
+        """Build the cache key for a final prompt and the model parameters"""
+        payload = json.dumps({"prompt": prompt, "model": model_params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached content for key, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[2] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                self.latency_saved += entry[1]
+                return entry[0]
+
+            row = self._conn.execute(
+                "SELECT content, latency, created_at FROM response_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._remember(key, row)
+            self.hits += 1
+            self.latency_saved += row[1]
+            return row[0]
+
+    def set(self, key, content, latency):
+        """
+        Store generated content
+
+        Args:
+            key: Cache key from make_key
+            content: Generated post text
+            latency: Seconds the LLM call took
+        """
+        entry = (content, latency, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, content, latency, created_at) VALUES (?, ?, ?, ?)",
+                (key, *entry)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % PURGE_INTERVAL == 0:
+                self._purge_expired()
+
+    def _remember(self, key, entry):
+        """Put an entry in the memory tier, evicting the least recently used (caller holds the lock)"""
+        self._memory[key] = tuple(entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self):
+        """Delete expired entries from disk; returns the number removed"""
+        with self._lock:
+            return self._purge_expired()
+
+    def _purge_expired(self):
+        cursor = self._conn.execute(
+            "DELETE FROM response_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self):
+        """Get hit/miss counters and the total LLM latency saved by hits"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": self.latency_saved,
+            "memory_entries": len(self._memory)
+        }
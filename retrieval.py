@@ -0,0 +1,239 @@
+import json
+import os
+import re
+import zlib
+from pathlib import Path
+import numpy as np
+
+# Embedding settings; bump EMBEDDING_VERSION when the vectorizer or matrix layout changes
+DEFAULT_N_FEATURES = 256
+EMBEDDING_VERSION = 2
+EMBEDDING_CACHE_DIR = "data/cache"
+# Matrices larger than this are memory-mapped instead of read into memory
+MMAP_THRESHOLD_BYTES = 64 * 1024 * 1024
+# Queries with fewer non-zero features than this fraction of the dimension are scored
+# feature by feature; denser ones with one full matrix-vector product
+SPARSE_QUERY_FRACTION = 0.25
+# Candidate sets smaller than this fraction of the corpus are gathered before scoring;
+# larger ones are cheaper to score in full and then index
+GATHER_CANDIDATE_FRACTION = 0.2
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text):
+    """Lowercased word unigrams and bigrams of a text"""
+    words = TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def embed_text(text, n_features=DEFAULT_N_FEATURES):
+    """
+    Embed a text with a signed hashing vectorizer
+
+    Features are hashed with crc32 so embeddings are stable across processes.
+    Term counts are log-scaled and the vector is L2-normalised, so a dot
+    product between two embeddings is their cosine similarity.
+
+    Args:
+        text: Text to embed
+        n_features: Embedding dimension
+
+    Returns:
+        float32 NumPy vector
+    """
+    counts = {}
+    for token in tokenize(text):
+        h = zlib.crc32(token.encode("utf-8"))
+        index = h % n_features
+        sign = 1.0 if h & 0x80000000 else -1.0
+        counts[index] = counts.get(index, 0.0) + sign
+
+    vector = np.zeros(n_features, dtype=np.float32)
+    for index, value in counts.items():
+        vector[index] = np.sign(value) * np.log1p(abs(value))
+
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+def embed_texts(texts, n_features=DEFAULT_N_FEATURES):
+    """Embed a list of texts into a (len(texts), n_features) float32 matrix"""
+    matrix = np.zeros((len(texts), n_features), dtype=np.float32)
+    for row, text in enumerate(texts):
+        matrix[row] = embed_text(text, n_features)
+    return matrix
+
+def get_texts(posts):
+    """Post texts of a list of posts or a columnar corpus (which can skip decoding other fields)"""
+    if hasattr(posts, "texts"):
+        return list(posts.texts())
+    return [p.get('text', '') for p in posts]
+
+class ExampleRetriever:
+    """
+    Vectorised nearest-neighbour search over the example corpus
+
+    The corpus is embedded once and the matrix is cached on disk next to a
+    signature of the source file, so later processes load (or memory-map)
+    it instead of re-embedding.
+
+    The matrix is stored feature-major (n_features x posts), so each feature
+    is one contiguous row. A query is a handful of hashed terms, and only
+    the rows of its non-zero features need to be read: a short topic query
+    touches a few percent of the matrix instead of all of it.
+    """
+
+    def __init__(self, features, n_features=DEFAULT_N_FEATURES):
+        self.features = features
+        self.n_features = n_features
+        # Embeddings of posts added after the matrix was built, in a buffer that
+        # doubles when full so adds are amortised O(1)
+        self._extra = np.zeros((0, n_features), dtype=np.float32)
+        self.extra_count = 0
+
+    @classmethod
+    def from_posts(cls, posts, source_path=None, n_features=DEFAULT_N_FEATURES, cache_dir=EMBEDDING_CACHE_DIR,
+                   base_count=None):
+        """
+        Build a retriever for a list of posts, reusing the on-disk cache when valid
+
+        Args:
+            posts: List of post dictionaries with a 'text' key
+            source_path: Corpus file the posts were loaded from (enables caching)
+            n_features: Embedding dimension
+            cache_dir: Directory for the cached embedding matrix
+            base_count: Number of leading posts stored in source_path; the rest
+                (e.g. an append segment) are embedded on top of the cached matrix
+        """
+        if base_count is None:
+            base_count = len(posts)
+        cache = cls._cache_entry(source_path, base_count, n_features, cache_dir)
+        retriever = cls._load_cached(cache, n_features) if cache else None
+        if retriever is not None:
+            # Only the posts after the cached base need their texts
+            for post in posts[base_count:]:
+                retriever.add(post.get('text', ''))
+            return retriever
+
+        texts = get_texts(posts)
+        retriever = cls._from_texts(texts[:base_count], cache, n_features)
+        for text in texts[base_count:]:
+            retriever.add(text)
+        return retriever
+
+    @staticmethod
+    def _cache_entry(source_path, count, n_features, cache_dir):
+        """Signature and file paths of the cached matrix for source_path, or None if it has no file"""
+        if source_path is None or not os.path.exists(source_path):
+            return None
+
+        stat = os.stat(source_path)
+        signature = {
+            "source": os.path.abspath(source_path),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "count": count,
+            "n_features": n_features,
+            "version": EMBEDDING_VERSION
+        }
+        cache_name = f"embeddings_{zlib.crc32(signature['source'].encode('utf-8')):08x}"
+        return signature, Path(cache_dir) / f"{cache_name}.npy", Path(cache_dir) / f"{cache_name}.json"
+
+    @classmethod
+    def _load_cached(cls, cache, n_features):
+        """Build a retriever over the cached matrix, or return None if it is missing or stale"""
+        signature, matrix_path, signature_path = cache
+        if not (matrix_path.exists() and signature_path.exists()):
+            return None
+        with open(signature_path, encoding="utf-8") as f:
+            try:
+                cached_signature = json.load(f)
+            except json.JSONDecodeError:
+                return None
+        if cached_signature != signature:
+            return None
+        return cls(load_matrix(matrix_path), n_features)
+
+    @classmethod
+    def _from_texts(cls, texts, cache, n_features):
+        """Embed texts into a retriever, saving the matrix to the cache entry if there is one"""
+        matrix = np.ascontiguousarray(embed_texts(texts, n_features).T)
+        if cache is None:
+            return cls(matrix, n_features)
+
+        signature, matrix_path, signature_path = cache
+        matrix_path.parent.mkdir(exist_ok=True, parents=True)
+        np.save(matrix_path, matrix)
+        with open(signature_path, "w", encoding="utf-8") as f:
+            json.dump(signature, f)
+        return cls(load_matrix(matrix_path), n_features)
+
+    def add(self, text):
+        """Embed and append one post (its id is the next row number)"""
+        if self.extra_count == len(self._extra):
+            grown = np.zeros((max(16, 2 * len(self._extra)), self.n_features), dtype=np.float32)
+            grown[:self.extra_count] = self._extra[:self.extra_count]
+            self._extra = grown
+        self._extra[self.extra_count] = embed_text(text, self.n_features)
+        self.extra_count += 1
+
+    def search(self, query, candidate_ids=None, k=5):
+        """
+        Find the posts most similar to a query
+
+        Args:
+            query: Free text, e.g. topic plus custom instructions
+            candidate_ids: Sorted NumPy array of post ids to search (None for all)
+            k: Number of results
+
+        Returns:
+            List of post ids, most similar first (ties keep corpus order),
+            or None when the query has no usable terms
+        """
+        query_vector = embed_text(query, self.n_features)
+        query_features = np.flatnonzero(query_vector)
+        if len(query_features) == 0:
+            return None
+
+        base_rows = self.features.shape[1]
+        if candidate_ids is None:
+            candidate_ids = np.arange(base_rows + self.extra_count)
+        if len(candidate_ids) == 0:
+            return []
+
+        in_base = candidate_ids[candidate_ids < base_rows]
+        scores = self.score_base(query_vector, query_features, in_base)
+        if len(in_base) < len(candidate_ids):
+            extra = self._extra[candidate_ids[len(in_base):] - base_rows]
+            scores = np.concatenate([scores, extra @ query_vector])
+
+        k = min(k, len(candidate_ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Sort by score, then by position so ties keep corpus order
+        top = top[np.lexsort((top, -scores[top]))]
+        return candidate_ids[top].tolist()
+
+    def score_base(self, query_vector, query_features, ids):
+        """Scores of the posts in the base matrix with the given ids (sorted)"""
+        if len(ids) == 0:
+            return np.zeros(0, dtype=np.float32)
+        base_rows = self.features.shape[1]
+        gather = len(ids) < base_rows * GATHER_CANDIDATE_FRACTION
+        if gather or len(query_features) < self.n_features * SPARSE_QUERY_FRACTION:
+            # Accumulate one feature row at a time, reading only the query's rows
+            # (and, for few candidates, only the candidates' entries in them)
+            scores = np.zeros(len(ids) if gather else base_rows, dtype=np.float32)
+            for feature in query_features:
+                row = self.features[feature]
+                scores += query_vector[feature] * (row.take(ids) if gather else row)
+            if gather:
+                return scores
+        else:
+            scores = query_vector @ self.features
+        return scores if len(ids) == base_rows else scores[ids]
+
+def load_matrix(path):
+    """Load an embedding matrix, memory-mapping it when it is large"""
+    if os.path.getsize(path) > MMAP_THRESHOLD_BYTES:
+        return np.load(path, mmap_mode="r")
+    return np.load(path)
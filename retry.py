@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+
+# Retry settings for LLM calls
+DEFAULT_MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+RATE_LIMIT_BASE_DELAY = 2.0
+MAX_RETRY_DELAY = 60.0
+
+def call_with_retries(func, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    Call an LLM-backed function, backing off and retrying transient errors
+    
+    Only rate limits, timeouts and server errors are retried (see
+    is_retryable_error); anything else is re-raised at once.
+    
+    Args:
+        func: Zero-argument callable to invoke
+        max_retries: Number of retries before the last error is re-raised
+        
+    Returns:
+        The callable's return value
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            time.sleep(get_retry_delay(e, attempt))
+
+def get_status_code(error):
+    """HTTP status code carried by an LLM error or its response, if any"""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status_code if isinstance(status_code, int) else None
+
+def is_timeout_error(error):
+    """Check whether an error is a timeout (TimeoutError, httpx or Groq API timeouts)"""
+    return isinstance(error, TimeoutError) or any('Timeout' in cls.__name__ for cls in type(error).__mro__)
+
+def is_retryable_error(error):
+    """
+    Check whether a failed LLM call is worth retrying
+    
+    Rate limits (429), timeouts and server errors (5xx) are transient; bad
+    requests, authentication errors and malformed responses are not.
+    """
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return is_timeout_error(error) or is_rate_limit_error(error)
+
+def is_rate_limit_error(error):
+    """Check whether an LLM error is a rate-limit (HTTP 429) response"""
+    if get_status_code(error) == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'rate_limit' in message
+
+def get_retry_delay(error, attempt):
+    """
+    Get the backoff delay before retrying a failed LLM call
+    
+    Rate-limit errors honour the server's Retry-After header when present
+    and otherwise back off more aggressively than other transient errors.
+    
+    Args:
+        error: Exception raised by the LLM call
+        attempt: Zero-based retry attempt number
+        
+    Returns:
+        Delay in seconds
+    """
+    if is_rate_limit_error(error):
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            return min(float(headers.get('retry-after')), MAX_RETRY_DELAY)
+        except (TypeError, ValueError):
+            pass
+        base_delay = RATE_LIMIT_BASE_DELAY
+    else:
+        base_delay = RETRY_BASE_DELAY
+
+    delay = base_delay * (2 ** attempt)
+    # Add jitter so concurrent workers do not retry in lockstep
+    return min(delay + random.uniform(0, base_delay), MAX_RETRY_DELAY)
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls evenly to stay under a per-minute rate
+
+    acquire() blocks until the caller may start its next request.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait for the next free slot"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
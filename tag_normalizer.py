@@ -0,0 +1,230 @@
+import difflib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+DEFAULT_DICTIONARY_PATH = "data/cache/tag_dictionary.json"
+
+# Match scores at or above MATCH_THRESHOLD map a tag onto an existing canonical
+# tag; scores between AMBIGUOUS_THRESHOLD and MATCH_THRESHOLD are left to the resolver
+MATCH_THRESHOLD = 0.88
+AMBIGUOUS_THRESHOLD = 0.6
+AMBIGUOUS_BATCH_SIZE = 10
+
+CAMEL_CASE_PATTERN = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+NON_WORD_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+STOPWORDS = {"and", "the", "of", "for", "in", "on", "to", "a", "an"}
+
+def stem_word(word):
+    """Strip common English plural and gerund suffixes"""
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def normalize_tag(tag):
+    """
+    Normalised comparison key for a tag
+
+    "#JobSearch", "job-searching" and "Job  Searches" all normalise to "job search".
+    """
+    tag = unicodedata.normalize("NFKC", tag).strip().lstrip("#")
+    tag = CAMEL_CASE_PATTERN.sub(" ", tag).replace("&", " and ")
+    words = [stem_word(word) for word in NON_WORD_PATTERN.sub(" ", tag.casefold()).split()]
+    return " ".join(word for word in words if word not in STOPWORDS) or " ".join(words)
+
+def display_tag(tag):
+    """Title-cased display form of a tag ("career advice" -> "Career Advice")"""
+    tag = " ".join(CAMEL_CASE_PATTERN.sub(" ", tag.strip().lstrip("#")).split())
+    return " ".join(word if word.isupper() else word[:1].upper() + word[1:] for word in tag.split(" "))
+
+class TagDictionary:
+    """
+    Persistent canonical-tag dictionary
+
+    Stores each canonical tag under its normalised key, and every raw tag seen
+    so far with the canonical tag it was mapped to, so later runs only have to
+    look at tags they have never seen.
+    """
+
+    def __init__(self, path=DEFAULT_DICTIONARY_PATH):
+        self.path = Path(path) if path else None
+        self.canonical = {}
+        self.aliases = {}
+        self._dirty = False
+
+        if self.path and self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    data = {}
+            self.canonical = data.get("canonical", {})
+            self.aliases = data.get("aliases", {})
+
+    def add_canonical(self, tag):
+        """Register a canonical tag; returns the existing one if its key is taken"""
+        key = normalize_tag(tag)
+        if key not in self.canonical:
+            self.canonical[key] = tag
+            self._dirty = True
+        return self.canonical[key]
+
+    def add_alias(self, tag, canonical):
+        """Record that a raw tag maps to a canonical tag"""
+        if self.aliases.get(tag) != canonical:
+            self.aliases[tag] = canonical
+            self._dirty = True
+
+    def save(self):
+        """Atomically write the dictionary if it changed"""
+        if not self.path or not self._dirty:
+            return
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        temp_path = Path(str(self.path) + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"canonical": self.canonical, "aliases": self.aliases}, f, indent=4, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+class TagNormalizer:
+    """
+    Local, deterministic tag clustering against a TagDictionary
+
+    New tags are matched by normalised key first, then by fuzzy string
+    similarity (and embedding similarity when an embedder is given) against
+    the known canonical tags. Clear matches become aliases, clear misses become
+    new canonical tags, and only the ambiguous middle band is passed to the
+    resolver, in batches of clusters that share a candidate.
+    """
+
+    def __init__(self, dictionary=None, resolver=None, embedder=None, match_threshold=MATCH_THRESHOLD,
+                 ambiguous_threshold=AMBIGUOUS_THRESHOLD, batch_size=AMBIGUOUS_BATCH_SIZE):
+        """
+        Args:
+            dictionary: TagDictionary to read and extend (in-memory if None)
+            resolver: Callable taking a dict {candidate canonical tag: [ambiguous tags]}
+                and returning {tag: canonical tag}; ambiguous tags become their own
+                canonical tags if None
+            embedder: Optional callable embedding a list of strings into L2-normalised
+                vectors (e.g. retrieval.embed_texts)
+            match_threshold: Similarity at or above which a tag is merged
+            ambiguous_threshold: Similarity at or above which a tag is sent to the resolver
+            batch_size: Clusters per resolver call
+        """
+        self.dictionary = dictionary if dictionary is not None else TagDictionary(None)
+        self.resolver = resolver
+        self.embedder = embedder
+        self.match_threshold = match_threshold
+        self.ambiguous_threshold = ambiguous_threshold
+        self.batch_size = batch_size
+
+    def similarity(self, key, candidate_key):
+        """Similarity in [0, 1] between two normalised tag keys"""
+        score = difflib.SequenceMatcher(None, key, candidate_key).ratio()
+        words, candidate_words = set(key.split()), set(candidate_key.split())
+        if words and candidate_words and (words <= candidate_words or candidate_words <= words):
+            # "leadership" vs "leadership lesson": containment is a strong signal
+            score = max(score, 0.75)
+        return score
+
+    def best_match(self, key, key_vector=None, canonical_vectors=None):
+        """Return (canonical key, score) of the closest known canonical tag"""
+        best_key, best_score = None, 0.0
+        # quick_ratio is an upper bound on ratio, so most candidates are skipped cheaply
+        matcher = difflib.SequenceMatcher(None, b=key)
+        for candidate_key in self.dictionary.canonical:
+            matcher.set_seq1(candidate_key)
+            if matcher.quick_ratio() < self.ambiguous_threshold and not (set(key.split()) & set(candidate_key.split())):
+                continue
+            score = self.similarity(key, candidate_key)
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+
+        if key_vector is not None and canonical_vectors:
+            for candidate_key, vector in canonical_vectors.items():
+                score = float(key_vector @ vector)
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+        return best_key, best_score
+
+    def normalize(self, tags):
+        """
+        Map raw tags onto canonical tags, extending the dictionary with new ones
+
+        Args:
+            tags: Iterable of raw tags
+
+        Returns:
+            Dictionary mapping each raw tag to its canonical tag
+        """
+        mapping = {}
+        new_tags = []
+        for tag in sorted(set(tags)):
+            if tag in self.dictionary.aliases:
+                mapping[tag] = self.dictionary.aliases[tag]
+            else:
+                new_tags.append(tag)
+
+        canonical_vectors = None
+        if self.embedder and new_tags:
+            keys = list(self.dictionary.canonical)
+            canonical_vectors = dict(zip(keys, self.embedder(keys))) if keys else {}
+
+        ambiguous = {}
+        for tag in new_tags:
+            key = normalize_tag(tag)
+            if key in self.dictionary.canonical:
+                mapping[tag] = self.dictionary.canonical[key]
+                self.dictionary.add_alias(tag, mapping[tag])
+                continue
+
+            key_vector = self.embedder([key])[0] if canonical_vectors is not None else None
+            match_key, score = self.best_match(key, key_vector, canonical_vectors)
+            if score >= self.match_threshold:
+                mapping[tag] = self.dictionary.canonical[match_key]
+                self.dictionary.add_alias(tag, mapping[tag])
+            elif score >= self.ambiguous_threshold and self.resolver:
+                ambiguous.setdefault(self.dictionary.canonical[match_key], []).append(tag)
+            else:
+                mapping[tag] = self.dictionary.add_canonical(display_tag(tag))
+                self.dictionary.add_alias(tag, mapping[tag])
+                if canonical_vectors is not None:
+                    canonical_vectors[key] = key_vector
+
+        mapping.update(self.resolve_ambiguous(ambiguous))
+        self.dictionary.save()
+        return mapping
+
+    def resolve_ambiguous(self, clusters):
+        """
+        Ask the resolver about ambiguous clusters, batch_size clusters at a time
+
+        A batch whose resolver call fails maps its tags to themselves and is not
+        recorded, so those tags are retried on the next run.
+        """
+        mapping = {}
+        candidates = sorted(clusters)
+        for i in range(0, len(candidates), self.batch_size):
+            batch = {candidate: clusters[candidate] for candidate in candidates[i:i + self.batch_size]}
+            try:
+                decisions = self.resolver(batch) or {}
+            except Exception as e:
+                print(f"Error resolving ambiguous tags: {str(e)}")
+                mapping.update({tag: tag for tags in batch.values() for tag in tags})
+                continue
+
+            for candidate, tags in batch.items():
+                for tag in tags:
+                    # Accept only the offered candidate; anything else keeps the tag separate
+                    if decisions.get(tag) == candidate:
+                        mapping[tag] = candidate
+                    else:
+                        mapping[tag] = self.dictionary.add_canonical(display_tag(tag))
+                    self.dictionary.add_alias(tag, mapping[tag])
+        return mapping
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+import llm_helper
+from fake_llm import fake_client_factory
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test in its own directory, so outputs stay out of the tree"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def use_fake_llm():
+    """Route llm_helper clients to FakeChatModel instances built with the given settings"""
+    def use(**settings):
+        llm_helper.set_client_factory(fake_client_factory(**settings))
+    yield use
+    llm_helper.set_client_factory(None)
@@ -0,0 +1,50 @@
+"""
+Validation of /generate requests
+"""
+import asyncio
+import json
+import pytest
+from api_server import GenerationService, RequestError, parse_generate_request, MAX_TOKENS_LIMIT
+from llm_helper import AVAILABLE_MODELS
+
+def generate(body):
+    """Status and JSON payload of a POST /generate with the given body"""
+    scope = {"type": "http", "method": "POST", "path": "/generate"}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode()}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(GenerationService()(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+@pytest.mark.parametrize("llm_params", [
+    {"temperature": "hot"},
+    {"temperature": -0.1},
+    {"temperature": 2.5},
+    {"temperature": True},
+    {"max_tokens": -5},
+    {"max_tokens": 0},
+    {"max_tokens": 10.5},
+    {"max_tokens": MAX_TOKENS_LIMIT + 1},
+    {"model_name": ["llama"]},
+    {"model_name": "not-a-model"}
+])
+def test_bad_llm_params_are_rejected(llm_params):
+    with pytest.raises(RequestError) as error:
+        parse_generate_request(json.dumps({"tag": "Career Advice", **llm_params}).encode())
+    assert error.value.status_code == 400
+
+def test_valid_llm_params_are_passed_on():
+    body = {"tag": "Career Advice", "model_name": AVAILABLE_MODELS[1], "temperature": 1, "max_tokens": 200}
+    _, llm_params = parse_generate_request(json.dumps(body).encode())
+    assert llm_params == {"model_name": AVAILABLE_MODELS[1], "temperature": 1.0, "max_tokens": 200}
+
+def test_bad_temperature_is_a_client_error(use_fake_llm):
+    use_fake_llm()
+    status, payload = generate({"tag": "Career Advice", "temperature": "hot"})
+    assert status == 400
+    assert "temperature" in payload["error"]
@@ -0,0 +1,34 @@
+"""
+Loading bulk generation jobs from CSV and JSONL
+"""
+import json
+import pytest
+from bulk_generate import load_jobs
+
+def test_csv_jobs_fill_in_defaults(workdir):
+    path = workdir / "jobs.csv"
+    path.write_text("tag,length,hashtags\nLeadership,Short,no\nRemote Work,,\n", encoding="utf-8")
+    jobs = load_jobs(path)
+
+    assert [job["tag"] for job in jobs] == ["Leadership", "Remote Work"]
+    assert [job["length"] for job in jobs] == ["Short", "Medium"]
+    assert [job["hashtags"] for job in jobs] == [False, True]
+
+@pytest.mark.parametrize("rows, line", [
+    ([{"tag": "Leadership"}, {"length": "Short"}], 2),
+    ([{"tag": "Leadership"}, {"tag": ""}], 2),
+    ([{"length": "Short"}], 1)
+])
+def test_jsonl_row_without_tag_names_its_line(workdir, rows, line):
+    path = workdir / "jobs.jsonl"
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+
+    with pytest.raises(ValueError, match=f"line {line}: missing required field 'tag'"):
+        load_jobs(path)
+
+def test_csv_row_without_tag_names_its_line(workdir):
+    path = workdir / "jobs.csv"
+    path.write_text("tag,length\nLeadership,Short\n,Long\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="line 3: missing required field 'tag'"):
+        load_jobs(path)
@@ -0,0 +1,94 @@
+"""
+Connection reuse of the pooled LLM clients against a local stub of the Groq API
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import llm_helper
+
+pytest.importorskip("langchain_groq")
+
+def completion(model):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "stub"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps(completion(request["model"])).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("GROQ_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    # Fresh pools, so connections from other tests are not counted
+    monkeypatch.setattr(llm_helper, "_http_client", None)
+    monkeypatch.setattr(llm_helper, "_http_async_client", None)
+    llm_helper.set_client_factory(None)
+    yield server
+    llm_helper.set_client_factory(None)
+    server.shutdown()
+    server.server_close()
+
+def pooled_clients():
+    return [llm_helper.get_llm(model_name=f"stub-{i}", temperature=0.1 * i, api_key="test") for i in range(3)]
+
+def test_sync_calls_share_one_connection(stub_server):
+    for _ in range(3):
+        for llm in pooled_clients():
+            assert llm.invoke("hi").content == "stub"
+    assert stub_server.connections == 1
+
+def test_async_calls_share_one_connection(stub_server):
+    async def run():
+        for _ in range(3):
+            for llm in pooled_clients():
+                assert (await llm.ainvoke("hi")).content == "stub"
+
+    asyncio.run(run())
+    assert stub_server.connections == 1
+
+def test_pooled_clients_share_http_clients(stub_server):
+    first, second = pooled_clients()[:2]
+    assert first.http_client is second.http_client is llm_helper.get_http_client()
+    assert first.http_async_client is second.http_async_client is llm_helper.get_http_async_client()
+
+def test_client_pool_drops_least_recently_used(monkeypatch):
+    monkeypatch.setattr(llm_helper, "MAX_POOLED_CLIENTS", 2)
+    llm_helper.set_client_factory(lambda **settings: object())
+    try:
+        first = llm_helper.get_llm(temperature=0.1, api_key="test")
+        second = llm_helper.get_llm(temperature=0.2, api_key="test")
+        assert llm_helper.get_llm(temperature=0.1, api_key="test") is first
+        llm_helper.get_llm(temperature=0.3, api_key="test")
+
+        assert len(llm_helper._clients) == 2
+        assert llm_helper.get_llm(temperature=0.1, api_key="test") is first
+        assert llm_helper.get_llm(temperature=0.2, api_key="test") is not second
+    finally:
+        llm_helper.set_client_factory(None)
@@ -0,0 +1,241 @@
+"""
+Concurrent metadata extraction against the fake LLM
+"""
+import json
+import random
+import string
+import threading
+import pytest
+import preprocess
+import retry
+from near_duplicates import DuplicateIndex
+from preprocess import enrich_post, process_posts, process_posts_streaming
+
+WORDS = ("team", "growth", "hiring", "remote", "launch", "mentor", "feedback", "goals", "career", "skills")
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry, "get_retry_delay", lambda error, attempt: 0)
+
+@pytest.fixture
+def extract_calls(monkeypatch):
+    """Record every call of preprocess.extract_metadata"""
+    calls = []
+    extract_metadata = preprocess.extract_metadata
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return extract_metadata(*args, **kwargs)
+
+    monkeypatch.setattr(preprocess, "extract_metadata", counted)
+    return calls
+
+@pytest.fixture
+def peak_calls(monkeypatch):
+    """Track the most preprocess.extract_metadata calls running at once"""
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+    extract_metadata = preprocess.extract_metadata
+
+    def tracked(*args, **kwargs):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        try:
+            return extract_metadata(*args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(preprocess, "extract_metadata", tracked)
+    return lambda: state["peak"]
+
+def make_raw_posts(count):
+    rng = random.Random(0)
+    return [
+        {"text": f"Update {i}: " + " ".join(rng.choice(WORDS) for _ in range(12))
+                 + ".\nThe team learned a lot this quarter and shared it with everyone."}
+        for i in range(count)
+    ]
+
+def make_distinct_posts(count):
+    """Posts of random words, so no two are near duplicates"""
+    rng = random.Random(0)
+    return [
+        {"text": " ".join("".join(rng.choice(string.ascii_lowercase) for _ in range(6)) for _ in range(20))}
+        for _ in range(count)
+    ]
+
+def run_process_posts(posts, **kwargs):
+    with open("raw_posts.json", "w", encoding="utf-8") as f:
+        json.dump(posts, f)
+    process_posts("raw_posts.json", "processed_posts.json", use_cache=False, **kwargs)
+    with open("processed_posts.json", encoding="utf-8") as f:
+        return json.load(f)
+
+def run_process_posts_streaming(posts, **kwargs):
+    kwargs = {"use_cache": False, "dedupe": False, **kwargs}
+    with open("raw_posts.json", "w", encoding="utf-8") as f:
+        json.dump(posts, f)
+    process_posts_streaming("raw_posts.json", "processed_posts.jsonl", **kwargs)
+    with open("processed_posts.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_concurrent_extraction_keeps_input_order(use_fake_llm):
+    # Jitter makes later posts finish before earlier ones
+    use_fake_llm(latency=0.005, jitter=0.01)
+    posts = make_raw_posts(40)
+    processed = run_process_posts(posts, max_workers=8, batch_size=5)
+
+    assert [post["text"] for post in processed] == [post["text"] for post in posts]
+    assert all(post["tags"] == ["Career Advice"] for post in processed)
+    assert all(post["language"] == "English" for post in processed)
+
+def test_batch_size_does_not_limit_concurrency(use_fake_llm, peak_calls):
+    use_fake_llm(latency=0.05)
+    run_process_posts(make_raw_posts(16), max_workers=16, batch_size=4)
+
+    assert peak_calls() > 4
+
+def test_streaming_keeps_workers_busy_across_chunks(use_fake_llm, peak_calls):
+    use_fake_llm(latency=0.05)
+    posts = make_raw_posts(24)
+    processed = run_process_posts_streaming(posts, max_workers=8, chunk_size=4)
+
+    assert [post["text"] for post in processed] == [post["text"] for post in posts]
+    assert peak_calls() > 4
+
+def test_streaming_extracts_duplicates_in_later_chunks_once(use_fake_llm, extract_calls):
+    use_fake_llm(latency=0.01)
+    # Each post's copy lands in the next chunk, while the original may still be in flight
+    originals = make_distinct_posts(12)
+    posts = [post for i in range(0, 12, 3) for post in originals[i:i+3] * 2]
+    processed = run_process_posts_streaming(posts, max_workers=8, chunk_size=3, dedupe=True)
+
+    assert sorted(text for text, *_ in extract_calls) == sorted(post["text"] for post in originals)
+    assert [post["text"] for post in processed] == [post["text"] for post in posts]
+    assert all(post["tags"] == ["Career Advice"] for post in processed)
+
+def interrupt_after(monkeypatch, count):
+    """Make preprocess.extract_metadata raise KeyboardInterrupt after count calls"""
+    calls = []
+    extract_metadata = preprocess.extract_metadata
+
+    def interrupted(*args, **kwargs):
+        if len(calls) == count:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return extract_metadata(*args, **kwargs)
+
+    monkeypatch.setattr(preprocess, "extract_metadata", interrupted)
+
+def test_interrupted_stream_resumes_from_checkpoint(use_fake_llm, monkeypatch):
+    use_fake_llm()
+    posts = make_raw_posts(20)
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, 10)
+        with pytest.raises(KeyboardInterrupt):
+            run_process_posts_streaming(posts, chunk_size=4)
+
+    # Two full chunks were checkpointed, so only the other 12 posts are extracted again
+    calls = []
+    extract_metadata = preprocess.extract_metadata
+    monkeypatch.setattr(preprocess, "extract_metadata", lambda *args, **kwargs: calls.append(args) or
+                        extract_metadata(*args, **kwargs))
+    # Resume on the same raw file; rewriting it would invalidate the checkpoint
+    process_posts_streaming("raw_posts.json", "processed_posts.jsonl", chunk_size=4, use_cache=False, dedupe=False)
+    with open("processed_posts.jsonl", encoding="utf-8") as f:
+        processed = [json.loads(line) for line in f]
+
+    assert [post["text"] for post in processed] == [post["text"] for post in posts]
+    assert [text for text, *_ in calls] == [post["text"] for post in posts[8:]]
+
+@pytest.mark.parametrize("change", ["raw_file", "params"])
+def test_stale_checkpoint_is_discarded(use_fake_llm, monkeypatch, change):
+    use_fake_llm()
+    posts = make_raw_posts(20)
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, 10)
+        with pytest.raises(KeyboardInterrupt):
+            run_process_posts_streaming(posts, chunk_size=4)
+
+    if change == "raw_file":
+        posts = make_distinct_posts(20)
+        processed = run_process_posts_streaming(posts, chunk_size=4)
+    else:
+        processed = run_process_posts_streaming(posts, chunk_size=4, dedupe=True)
+
+    assert [post["text"] for post in processed] == [post["text"] for post in posts]
+    assert all("cluster_id" in post for post in processed) == (change == "params")
+
+def test_concurrent_extraction_matches_sequential(use_fake_llm):
+    use_fake_llm(latency=0.005, jitter=0.01)
+    posts = make_raw_posts(20)
+    assert run_process_posts(posts, max_workers=8) == run_process_posts(posts, max_workers=1)
+
+def test_rate_limited_calls_are_retried(use_fake_llm, extract_calls):
+    random.seed(1)
+    use_fake_llm(latency=0.001, failure_rate=0.3)
+    posts = make_raw_posts(30)
+    processed = run_process_posts(posts, max_workers=4, max_retries=10)
+
+    assert all(post["tags"] == ["Career Advice"] for post in processed)
+    # Every post needed at least one call, and some needed retries
+    assert len(extract_calls) > len(posts)
+
+def test_failed_post_falls_back_to_default_metadata(use_fake_llm, extract_calls):
+    use_fake_llm(failure_rate=1.0)
+    post = {"text": "First line\nSecond line\nThird line"}
+    enriched = enrich_post(post, max_retries=2, use_cache=False)
+
+    assert enriched == {**post, "tags": ["Other"], "line_count": 3, "language": "English"}
+    # One call and two retries
+    assert len(extract_calls) == 3
+
+def fail_first_call(monkeypatch):
+    """Make the first preprocess.extract_metadata call fail, recording every call"""
+    calls = []
+    extract_metadata = preprocess.extract_metadata
+
+    def failing(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ValueError("Invalid request")
+        return extract_metadata(*args, **kwargs)
+
+    monkeypatch.setattr(preprocess, "extract_metadata", failing)
+    return calls
+
+def test_failed_extraction_is_not_stored_for_duplicates(use_fake_llm, monkeypatch):
+    use_fake_llm()
+    fail_first_call(monkeypatch)
+    posts = make_distinct_posts(1) * 3
+    duplicate_index = DuplicateIndex()
+    clusters, pending = preprocess.assign_clusters(posts, duplicate_index)
+    enriched = [enrich_post(post, max_retries=0, use_cache=False) for post in pending]
+    filled = preprocess.fill_duplicates(posts, clusters, enriched, duplicate_index)
+
+    assert duplicate_index.get_metadata(clusters[0][0]) is None
+    assert all(post["tags"] == ["Other"] for post in filled)
+
+def test_duplicates_retry_a_failed_extraction_in_later_chunks(use_fake_llm, monkeypatch):
+    use_fake_llm()
+    calls = fail_first_call(monkeypatch)
+    processed = run_process_posts_streaming(make_distinct_posts(1) * 3, chunk_size=1, dedupe=True)
+
+    # The second copy is extracted again and its metadata is copied to the third
+    assert len(calls) == 2
+    assert [post["tags"] for post in processed] == [["Other"], ["Career Advice"], ["Career Advice"]]
+
+def test_errors_that_are_not_transient_are_not_retried(monkeypatch):
+    calls = []
+
+    def bad_request(*args, **kwargs):
+        calls.append(args)
+        raise ValueError("Invalid request")
+
+    monkeypatch.setattr(preprocess, "extract_metadata", bad_request)
+    enriched = enrich_post({"text": "First line\nSecond line"}, max_retries=3, use_cache=False)
+
+    assert enriched["tags"] == ["Other"]
+    assert len(calls) == 1
@@ -0,0 +1,77 @@
+"""
+ExampleRetriever search results against a dense matrix-vector product
+"""
+import json
+import random
+import numpy as np
+import pytest
+import retrieval
+from retrieval import ExampleRetriever, embed_texts, embed_text
+
+WORDS = ["team", "growth", "hiring", "remote", "launch", "mentor", "feedback", "goals", "career", "skills",
+         "leadership", "failure", "lesson", "product", "customers", "startup", "culture", "interview"]
+QUERIES = ["career", "leadership lesson", "remote team culture and hiring for a startup product launch " * 3]
+
+def make_texts(count, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))) for _ in range(count)]
+
+def dense_top_scores(texts, query, candidate_ids, k):
+    scores = embed_texts(texts) @ embed_text(query)
+    if candidate_ids is not None:
+        scores = scores[candidate_ids]
+    return np.sort(scores)[::-1][:k]
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("candidate_count", [None, 600, 300, 20])
+@pytest.mark.parametrize("sparse_fraction", [retrieval.SPARSE_QUERY_FRACTION, 0.0])
+def test_search_matches_dense_scores(query, candidate_count, sparse_fraction, monkeypatch):
+    # A zero fraction scores every query with the full matrix-vector product
+    monkeypatch.setattr(retrieval, "SPARSE_QUERY_FRACTION", sparse_fraction)
+    texts = make_texts(1000)
+    # The last 50 posts are added after the matrix was built
+    retriever = ExampleRetriever.from_posts([{"text": text} for text in texts], base_count=950)
+    candidate_ids = None
+    if candidate_count is not None:
+        candidate_ids = np.sort(np.random.default_rng(0).choice(len(texts), candidate_count, replace=False))
+
+    post_ids = retriever.search(query, candidate_ids, k=10)
+
+    found = embed_texts([texts[i] for i in post_ids]) @ embed_text(query)
+    assert np.allclose(found, dense_top_scores(texts, query, candidate_ids, 10), atol=1e-5)
+    if candidate_ids is not None:
+        assert set(post_ids) <= set(candidate_ids.tolist())
+
+def test_cached_matrix_gives_the_same_results(workdir):
+    texts = make_texts(500)
+    path = workdir / "posts.json"
+    path.write_text(json.dumps([{"text": text} for text in texts]), encoding="utf-8")
+    posts = [{"text": text} for text in texts]
+
+    built = ExampleRetriever.from_posts(posts, str(path), cache_dir=str(workdir / "cache"))
+    loaded = ExampleRetriever.from_posts(posts, str(path), cache_dir=str(workdir / "cache"))
+
+    assert loaded.features.shape == (built.n_features, len(texts))
+    for query in QUERIES:
+        assert loaded.search(query, k=10) == built.search(query, k=10)
+
+def test_cached_matrix_is_loaded_without_reading_the_base_posts(workdir, monkeypatch):
+    texts = make_texts(500)
+    path = workdir / "posts.json"
+    path.write_text(json.dumps([{"text": text} for text in texts[:450]]), encoding="utf-8")
+    posts = [{"text": text} for text in texts]
+    built = ExampleRetriever.from_posts(posts, str(path), cache_dir=str(workdir / "cache"), base_count=450)
+
+    def get_texts(posts):
+        raise AssertionError("a cache hit must not read every post")
+
+    monkeypatch.setattr(retrieval, "get_texts", get_texts)
+    loaded = ExampleRetriever.from_posts(posts, str(path), cache_dir=str(workdir / "cache"), base_count=450)
+
+    assert loaded.extra_count == built.extra_count == 50
+    for query in QUERIES:
+        assert loaded.search(query, k=10) == built.search(query, k=10)
+
+def test_query_without_terms_returns_none():
+    retriever = ExampleRetriever.from_posts([{"text": text} for text in make_texts(10)])
+    assert retriever.search("  ...  ") is None
@@ -0,0 +1,63 @@
+"""
+Which LLM errors call_with_retries retries
+"""
+import httpx
+import pytest
+import retry
+from fake_llm import FakeLLMError
+from retry import call_with_retries, is_retryable_error
+
+class APITimeoutError(Exception):
+    """Stands in for the Groq SDK's timeout error, which has no status code"""
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry, "get_retry_delay", lambda error, attempt: 0)
+
+def failing(errors, result="ok"):
+    """Callable raising each of errors in turn, then returning result; counts its calls"""
+    def func():
+        func.calls += 1
+        if func.calls <= len(errors):
+            raise errors[func.calls - 1]
+        return result
+    func.calls = 0
+    return func
+
+@pytest.mark.parametrize("error", [
+    FakeLLMError(status_code=429),
+    FakeLLMError(status_code=500),
+    FakeLLMError(status_code=503),
+    TimeoutError(),
+    httpx.ReadTimeout("timed out"),
+    APITimeoutError("Request timed out."),
+    Exception("Rate limit reached for model")
+])
+def test_transient_errors_are_retried(error):
+    func = failing([error, error])
+    assert call_with_retries(func, max_retries=3) == "ok"
+    assert func.calls == 3
+
+@pytest.mark.parametrize("error", [
+    FakeLLMError(status_code=400),
+    FakeLLMError(status_code=401),
+    ValueError("Invalid JSON in response"),
+    KeyError("tags")
+])
+def test_other_errors_are_raised_at_once(error):
+    func = failing([error])
+    with pytest.raises(type(error)):
+        call_with_retries(func, max_retries=3)
+    assert func.calls == 1
+
+def test_last_error_is_raised_after_max_retries():
+    func = failing([FakeLLMError()] * 5)
+    with pytest.raises(FakeLLMError):
+        call_with_retries(func, max_retries=2)
+    assert func.calls == 3
+
+def test_status_code_of_the_response_is_used():
+    response = httpx.Response(502, request=httpx.Request("POST", "http://test"))
+    assert is_retryable_error(httpx.HTTPStatusError("Bad gateway", request=response.request, response=response))
+    response = httpx.Response(404, request=httpx.Request("POST", "http://test"))
+    assert not is_retryable_error(httpx.HTTPStatusError("Not found", request=response.request, response=response))
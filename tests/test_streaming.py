@@ -0,0 +1,111 @@
+"""
+Token streaming of generated posts against the fake LLM
+"""
+import asyncio
+import re
+import time
+import instrumentation
+from fake_llm import FakeChatModel
+from llm_helper import DEFAULT_MAX_TOKENS
+from post_generator import MAX_TOKENS_PER_LINE, stream_post, astream_post
+
+TOKEN_LATENCY = 0.01
+POST_TEXT = FakeChatModel.model_fields["post_text"].default
+POST_TOKENS = re.findall(r"\S+\s*", POST_TEXT)
+
+def collect(chunks):
+    """Chunks of a stream with the time each one arrived"""
+    start = time.perf_counter()
+    return [(chunk, time.perf_counter() - start) for chunk in chunks]
+
+async def acollect(chunks):
+    start = time.perf_counter()
+    return [(chunk, time.perf_counter() - start) async for chunk in chunks]
+
+def test_stream_post_yields_tokens_in_order(use_fake_llm):
+    use_fake_llm(token_latency=TOKEN_LATENCY)
+    report = {}
+    received = collect(stream_post("Short", "English", "Career Advice", report=report))
+
+    chunks = [chunk for chunk, _ in received]
+    assert chunks == POST_TOKENS
+    assert "".join(chunks) == POST_TEXT
+    assert report["stopped_early"] is False
+    assert report["line_count"] == 3
+
+def test_stream_post_yields_chunks_as_they_arrive(use_fake_llm):
+    use_fake_llm(token_latency=TOKEN_LATENCY)
+    received = collect(stream_post("Short", "English", "Career Advice"))
+
+    times = [seconds for _, seconds in received]
+    assert times == sorted(times)
+    # The first chunk is shown long before the model finishes
+    assert times[-1] - times[0] >= TOKEN_LATENCY * (len(times) - 1) * 0.5
+
+def test_astream_post_matches_stream_post(use_fake_llm):
+    use_fake_llm(token_latency=TOKEN_LATENCY)
+    received = asyncio.run(acollect(astream_post("Short", "English", "Career Advice")))
+
+    assert [chunk for chunk, _ in received] == POST_TOKENS
+
+def test_stream_post_stops_past_the_requested_length(use_fake_llm):
+    use_fake_llm(token_latency=0.001, post_lines=12)
+    report = {}
+    post = "".join(stream_post("Short", "English", "Career Advice", hashtags=False, report=report))
+
+    assert report["stopped_early"] is True
+    assert report["line_count"] == 5
+    assert len(post.strip().split("\n")) == 5
+    assert "#" not in post
+
+def test_stopped_post_keeps_a_hashtag_line(use_fake_llm):
+    # The fake post's hashtags come after its twelve lines, so they are cut off
+    use_fake_llm(token_latency=0.001, post_lines=12)
+    report = {}
+    post = "".join(stream_post("Short", "English", "Career Advice", report=report))
+
+    body, hashtags = post.split("\n\n")
+    assert len(body.split("\n")) == 5
+    assert hashtags == "#CareerAdvice"
+    assert report["line_count"] == 6
+
+def test_stream_report_estimates_savings_without_headroom(use_fake_llm):
+    use_fake_llm(token_latency=0.001, post_lines=12)
+    report = {}
+    "".join(stream_post("Short", "English", "Career Advice", report=report))
+
+    # At most one range width (5 lines) of MAX_TOKENS_PER_LINE, far below max_tokens headroom
+    assert 0 < report["tokens_saved"] <= 5 * MAX_TOKENS_PER_LINE
+    assert report["tokens_saved"] < DEFAULT_MAX_TOKENS - report["tokens"]
+    assert report["tokens_trimmed"] > 0
+
+def test_early_stop_is_not_counted_as_completion_tokens(use_fake_llm):
+    use_fake_llm(token_latency=0.001, post_lines=12)
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        "".join(stream_post("Short", "English", "Career Advice"))
+        stages = instrumentation.snapshot()
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+    assert stages["llm.stream.saved"]["calls"] == 1
+    assert stages["llm.stream.saved"]["completion_tokens"] == 0
+
+def test_stream_post_without_early_stop_keeps_the_whole_post(use_fake_llm):
+    use_fake_llm(token_latency=0.001, post_lines=12)
+    report = {}
+    post = "".join(stream_post("Short", "English", "Career Advice", early_stop=False, report=report))
+
+    assert report["stopped_early"] is False
+    # Twelve lines of text and the hashtag line
+    assert report["line_count"] == 13
+    assert post.endswith("#Growth #Career")
+
+def test_cached_post_is_streamed_as_one_chunk(use_fake_llm):
+    use_fake_llm(token_latency=0.001)
+    first = "".join(stream_post("Short", "English", "Career Advice", reuse=True))
+    chunks = list(stream_post("Short", "English", "Career Advice", reuse=True))
+
+    assert chunks == [first]
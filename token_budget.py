@@ -0,0 +1,92 @@
+import functools
+import re
+
+# Cached token counts of example posts (keyed by text)
+EXAMPLE_TOKEN_CACHE_SIZE = 4096
+# Examples are not truncated below this many tokens; a stub teaches no style
+MIN_EXAMPLE_TOKENS = 40
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+def estimate_tokens(text):
+    """
+    Local estimate of the number of LLM tokens in a text
+
+    Mirrors how BPE tokenizers split text: ASCII words cost about one token per
+    4 characters, other scripts (e.g. Devanagari) about one per character, and
+    each punctuation mark or symbol one token.
+    """
+    tokens = 0
+    for piece in WORD_PATTERN.findall(text):
+        if piece.isascii():
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += len(piece)
+    return max(1, tokens)
+
+@functools.lru_cache(maxsize=EXAMPLE_TOKEN_CACHE_SIZE)
+def count_example_tokens(text):
+    """Token estimate for an example post, cached since the same examples recur"""
+    return estimate_tokens(text)
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Cut a text down to about max_tokens, at a line boundary where possible
+
+    Returns:
+        The truncated text, or None if not even MIN_EXAMPLE_TOKENS fit
+    """
+    if max_tokens < MIN_EXAMPLE_TOKENS:
+        return None
+
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        line_tokens = estimate_tokens(line) if line.strip() else 0
+        if used + line_tokens > max_tokens:
+            if not kept:
+                # A single overlong first line: keep as many words as fit
+                words = []
+                for word in line.split(" "):
+                    used += estimate_tokens(word)
+                    if used > max_tokens:
+                        break
+                    words.append(word)
+                kept.append(" ".join(words))
+            break
+        kept.append(line)
+        used += line_tokens
+    return "\n".join(kept).rstrip()
+
+def select_examples(posts, token_budget, max_examples=2):
+    """
+    Pick example texts that fit a token budget
+
+    Posts are taken in the given (relevance) order. One that does not fit the
+    remaining budget is skipped in favour of shorter matches further down; if
+    none fits at all, the best match is truncated to the budget instead.
+
+    Args:
+        posts: Candidate example posts, best first
+        token_budget: Tokens available for all example texts
+        max_examples: Maximum number of examples
+
+    Returns:
+        List of example texts
+    """
+    selected = []
+    remaining = token_budget
+    for post in posts:
+        text = post['text']
+        tokens = count_example_tokens(text)
+        if tokens <= remaining:
+            selected.append(text)
+            remaining -= tokens
+            if len(selected) == max_examples:
+                break
+
+    if not selected and posts:
+        truncated = truncate_to_tokens(posts[0]['text'], token_budget)
+        if truncated:
+            selected.append(truncated)
+    return selected